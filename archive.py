@@ -0,0 +1,267 @@
+import datetime
+
+from sqlalchemy import (
+    delete, event, func, insert, inspect, literal, select, union_all, update,
+    Column, DateTime, Index, Integer, MetaData, String, Table, Text, DECIMAL,
+)
+
+from practice1 import ServiceMechanic, ServiceTicket, _as_datetime, _on_primary
+
+# Old tickets and their mechanic assignments are moved out of the live tables into one pair of
+# archive tables per year (service_tickets_2019, service_mechanics_2019, ...), optionally kept in
+# a separate SQLite file attached to every connection. Each batch is moved in its own transaction,
+# so an interrupted run loses nothing and simply continues where it stopped when run again.
+#
+# read_tickets_between() and the reports in reporting.py read the live table and only add the
+# archive years the requested range overlaps, so queries over recent work never touch the archive.
+#
+# The summary tables are left alone when tickets are archived, and rebuild_summaries() reads the
+# archive tables next to the live ones, so archived work keeps counting. Archived tickets drop out
+# of the full-text search index.
+
+DEFAULT_ARCHIVE_BATCH_SIZE = 500
+ARCHIVE_SCHEMA = 'archive'
+
+archive_metadata = MetaData()
+
+# Single row: everything dated before archived_before has been moved; pending_before is set while
+# a run is in progress and is where an interrupted run resumes
+archive_state = Table(
+    'archive_state', archive_metadata,
+    Column('id', Integer, primary_key=True),
+    Column('archived_before', DateTime, nullable=True),
+    Column('pending_before', DateTime, nullable=True),
+    Column('updated_at', DateTime, nullable=False),
+)
+
+# One row per archived year, schema is None for tables in the main database
+archive_partitions = Table(
+    'archive_partitions', archive_metadata,
+    Column('year', Integer, primary_key=True),
+    Column('schema', String(50), nullable=True),
+    Column('ticket_count', Integer, nullable=False, default=0),
+)
+
+_tables = {}  # (schema, year) -> (tickets table, mechanics table)
+
+
+# Archive tables copy the live columns without foreign keys, so vehicles and mechanics can still
+# be deleted once their tickets are archived
+def archive_tables(year, schema=None):
+    key = (schema, year)
+    if key not in _tables:
+        tickets = Table(
+            f'service_tickets_{year}', archive_metadata,
+            Column('ticket_id', Integer, primary_key=True, autoincrement=False),
+            Column('vin', String(17), nullable=False),
+            Column('customer_id', Integer, nullable=False),
+            Column('ticket_date', DateTime),
+            Column('service_description', Text, nullable=False),
+            Column('cost', DECIMAL, nullable=False),
+            Index(f'ix_service_tickets_{year}_ticket_date', 'ticket_date'),
+            Index(f'ix_service_tickets_{year}_customer_id', 'customer_id'),
+            schema=schema,
+        )
+        mechanics = Table(
+            f'service_mechanics_{year}', archive_metadata,
+            Column('service_ticket_id', Integer, primary_key=True, autoincrement=False),
+            Column('mechanic_id', Integer, primary_key=True, autoincrement=False),
+            Index(f'ix_service_mechanics_{year}_mechanic_id', 'mechanic_id'),
+            schema=schema,
+        )
+        _tables[key] = (tickets, mechanics)
+    return _tables[key]
+
+
+# Creates the bookkeeping tables, needed before read_tickets_between(); archive_tickets() does it itself
+def install_archive(bind):
+    archive_metadata.create_all(bind, tables=[archive_state, archive_partitions])
+
+
+# Keeps the archive in a separate SQLite file, attached to every connection under ARCHIVE_SCHEMA.
+# Pooled connections are discarded so the attachment applies to all of them.
+def attach_archive_database(engine, path):
+    if engine.dialect.name != 'sqlite':
+        raise ValueError('Archive database files require SQLite')
+
+    @event.listens_for(engine, 'connect')
+    def attach_archive(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}', (path,))
+        cursor.close()
+
+    engine.dispose()
+    return ARCHIVE_SCHEMA
+
+
+def _state(session):
+    return session.execute(select(archive_state).where(archive_state.c.id == 1)).first()
+
+
+def _set_state(session, **values):
+    values['updated_at'] = datetime.datetime.utcnow()
+    if session.execute(update(archive_state).where(archive_state.c.id == 1).values(**values)).rowcount == 0:
+        session.execute(insert(archive_state).values(id=1, **values))
+
+
+def _record_partition(session, year, schema, count):
+    result = session.execute(
+        update(archive_partitions)
+        .where(archive_partitions.c.year == year)
+        .values(ticket_count=archive_partitions.c.ticket_count + count)
+    )
+    if result.rowcount == 0:
+        session.execute(insert(archive_partitions).values(year=year, schema=schema, ticket_count=count))
+
+
+def _partition_schemas(session):
+    return dict(session.execute(select(archive_partitions.c.year, archive_partitions.c.schema)).all())
+
+
+def _move_batch(session, tickets, schema, partitions):
+    by_year = {}
+    for ticket_id, ticket_date in tickets:
+        by_year.setdefault(ticket_date.year, []).append(ticket_id)
+    connection = session.connection()
+    for year, ticket_ids in sorted(by_year.items()):
+        # A year stays wherever its first batch put it
+        year_schema = partitions.setdefault(year, schema)
+        ticket_table, mechanic_table = archive_tables(year, year_schema)
+        ticket_table.create(connection, checkfirst=True)
+        mechanic_table.create(connection, checkfirst=True)
+        ticket_columns = [column.name for column in ticket_table.columns]
+        session.execute(insert(ticket_table).from_select(
+            ticket_columns,
+            select(*[ServiceTicket.__table__.c[name] for name in ticket_columns]).where(ServiceTicket.ticket_id.in_(ticket_ids)),
+        ))
+        session.execute(insert(mechanic_table).from_select(
+            ['service_ticket_id', 'mechanic_id'],
+            select(ServiceMechanic.service_ticket_id, ServiceMechanic.mechanic_id).where(ServiceMechanic.service_ticket_id.in_(ticket_ids)),
+        ))
+        _record_partition(session, year, year_schema, len(ticket_ids))
+    ticket_ids = [ticket_id for ticket_id, _ in tickets]
+    session.execute(delete(ServiceMechanic).where(ServiceMechanic.service_ticket_id.in_(ticket_ids)))
+    session.execute(delete(ServiceTicket).where(ServiceTicket.ticket_id.in_(ticket_ids)))
+
+
+# Moves tickets dated before `before`, with their assignments, into the archive and returns how
+# many were moved. Without `before` an interrupted run is resumed. on_batch(moved) is called after
+# each committed batch.
+@_on_primary
+def archive_tickets(session, before=None, batch_size=DEFAULT_ARCHIVE_BATCH_SIZE, schema=None, on_batch=None):
+    install_archive(session.connection())
+    state = _state(session)
+    before = _as_datetime(before)
+    if before is None:
+        if state is None or state.pending_before is None:
+            raise ValueError('Pass a cutoff date, there is no interrupted archive run to resume')
+        before = state.pending_before
+    _set_state(session, pending_before=before)
+    session.commit()
+
+    partitions = _partition_schemas(session)
+    moved = 0
+    while True:
+        tickets = session.execute(
+            select(ServiceTicket.ticket_id, ServiceTicket.ticket_date)
+            .where(ServiceTicket.ticket_date < before)
+            .order_by(ServiceTicket.ticket_date, ServiceTicket.ticket_id)
+            .limit(batch_size)
+        ).all()
+        if not tickets:
+            break
+        try:
+            _move_batch(session, tickets, schema, partitions)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        moved += len(tickets)
+        if on_batch is not None:
+            on_batch(len(tickets))
+
+    archived_before = state.archived_before if state is not None else None
+    _set_state(session, archived_before=max(before, archived_before) if archived_before else before, pending_before=None)
+    session.commit()
+    return moved
+
+
+# Latest date that can be in the archive, None if nothing has been archived
+def archive_boundary(session):
+    state = _state(session)
+    if state is None:
+        return None
+    dates = [value for value in (state.archived_before, state.pending_before) if value is not None]
+    return max(dates) if dates else None
+
+
+def _archive_years(session, start, end):
+    boundary = archive_boundary(session)
+    if boundary is None or (start is not None and start >= boundary):
+        return []
+    end = boundary if end is None else min(end, boundary)
+    years = []
+    for year, schema in sorted(_partition_schemas(session).items()):
+        if start is not None and datetime.datetime(year + 1, 1, 1) <= start:
+            continue
+        if datetime.datetime(year, 1, 1) >= end:
+            continue
+        years.append((year, schema))
+    return years
+
+
+# (tickets, mechanics) archive tables of the years overlapping start <= ticket_date < end, none
+# when the archive has never been installed. The table check is bound like a SELECT, so a routing
+# session (see replicas.py) makes it on the connection its reads use.
+def partition_tables(session, start=None, end=None):
+    if not inspect(session.connection(bind_arguments={'clause': select(archive_state)})).has_table(archive_state.name):
+        return []
+    return [archive_tables(year, schema) for year, schema in _archive_years(session, start, end)]
+
+
+def _ticket_select(table, start, end, customer_id, vin, archived):
+    statement = select(
+        table.c.ticket_id, table.c.vin, table.c.customer_id, table.c.ticket_date,
+        table.c.service_description, table.c.cost, literal(archived).label('archived'),
+    )
+    if start is not None:
+        statement = statement.where(table.c.ticket_date >= start)
+    if end is not None:
+        statement = statement.where(table.c.ticket_date < end)
+    if customer_id is not None:
+        statement = statement.where(table.c.customer_id == customer_id)
+    if vin is not None:
+        statement = statement.where(table.c.vin == vin)
+    return statement
+
+
+# Tickets with start <= ticket_date < end from the live table and whichever archive years the
+# range needs, as rows ordered by date. Either end of the range can be left open.
+def read_tickets_between(session, start=None, end=None, customer_id=None, vin=None, limit=None):
+    start, end = _as_datetime(start), _as_datetime(end)
+    selects = [_ticket_select(ServiceTicket.__table__, start, end, customer_id, vin, False)]
+    for year, schema in _archive_years(session, start, end):
+        tickets, _ = archive_tables(year, schema)
+        selects.append(_ticket_select(tickets, start, end, customer_id, vin, True))
+    if len(selects) == 1:
+        statement = selects[0].order_by(ServiceTicket.ticket_date, ServiceTicket.ticket_id)
+    else:
+        combined = union_all(*selects).subquery()
+        statement = select(combined).order_by(combined.c.ticket_date, combined.c.ticket_id)
+    return session.execute(statement.limit(limit)).all()
+
+
+def count_archived_tickets(session):
+    return session.scalar(select(func.coalesce(func.sum(archive_partitions.c.ticket_count), 0)))
+
+
+# Mechanic ids assigned to an archived ticket, the date picks the year to look in
+def archived_ticket_mechanics(session, ticket_id, ticket_date):
+    year = _as_datetime(ticket_date).year
+    partitions = _partition_schemas(session)
+    if year not in partitions:
+        return []
+    _, mechanics = archive_tables(year, partitions[year])
+    return session.scalars(
+        select(mechanics.c.mechanic_id).where(mechanics.c.service_ticket_id == ticket_id).order_by(mechanics.c.mechanic_id)
+    ).all()
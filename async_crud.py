@@ -0,0 +1,288 @@
+import contextlib
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import practice1
+from practice1 import Customer, Vehicle, Mechanic, ServiceTicket, ServiceMechanic, DEFAULT_DATABASE_URL, DEFAULT_YIELD_PER
+
+# The helpers below run the synchronous helpers from practice1 on the AsyncSession's underlying
+# Session through run_sync, so both layers share one implementation and behave the same.
+# Only the iter_* generators are native, since streaming has to await each batch.
+
+# Drivers used when a plain URL such as sqlite:///shop.db is configured
+ASYNC_DRIVERS = {
+    'sqlite': 'aiosqlite',
+    'postgresql': 'asyncpg',
+    'mysql': 'aiomysql',
+}
+
+
+def make_async_engine(config=None, default_url=DEFAULT_DATABASE_URL, **overrides):
+    url, kwargs, pragmas = practice1._engine_options(config, default_url, overrides)
+    if '+' not in url.drivername and url.drivername in ASYNC_DRIVERS:
+        url = url.set(drivername=f'{url.drivername}+{ASYNC_DRIVERS[url.drivername]}')
+    engine = create_async_engine(url, **kwargs)
+    if pragmas:
+        practice1._install_sqlite_pragmas(engine.sync_engine, pragmas)
+    return engine
+
+
+# Objects can't lazy load attributes outside of run_sync, so keep them usable after commit
+def make_async_sessionmaker(engine):
+    return async_sessionmaker(bind=engine, expire_on_commit=False)
+
+
+# Async counterpart of practice1.unit_of_work(), the helpers check the flag on the underlying Session
+@contextlib.asynccontextmanager
+async def unit_of_work(session):
+    depth = practice1._begin_unit_of_work(session.sync_session)
+    try:
+        yield session
+        if depth == 0:
+            await session.commit()
+    except BaseException:
+        if depth == 0:
+            await session.rollback()
+        raise
+    finally:
+        practice1._end_unit_of_work(session.sync_session, depth)
+
+
+# Same steps as practice1.ensure_schema(): tables, indexes, archive, change log, search and the
+# schema version, all in one transaction
+async def init_schema(engine, force=False):
+    async with engine.begin() as conn:
+        return await conn.run_sync(practice1.ensure_schema, force)
+
+
+async def _iter_rows(session, model, key_columns, batch_size=DEFAULT_YIELD_PER):
+    statement = select(model).order_by(*key_columns).execution_options(yield_per=batch_size)
+    result = await session.stream_scalars(statement)
+    async for row in result:
+        yield row
+
+
+async def _list_rows(session, model, key_columns, columns=None, after=None, limit=None, batch_size=DEFAULT_YIELD_PER):
+    table = model.__table__
+    keys = [table.c[column.key] for column in key_columns]
+    statement = select(*practice1._projection(model, columns)).order_by(*keys)
+    if after is not None:
+        statement = statement.where(keys[0] > after if len(keys) == 1 else tuple_(*keys) > tuple(after))
+    if limit is not None:
+        statement = statement.limit(limit)
+    result = await session.stream(statement.execution_options(yield_per=batch_size))
+    async for row in result:
+        yield row
+
+
+async def create_customer(session, first_name, last_name, phone, email, address=None):
+    return await session.run_sync(practice1.create_customer, first_name, last_name, phone, email, address)
+
+
+async def read_customers(session, after=None, limit=None):
+    return await session.run_sync(practice1.read_customers, after, limit)
+
+
+def iter_customers(session, batch_size=DEFAULT_YIELD_PER):
+    return _iter_rows(session, Customer, (Customer.customer_id,), batch_size)
+
+
+def list_customers(session, columns=None, after=None, limit=None, batch_size=DEFAULT_YIELD_PER):
+    return _list_rows(session, Customer, (Customer.customer_id,), columns, after, limit, batch_size)
+
+
+async def get_customer(session, customer_id):
+    return await session.run_sync(practice1.get_customer, customer_id)
+
+
+async def get_customer_by_email(session, email):
+    return await session.run_sync(practice1.get_customer_by_email, email)
+
+
+async def get_customer_by_phone(session, phone):
+    return await session.run_sync(practice1.get_customer_by_phone, phone)
+
+
+async def update_customer(session, customer_id, **kwargs):
+    return await session.run_sync(practice1.update_customer, customer_id, **kwargs)
+
+
+async def update_customers(session, customer_ids=None, where=None, **kwargs):
+    return await session.run_sync(practice1.update_customers, customer_ids, where, **kwargs)
+
+
+async def delete_customer(session, customer_id):
+    return await session.run_sync(practice1.delete_customer, customer_id)
+
+
+async def delete_customers(session, customer_ids=None, where=None):
+    return await session.run_sync(practice1.delete_customers, customer_ids, where)
+
+
+async def create_vehicle(session, vin, customer_id, make, model, year, license_plate):
+    return await session.run_sync(practice1.create_vehicle, vin, customer_id, make, model, year, license_plate)
+
+
+async def read_vehicles(session, after=None, limit=None):
+    return await session.run_sync(practice1.read_vehicles, after, limit)
+
+
+def iter_vehicles(session, batch_size=DEFAULT_YIELD_PER):
+    return _iter_rows(session, Vehicle, (Vehicle.vin,), batch_size)
+
+
+def list_vehicles(session, columns=None, after=None, limit=None, batch_size=DEFAULT_YIELD_PER):
+    return _list_rows(session, Vehicle, (Vehicle.vin,), columns, after, limit, batch_size)
+
+
+async def get_vehicle(session, vin):
+    return await session.run_sync(practice1.get_vehicle, vin)
+
+
+async def get_vehicle_by_license_plate(session, license_plate):
+    return await session.run_sync(practice1.get_vehicle_by_license_plate, license_plate)
+
+
+async def update_vehicle(session, vin, **kwargs):
+    return await session.run_sync(practice1.update_vehicle, vin, **kwargs)
+
+
+async def update_vehicles(session, vins=None, where=None, **kwargs):
+    return await session.run_sync(practice1.update_vehicles, vins, where, **kwargs)
+
+
+async def delete_vehicle(session, vin):
+    return await session.run_sync(practice1.delete_vehicle, vin)
+
+
+async def delete_vehicles(session, vins=None, where=None):
+    return await session.run_sync(practice1.delete_vehicles, vins, where)
+
+
+async def create_mechanic(session, first_name, last_name, email, phone=None, salary=None):
+    return await session.run_sync(practice1.create_mechanic, first_name, last_name, email, phone, salary)
+
+
+async def read_mechanics(session, after=None, limit=None):
+    return await session.run_sync(practice1.read_mechanics, after, limit)
+
+
+def iter_mechanics(session, batch_size=DEFAULT_YIELD_PER):
+    return _iter_rows(session, Mechanic, (Mechanic.mechanic_id,), batch_size)
+
+
+def list_mechanics(session, columns=None, after=None, limit=None, batch_size=DEFAULT_YIELD_PER):
+    return _list_rows(session, Mechanic, (Mechanic.mechanic_id,), columns, after, limit, batch_size)
+
+
+async def get_mechanic(session, mechanic_id):
+    return await session.run_sync(practice1.get_mechanic, mechanic_id)
+
+
+async def get_mechanic_by_email(session, email):
+    return await session.run_sync(practice1.get_mechanic_by_email, email)
+
+
+async def update_mechanic(session, mechanic_id, **kwargs):
+    return await session.run_sync(practice1.update_mechanic, mechanic_id, **kwargs)
+
+
+async def update_mechanics(session, mechanic_ids=None, where=None, **kwargs):
+    return await session.run_sync(practice1.update_mechanics, mechanic_ids, where, **kwargs)
+
+
+async def delete_mechanic(session, mechanic_id):
+    return await session.run_sync(practice1.delete_mechanic, mechanic_id)
+
+
+async def delete_mechanics(session, mechanic_ids=None, where=None):
+    return await session.run_sync(practice1.delete_mechanics, mechanic_ids, where)
+
+
+async def create_service_ticket(session, vin, customer_id, ticket_date, service_description, cost):
+    return await session.run_sync(practice1.create_service_ticket, vin, customer_id, ticket_date, service_description, cost)
+
+
+async def read_service_tickets(session, after=None, limit=None):
+    return await session.run_sync(practice1.read_service_tickets, after, limit)
+
+
+def iter_service_tickets(session, batch_size=DEFAULT_YIELD_PER):
+    return _iter_rows(session, ServiceTicket, (ServiceTicket.ticket_id,), batch_size)
+
+
+def list_service_tickets(session, columns=None, after=None, limit=None, batch_size=DEFAULT_YIELD_PER):
+    return _list_rows(session, ServiceTicket, (ServiceTicket.ticket_id,), columns, after, limit, batch_size)
+
+
+async def update_service_ticket(session, ticket_id, **kwargs):
+    return await session.run_sync(practice1.update_service_ticket, ticket_id, **kwargs)
+
+
+async def update_service_tickets(session, ticket_ids=None, where=None, **kwargs):
+    return await session.run_sync(practice1.update_service_tickets, ticket_ids, where, **kwargs)
+
+
+async def delete_service_ticket(session, ticket_id):
+    return await session.run_sync(practice1.delete_service_ticket, ticket_id)
+
+
+async def delete_service_tickets(session, ticket_ids=None, where=None):
+    return await session.run_sync(practice1.delete_service_tickets, ticket_ids, where)
+
+
+async def create_service_mechanic(session, service_ticket_id, mechanic_id):
+    return await session.run_sync(practice1.create_service_mechanic, service_ticket_id, mechanic_id)
+
+
+async def read_service_mechanics(session, after=None, limit=None):
+    return await session.run_sync(practice1.read_service_mechanics, after, limit)
+
+
+def iter_service_mechanics(session, batch_size=DEFAULT_YIELD_PER):
+    return _iter_rows(session, ServiceMechanic, (ServiceMechanic.service_ticket_id, ServiceMechanic.mechanic_id), batch_size)
+
+
+def list_service_mechanics(session, columns=None, after=None, limit=None, batch_size=DEFAULT_YIELD_PER):
+    return _list_rows(session, ServiceMechanic, (ServiceMechanic.service_ticket_id, ServiceMechanic.mechanic_id), columns, after, limit, batch_size)
+
+
+async def update_service_mechanic(session, service_ticket_id, mechanic_id, **kwargs):
+    return await session.run_sync(practice1.update_service_mechanic, service_ticket_id, mechanic_id, **kwargs)
+
+
+async def update_service_mechanics(session, keys=None, where=None, **kwargs):
+    return await session.run_sync(practice1.update_service_mechanics, keys, where, **kwargs)
+
+
+async def delete_service_mechanic(session, service_ticket_id, mechanic_id):
+    return await session.run_sync(practice1.delete_service_mechanic, service_ticket_id, mechanic_id)
+
+
+async def delete_service_mechanics(session, keys=None, where=None):
+    return await session.run_sync(practice1.delete_service_mechanics, keys, where)
+
+
+async def open_ticket(session, vin, customer_id, service_description, cost, mechanic_ids=(), ticket_date=None):
+    return await session.run_sync(practice1.open_ticket, vin, customer_id, service_description, cost, mechanic_ids, ticket_date)
+
+
+async def get_customer_history(session, customer_id):
+    return await session.run_sync(practice1.get_customer_history, customer_id)
+
+
+async def get_vehicle_history(session, vin):
+    return await session.run_sync(practice1.get_vehicle_history, vin)
+
+
+async def get_daily_revenue(session, day=None):
+    return await session.run_sync(practice1.get_daily_revenue, day)
+
+
+async def get_mechanic_ticket_count(session, mechanic_id):
+    return await session.run_sync(practice1.get_mechanic_ticket_count, mechanic_id)
+
+
+async def rebuild_summaries(session):
+    return await session.run_sync(practice1.rebuild_summaries)
@@ -0,0 +1,542 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from decimal import Decimal
+
+import sqlalchemy
+from sqlalchemy import insert, select
+
+import practice1
+import reporting
+from bulk_import import VIN_TRANSLITERATION, vin_check_digit
+from practice1 import Customer, Mechanic, ServiceMechanic, ServiceTicket, Vehicle
+
+# Reproducible benchmark harness for the CRUD layer. A seeded generator builds a realistic data
+# set, then each helper is timed operation by operation and summarised as ops/sec and p50/p99.
+#
+#   python benchmark.py --scale 100k --output results.json --baseline previous.json
+
+SCALES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+INSERT_BATCH_SIZE = 5000
+
+# Generated history ends here so data sets don't depend on the day they were built
+REFERENCE_DATE = datetime.datetime(2024, 1, 1)
+HISTORY_DAYS = 3 * 365
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+               'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Carlos', 'Maria']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+              'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin']
+STREETS = ['Main St', 'Oak Ave', 'Maple Dr', 'Cedar Ln', 'Park Blvd', 'Elm St', 'Washington Ave', 'Lake Rd']
+# (world manufacturer identifier, make, models)
+MANUFACTURERS = [
+    ('1HG', 'Honda', ['Civic', 'Accord', 'CR-V']),
+    ('JTD', 'Toyota', ['Corolla', 'Camry', 'RAV4']),
+    ('1FT', 'Ford', ['F-150', 'Ranger', 'Escape']),
+    ('1G1', 'Chevrolet', ['Malibu', 'Silverado', 'Equinox']),
+    ('WBA', 'BMW', ['330i', 'X3', 'X5']),
+    ('5YJ', 'Tesla', ['Model 3', 'Model Y']),
+]
+SERVICES = [
+    ('Oil change', 40, 90), ('Tire rotation', 25, 60), ('Brake pads replaced', 150, 400), ('Battery replacement', 120, 250),
+    ('Wheel alignment', 80, 150), ('Coolant flush', 90, 180), ('Transmission service', 200, 450), ('Timing belt replaced', 400, 900),
+    ('Check engine light diagnosis', 100, 160), ('Air filter replaced', 20, 60), ('Spark plugs replaced', 120, 300),
+]
+# Characters allowed in a VIN (no I, O or Q) and model year codes indexed from 2000
+VIN_CHARACTERS = ''.join(VIN_TRANSLITERATION)
+MODEL_YEAR_CODES = 'Y123456789ABCDEFGHJKLMNPRSTVWX'
+
+
+def parse_scale(value):
+    value = value.strip().lower()
+    return SCALES[value] if value in SCALES else int(value)
+
+
+def make_vin(rng, wmi, year, serial):
+    vds = ''.join(rng.choice(VIN_CHARACTERS) for _ in range(5))
+    vin = f'{wmi}{vds}0{MODEL_YEAR_CODES[(year - 2000) % 30]}{rng.choice(VIN_CHARACTERS)}{serial:06d}'
+    return vin[:8] + vin_check_digit(vin) + vin[9:]
+
+
+# Row counts for a scale, which is the number of service tickets
+def dataset_sizes(scale):
+    return {
+        'customers': max(1, scale // 10),
+        'vehicles': max(1, scale // 8),
+        'mechanics': max(5, scale // 1000),
+        'service_tickets': scale,
+    }
+
+
+def _customers(rng, count):
+    for i in range(1, count + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield {
+            'customer_id': i,
+            'first_name': first,
+            'last_name': last,
+            'phone': f'555-{i // 10000:03d}-{i % 10000:04d}',
+            'email': f'{first.lower()}.{last.lower()}{i}@example.com',
+            'address': f'{rng.randint(1, 9999)} {rng.choice(STREETS)}',
+        }
+
+
+def _mechanics(rng, count):
+    for i in range(1, count + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield {
+            'mechanic_id': i,
+            'first_name': first,
+            'last_name': last,
+            'email': f'{first.lower()}.{last.lower()}{i}@shop.example.com',
+            'phone': f'555-900-{i:04d}',
+            'salary': Decimal(rng.randrange(40000, 95000, 500)),
+        }
+
+
+def _vehicles(rng, count, customers):
+    for i in range(count):
+        wmi, make, models = rng.choice(MANUFACTURERS)
+        year = rng.randint(2000, 2023)
+        yield {
+            'vin': make_vin(rng, wmi, year, i),
+            # Every customer owns at least one vehicle, the rest are spread at random
+            'customer_id': i + 1 if i < customers else rng.randint(1, customers),
+            'make': make,
+            'model': rng.choice(models),
+            'year': year,
+            'license_plate': f'{chr(65 + i // 100000 % 26)}{chr(65 + i // 10000 % 10)}{i % 10000:04d}{i // 2600000 or ""}',
+        }
+
+
+def _tickets(rng, count, vehicles):
+    for i in range(1, count + 1):
+        vin, customer_id = rng.choice(vehicles)
+        description, low, high = rng.choice(SERVICES)
+        yield {
+            'ticket_id': i,
+            'vin': vin,
+            'customer_id': customer_id,
+            'ticket_date': REFERENCE_DATE - datetime.timedelta(days=rng.randrange(HISTORY_DAYS), minutes=rng.randrange(8 * 60)),
+            'service_description': description,
+            'cost': Decimal(rng.randrange(low * 100, high * 100)) / 100,
+        }
+
+
+def _assignments(rng, tickets, mechanics):
+    for ticket_id in range(1, tickets + 1):
+        for mechanic_id in rng.sample(range(1, mechanics + 1), rng.choice((1, 1, 1, 2, 2, 3))):
+            yield {'service_ticket_id': ticket_id, 'mechanic_id': mechanic_id}
+
+
+def _insert_all(session, table, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= INSERT_BATCH_SIZE:
+            session.execute(insert(table), batch)
+            session.commit()
+            batch = []
+    if batch:
+        session.execute(insert(table), batch)
+        session.commit()
+
+
+# Fills an empty database; the same scale and seed always produce the same rows
+def generate_dataset(session, scale, seed=0):
+    rng = random.Random(seed)
+    sizes = dataset_sizes(scale)
+    _insert_all(session, Customer.__table__, _customers(rng, sizes['customers']))
+    _insert_all(session, Mechanic.__table__, _mechanics(rng, sizes['mechanics']))
+    vehicles = list(_vehicles(rng, sizes['vehicles'], sizes['customers']))
+    _insert_all(session, Vehicle.__table__, vehicles)
+    owners = [(vehicle['vin'], vehicle['customer_id']) for vehicle in vehicles]
+    _insert_all(session, ServiceTicket.__table__, _tickets(rng, sizes['service_tickets'], owners))
+    _insert_all(session, ServiceMechanic.__table__, _assignments(rng, sizes['service_tickets'], sizes['mechanics']))
+    practice1.rebuild_summaries(session)
+    return sizes
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    total = sum(timings)
+    return {
+        'ops': len(timings),
+        'ops_per_sec': len(timings) / total if total else float('inf'),
+        'p50_ms': percentile(timings, 0.50) * 1000,
+        'p99_ms': percentile(timings, 0.99) * 1000,
+    }
+
+
+# Each benchmark is (name, operation, setup): operation(session, rng, n) performs the n-th call and
+# setup(session, rng, operations), when given, adds or loads the rows the calls work on untimed, so
+# every benchmark runs on its own (e.g. with --only)
+def _benchmarks(sizes, seed):
+    vehicles = []  # (vin, customer_id) pairs from the data set
+    keys = {}  # rows added by the setups, per benchmark
+
+    def load_vehicles(session, rng, operations):
+        vehicles[:] = session.execute(select(Vehicle.vin, Vehicle.customer_id).order_by(Vehicle.vin).limit(operations)).all()
+
+    def add_tickets(session, rng, operations):
+        load_vehicles(session, rng, operations)
+        with practice1.unit_of_work(session):
+            tickets = [
+                practice1.create_service_ticket(session, *vehicles[n % len(vehicles)], REFERENCE_DATE, 'Inspection', Decimal('25.00'))
+                for n in range(operations)
+            ]
+        return [ticket.ticket_id for ticket in tickets]
+
+    def create_customer(session, rng, n):
+        practice1.create_customer(session, 'Bench', 'Customer', f'555-000-{n:06d}', f'bench{n}@example.com', '1 Bench St')
+
+    def create_vehicle(session, rng, n):
+        wmi, make, models = rng.choice(MANUFACTURERS)
+        vin = make_vin(rng, wmi, 2020, 900000 + n)
+        practice1.create_vehicle(session, vin, rng.randint(1, sizes['customers']), make, models[0], 2020, f'BENCH{n}')
+
+    def create_mechanic(session, rng, n):
+        practice1.create_mechanic(session, 'Bench', 'Mechanic', f'bench{n}@shop.example.com', f'555-901-{n:06d}', Decimal('50000'))
+
+    def create_service_ticket(session, rng, n):
+        vin, customer_id = vehicles[n % len(vehicles)]
+        practice1.create_service_ticket(session, vin, customer_id, REFERENCE_DATE, 'Oil change', Decimal('49.99'))
+
+    def setup_create_service_mechanic(session, rng, operations):
+        keys['create_service_mechanic'] = add_tickets(session, rng, operations)
+
+    def create_service_mechanic(session, rng, n):
+        practice1.create_service_mechanic(session, keys['create_service_mechanic'][n], 1 + n % sizes['mechanics'])
+
+    def get_customer(session, rng, n):
+        practice1.get_customer(session, rng.randint(1, sizes['customers']))
+
+    def read_customers_page(session, rng, n):
+        practice1.read_customers(session, after=rng.randint(0, sizes['customers']), limit=100)
+
+    def list_customers_page(session, rng, n):
+        list(practice1.list_customers(session, after=rng.randint(0, sizes['customers']), limit=100))
+
+    # Pages start at a random manufacturer, VINs are keyed by their leading characters
+    def read_vehicles_page(session, rng, n):
+        practice1.read_vehicles(session, after=rng.choice(MANUFACTURERS)[0], limit=100)
+
+    def read_mechanics_page(session, rng, n):
+        practice1.read_mechanics(session, after=rng.randint(0, sizes['mechanics']), limit=100)
+
+    def read_service_tickets_page(session, rng, n):
+        practice1.read_service_tickets(session, after=rng.randint(0, sizes['service_tickets']), limit=100)
+
+    def update_customer(session, rng, n):
+        practice1.update_customer(session, rng.randint(1, sizes['customers']), address=f'{n} Updated Rd')
+
+    def update_vehicle(session, rng, n):
+        practice1.update_vehicle(session, rng.choice(vehicles)[0], license_plate=f'UPD{n}')
+
+    def update_mechanic(session, rng, n):
+        practice1.update_mechanic(session, rng.randint(1, sizes['mechanics']), salary=Decimal(rng.randrange(40000, 95000, 500)))
+
+    def update_service_ticket(session, rng, n):
+        practice1.update_service_ticket(session, rng.randint(1, sizes['service_tickets']), cost=Decimal(rng.randrange(5000, 50000)) / 100)
+
+    def setup_delete_customer(session, rng, operations):
+        with practice1.unit_of_work(session):
+            customers = [
+                practice1.create_customer(session, 'Delete', 'Customer', f'555-002-{n:06d}', f'delete{n}@example.com')
+                for n in range(operations)
+            ]
+        keys['delete_customer'] = [customer.customer_id for customer in customers]
+
+    def delete_customer(session, rng, n):
+        practice1.delete_customer(session, keys['delete_customer'][n])
+
+    def setup_delete_vehicle(session, rng, operations):
+        keys['delete_vehicle'] = []
+        with practice1.unit_of_work(session):
+            for n in range(operations):
+                wmi, make, models = rng.choice(MANUFACTURERS)
+                vin = make_vin(rng, wmi, 2021, 800000 + n)
+                practice1.create_vehicle(session, vin, 1, make, models[0], 2021, f'DEL{n}')
+                keys['delete_vehicle'].append(vin)
+
+    def delete_vehicle(session, rng, n):
+        practice1.delete_vehicle(session, keys['delete_vehicle'][n])
+
+    def setup_delete_mechanic(session, rng, operations):
+        with practice1.unit_of_work(session):
+            mechanics = [
+                practice1.create_mechanic(session, 'Delete', 'Mechanic', f'delete{n}@shop.example.com', salary=Decimal('50000'))
+                for n in range(operations)
+            ]
+        keys['delete_mechanic'] = [mechanic.mechanic_id for mechanic in mechanics]
+
+    def delete_mechanic(session, rng, n):
+        practice1.delete_mechanic(session, keys['delete_mechanic'][n])
+
+    def setup_delete_service_ticket(session, rng, operations):
+        keys['delete_service_ticket'] = add_tickets(session, rng, operations)
+
+    def delete_service_ticket(session, rng, n):
+        practice1.delete_service_ticket(session, keys['delete_service_ticket'][n])
+
+    def setup_delete_service_mechanic(session, rng, operations):
+        tickets = add_tickets(session, rng, operations)
+        with practice1.unit_of_work(session):
+            for n, ticket_id in enumerate(tickets):
+                practice1.create_service_mechanic(session, ticket_id, 1 + n % sizes['mechanics'])
+        keys['delete_service_mechanic'] = tickets
+
+    def delete_service_mechanic(session, rng, n):
+        practice1.delete_service_mechanic(session, keys['delete_service_mechanic'][n], 1 + n % sizes['mechanics'])
+
+    def tickets_for_customer(session, rng, n):
+        customer_id = rng.randint(1, sizes['customers'])
+        session.execute(select(ServiceTicket).where(ServiceTicket.customer_id == customer_id).order_by(ServiceTicket.ticket_date)).all()
+
+    def customer_history(session, rng, n):
+        customer = practice1.get_customer_history(session, rng.randint(1, sizes['customers']))
+        for vehicle in customer.vehicles:
+            for ticket in vehicle.service_tickets:
+                [assignment.mechanic.last_name for assignment in ticket.mechanics]
+
+    def lazy_customer_traversal(session, rng, n):
+        customer = session.get(Customer, rng.randint(1, sizes['customers']))
+        for vehicle in customer.vehicles:
+            for ticket in vehicle.service_tickets:
+                [assignment.mechanic.last_name for assignment in ticket.mechanics]
+
+    def revenue_by_month(session, rng, n):
+        start = REFERENCE_DATE - datetime.timedelta(days=rng.randrange(HISTORY_DAYS))
+        reporting.revenue_by_month(session, start, start + datetime.timedelta(days=90))
+
+    def daily_revenue(session, rng, n):
+        practice1.get_daily_revenue(session, (REFERENCE_DATE - datetime.timedelta(days=rng.randrange(HISTORY_DAYS))).date())
+
+    return [
+        ('create_customer', create_customer, None),
+        ('create_vehicle', create_vehicle, None),
+        ('create_mechanic', create_mechanic, None),
+        ('create_service_ticket', create_service_ticket, load_vehicles),
+        ('create_service_mechanic', create_service_mechanic, setup_create_service_mechanic),
+        ('get_customer', get_customer, None),
+        ('read_customers_page', read_customers_page, None),
+        ('list_customers_page', list_customers_page, None),
+        ('read_vehicles_page', read_vehicles_page, None),
+        ('read_mechanics_page', read_mechanics_page, None),
+        ('read_service_tickets_page', read_service_tickets_page, None),
+        ('update_customer', update_customer, None),
+        ('update_vehicle', update_vehicle, load_vehicles),
+        ('update_mechanic', update_mechanic, None),
+        ('update_service_ticket', update_service_ticket, None),
+        ('delete_customer', delete_customer, setup_delete_customer),
+        ('delete_vehicle', delete_vehicle, setup_delete_vehicle),
+        ('delete_mechanic', delete_mechanic, setup_delete_mechanic),
+        ('delete_service_ticket', delete_service_ticket, setup_delete_service_ticket),
+        ('delete_service_mechanic', delete_service_mechanic, setup_delete_service_mechanic),
+        ('tickets_for_customer', tickets_for_customer, None),
+        ('customer_history', customer_history, None),
+        ('lazy_customer_traversal', lazy_customer_traversal, None),
+        ('revenue_by_month', revenue_by_month, None),
+        ('daily_revenue', daily_revenue, None),
+    ]
+
+
+def run_benchmarks(engine, scale, seed=0, operations=200, only=None, generate=True):
+    Session = practice1.make_sessionmaker(engine)
+    started = time.perf_counter()
+    if generate:
+        session = Session()
+        sizes = generate_dataset(session, scale, seed)
+        session.close()
+    else:
+        sizes = dataset_sizes(scale)
+    generate_seconds = time.perf_counter() - started
+
+    results = {}
+    for name, operation, setup in _benchmarks(sizes, seed):
+        if only and name not in only:
+            continue
+        rng = random.Random(f'{seed}-{name}')
+        session = Session()
+        if setup is not None:
+            setup(session, rng, operations)
+            session.expunge_all()
+        timings = []
+        for n in range(operations):
+            op_started = time.perf_counter()
+            operation(session, rng, n)
+            timings.append(time.perf_counter() - op_started)
+            # Keep each operation cold with respect to the identity map
+            session.expunge_all()
+        session.close()
+        results[name] = summarize(timings)
+
+    return {
+        'scale': scale,
+        'seed': seed,
+        'operations': operations,
+        'sizes': sizes,
+        'generate_seconds': generate_seconds,
+        'database': engine.dialect.name,
+        'python': platform.python_version(),
+        'sqlalchemy': sqlalchemy.__version__,
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'results': results,
+    }
+
+
+LISTINGS = ['customers', 'vehicles', 'mechanics', 'service_tickets', 'service_mechanics']
+
+
+def _measure_listing(session, rows_for, columns):
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows = list(rows_for(session))
+    for row in rows:
+        tuple(getattr(row, name) for name in columns)
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    count = len(rows)
+    del rows
+    session.expunge_all()
+    return {'rows': count, 'seconds': seconds, 'peak_bytes': peak, 'bytes_per_row': peak / count if count else 0.0}
+
+
+# Full listings through the ORM (iter_*) and through the Core projections (list_*), holding every
+# row at once so the peak memory reflects the per-row cost
+def benchmark_listings(engine, listings=LISTINGS):
+    session = practice1.make_sessionmaker(engine)()
+    results = {}
+    for name in listings:
+        columns = practice1.LISTING_COLUMNS[name]
+        results[name] = {
+            'orm': _measure_listing(session, getattr(practice1, f'iter_{name}'), columns),
+            'projection': _measure_listing(session, getattr(practice1, f'list_{name}'), columns),
+        }
+    session.close()
+    return results
+
+
+def format_listings(listings):
+    lines = [f"{'listing':<20}{'rows':>9}{'ORM ms':>10}{'tuple ms':>10}{'ORM KiB':>10}{'tuple KiB':>11}{'speedup':>9}{'memory':>8}"]
+    for name, result in listings.items():
+        orm, projection = result['orm'], result['projection']
+        lines.append(
+            f"{name:<20}{orm['rows']:>9}{orm['seconds'] * 1000:>10.1f}{projection['seconds'] * 1000:>10.1f}"
+            f"{orm['peak_bytes'] / 1024:>10.0f}{projection['peak_bytes'] / 1024:>11.0f}"
+            f"{orm['seconds'] / projection['seconds']:>8.1f}x{orm['peak_bytes'] / projection['peak_bytes']:>7.1f}x"
+        )
+    return '\n'.join(lines)
+
+
+# Commit-heavy inserts and full reads against a file database per SQLite pragma profile (see
+# practice1.SQLITE_PRAGMA_PROFILES); in-memory databases have no journal to tune
+def benchmark_pragma_profiles(directory, rows=2000, commit_every=50, reads=5):
+    results = {}
+    for profile in practice1.SQLITE_PRAGMA_PROFILES:
+        engine = practice1.make_engine({'database_url': 'sqlite:///' + os.path.join(directory, f'{profile}.db'), 'sqlite_profile': profile})
+        practice1.init_schema(engine)
+        session = practice1.make_sessionmaker(engine)()
+        started = time.perf_counter()
+        for i in range(rows):
+            session.add(Customer(first_name='First', last_name='Last', phone=f'555-{i:05d}', email=f'c{i}@example.com'))
+            if i % commit_every == commit_every - 1:
+                session.commit()
+        session.commit()
+        insert_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        for _ in range(reads):
+            read = sum(1 for _ in practice1.iter_customers(session))
+            session.expunge_all()
+        read_seconds = time.perf_counter() - started
+        session.close()
+        engine.dispose()
+        results[profile] = {'rows': read, 'inserts_per_sec': rows / insert_seconds, 'reads_per_sec': reads * read / read_seconds}
+    return results
+
+
+def format_pragma_profiles(profiles):
+    lines = [f"{'profile':<12}{'inserts/s':>12}{'reads/s':>12}"]
+    for profile, result in profiles.items():
+        lines.append(f"{profile:<12}{result['inserts_per_sec']:>12.0f}{result['reads_per_sec']:>12.0f}")
+    return '\n'.join(lines)
+
+
+def save_results(results, path):
+    with open(path, 'w') as handle:
+        json.dump(results, handle, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    with open(path) as handle:
+        return json.load(handle)
+
+
+# Throughput of each benchmark relative to the baseline, > 1.0 is faster
+def compare_results(current, baseline):
+    ratios = {}
+    for name, result in current['results'].items():
+        previous = baseline['results'].get(name)
+        if previous and previous['ops_per_sec']:
+            ratios[name] = result['ops_per_sec'] / previous['ops_per_sec']
+    return ratios
+
+
+def format_results(results, ratios=None):
+    lines = [f"scale={results['scale']} seed={results['seed']} operations={results['operations']} generated in {results['generate_seconds']:.1f}s"]
+    lines.append(f"{'benchmark':<28}{'ops/sec':>12}{'p50 ms':>10}{'p99 ms':>10}" + (f"{'vs baseline':>14}" if ratios is not None else ''))
+    for name, result in results['results'].items():
+        line = f"{name:<28}{result['ops_per_sec']:>12.1f}{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+        if ratios is not None:
+            line += f"{ratios[name]:>13.2f}x" if name in ratios else f"{'-':>14}"
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the practice1 CRUD helpers against a generated data set')
+    parser.add_argument('--scale', default='10k', help='Number of service tickets: 10k, 100k, 1M or a number')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--operations', type=int, default=200, help='Calls timed per benchmark')
+    parser.add_argument('--database', help='Database URL, should point at an empty database (default in-memory SQLite)')
+    parser.add_argument('--only', nargs='*', help='Run only these benchmarks')
+    parser.add_argument('--listings', action='store_true', help='Also compare full ORM listings against list_* projections')
+    parser.add_argument('--pragma-profiles', action='store_true', help='Also compare insert and read throughput of the SQLite pragma profiles')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare against results saved by an earlier run')
+    args = parser.parse_args(argv)
+
+    engine = practice1.make_engine(database_url=args.database)  # in-memory unless configured
+    practice1.init_schema(engine)
+    results = run_benchmarks(engine, parse_scale(args.scale), seed=args.seed, operations=args.operations, only=args.only)
+    ratios = compare_results(results, load_results(args.baseline)) if args.baseline else None
+    print(format_results(results, ratios))
+    if args.listings:
+        results['listings'] = benchmark_listings(engine)
+        print(format_listings(results['listings']))
+    if args.pragma_profiles:
+        with tempfile.TemporaryDirectory() as directory:
+            results['pragma_profiles'] = benchmark_pragma_profiles(directory)
+        print(format_pragma_profiles(results['pragma_profiles']))
+    if args.output:
+        save_results(results, args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
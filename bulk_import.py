@@ -0,0 +1,265 @@
+import csv
+import datetime
+import json
+import os
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import insert, DateTime, Integer, Numeric, String
+from sqlalchemy.exc import SQLAlchemyError
+
+from practice1 import Base, _add_mechanic_ticket_counts, _add_ticket_summaries
+
+DEFAULT_BATCH_SIZE = 1000
+
+IMPORTABLE_TABLES = ('customers', 'vehicles', 'mechanics', 'service_tickets', 'service_mechanics')
+
+
+@dataclass
+class RejectedRow:
+    row_number: int
+    error: str
+    data: object
+
+
+@dataclass
+class BatchStats:
+    batch_number: int
+    rows: int
+    inserted: int
+    rejected: int
+    seconds: float
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else float('inf')
+
+
+@dataclass
+class ImportReport:
+    table_name: str
+    batches: list = field(default_factory=list)
+    rejects: list = field(default_factory=list)
+
+    @property
+    def rows(self):
+        return sum(batch.rows for batch in self.batches)
+
+    @property
+    def inserted(self):
+        return sum(batch.inserted for batch in self.batches)
+
+    @property
+    def rejected(self):
+        return len(self.rejects)
+
+    @property
+    def seconds(self):
+        return sum(batch.seconds for batch in self.batches)
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else float('inf')
+
+
+# VIN check digit (position 9) as defined for North American VINs
+VIN_TRANSLITERATION = dict(zip('ABCDEFGHJKLMNPRSTUVWXYZ', [1, 2, 3, 4, 5, 6, 7, 8, 1, 2, 3, 4, 5, 7, 9, 2, 3, 4, 5, 6, 7, 8, 9]))
+VIN_TRANSLITERATION.update((str(digit), digit) for digit in range(10))
+VIN_WEIGHTS = (8, 7, 6, 5, 4, 3, 2, 10, 0, 9, 8, 7, 6, 5, 4, 3, 2)
+
+
+def vin_check_digit(vin):
+    total = sum(VIN_TRANSLITERATION[char] * weight for char, weight in zip(vin.upper(), VIN_WEIGHTS))
+    remainder = total % 11
+    return 'X' if remainder == 10 else str(remainder)
+
+
+# The check digit is only mandatory for vehicles built for North America (world manufacturer
+# identifiers starting 1-5); elsewhere position 9 is free, so only length and characters count
+VIN_CHECK_DIGIT_REGIONS = '12345'
+
+
+def is_valid_vin(vin):
+    vin = vin.strip().upper()
+    if len(vin) != 17 or any(char not in VIN_TRANSLITERATION for char in vin):
+        return False
+    return vin[0] not in VIN_CHECK_DIGIT_REGIONS or vin[8] == vin_check_digit(vin)
+
+
+def normalize_vin(value):
+    vin = value.strip().upper()
+    if not is_valid_vin(vin):
+        raise ValueError(f'invalid VIN {value!r}')
+    return vin
+
+
+# Applied by column name after type coercion, so `import` and the loader accept and reject the same values
+COLUMN_NORMALIZERS = {'vin': normalize_vin}
+
+
+def get_table(table_name):
+    if table_name not in IMPORTABLE_TABLES:
+        raise ValueError(f'Unknown table {table_name!r}, expected one of {", ".join(IMPORTABLE_TABLES)}')
+    return Base.metadata.tables[table_name]
+
+
+def _coerce_value(column, value):
+    if isinstance(column.type, Integer):
+        return int(value)
+    if isinstance(column.type, Numeric):
+        try:
+            return Decimal(str(value))
+        except InvalidOperation:
+            raise ValueError(f'invalid decimal {value!r}')
+    if isinstance(column.type, DateTime):
+        if isinstance(value, datetime.datetime):
+            return value
+        if isinstance(value, datetime.date):
+            return datetime.datetime.combine(value, datetime.time())
+        return datetime.datetime.fromisoformat(str(value))
+    if isinstance(column.type, String):
+        value = str(value)
+        if column.type.length is not None and len(value) > column.type.length:
+            raise ValueError(f'longer than {column.type.length} characters')
+        return value
+    return value
+
+
+def coerce_row(table, raw):
+    # Readers hand over parse failures as exceptions so they are rejected like any other bad row
+    if isinstance(raw, Exception):
+        raise raw
+    if not isinstance(raw, dict):
+        raise ValueError('expected a mapping of column names to values')
+    values = {}
+    for column in table.columns:
+        value = raw.get(column.name)
+        if isinstance(value, str):
+            value = value.strip()
+            if value == '':
+                value = None
+        if value is None:
+            if column.default is not None:
+                default = column.default
+                values[column.name] = default.arg(None) if default.is_callable else default.arg
+            elif column is table.autoincrement_column:
+                continue
+            elif not column.nullable:
+                raise ValueError(f'{column.name} is required')
+            else:
+                values[column.name] = None
+            continue
+        try:
+            values[column.name] = _coerce_value(column, value)
+            if column.name in COLUMN_NORMALIZERS:
+                values[column.name] = COLUMN_NORMALIZERS[column.name](values[column.name])
+        except (ValueError, TypeError) as exc:
+            raise ValueError(f'{column.name}: {exc}')
+    return values
+
+
+def _execute_inserts(session, table, rows):
+    # executemany needs every parameter set to share the same keys, e.g. rows with and without an explicit id
+    groups = {}
+    for values in rows:
+        groups.setdefault(tuple(values), []).append(values)
+    for group in groups.values():
+        session.execute(insert(table), group)
+
+
+# Keeps the dashboard summary tables in step, in the same transaction as the inserted rows
+def _add_summaries(session, table, rows):
+    if table.name == 'service_tickets':
+        _add_ticket_summaries(session, [(values['ticket_date'], values['cost']) for values in rows])
+    elif table.name == 'service_mechanics':
+        _add_mechanic_ticket_counts(session, Counter(values['mechanic_id'] for values in rows))
+
+
+# Inserts (row_number, values) pairs in one transaction and returns (inserted, rejects)
+def insert_batch(session, table, rows):
+    try:
+        _execute_inserts(session, table, [values for _, values in rows])
+        _add_summaries(session, table, [values for _, values in rows])
+        session.commit()
+        return len(rows), []
+    except SQLAlchemyError:
+        session.rollback()
+
+    # Something in the batch violated a constraint, retry row by row so only the offenders are rejected
+    inserted, rejects = 0, []
+    for row_number, values in rows:
+        try:
+            _execute_inserts(session, table, [values])
+            _add_summaries(session, table, [values])
+            session.commit()
+            inserted += 1
+        except SQLAlchemyError as exc:
+            session.rollback()
+            rejects.append(RejectedRow(row_number, str(getattr(exc, 'orig', None) or exc), values))
+    return inserted, rejects
+
+
+def bulk_import(session, table_name, rows, batch_size=DEFAULT_BATCH_SIZE, on_batch=None):
+    table = get_table(table_name)
+    report = ImportReport(table_name)
+    pending, batch_rejects, seen = [], [], 0
+    started = time.perf_counter()
+
+    def flush():
+        nonlocal pending, batch_rejects, seen, started
+        inserted, rejects = insert_batch(session, table, pending) if pending else (0, [])
+        batch_rejects.extend(rejects)
+        stats = BatchStats(len(report.batches) + 1, seen, inserted, len(batch_rejects), time.perf_counter() - started)
+        report.batches.append(stats)
+        report.rejects.extend(batch_rejects)
+        if on_batch is not None:
+            on_batch(stats)
+        pending, batch_rejects, seen = [], [], 0
+        started = time.perf_counter()
+
+    for row_number, raw in enumerate(rows, start=1):
+        seen += 1
+        try:
+            pending.append((row_number, coerce_row(table, raw)))
+        except (ValueError, TypeError) as exc:
+            batch_rejects.append(RejectedRow(row_number, str(exc), raw))
+        if seen >= batch_size:
+            flush()
+    if seen:
+        flush()
+    return report
+
+
+def iter_csv_rows(path):
+    with open(path, newline='', encoding='utf-8') as handle:
+        yield from csv.DictReader(handle)
+
+
+def iter_jsonl_rows(path):
+    with open(path, encoding='utf-8') as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as exc:
+                yield ValueError(f'invalid JSON: {exc}')
+
+
+def iter_file_rows(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return iter_csv_rows(path)
+    if extension in ('.jsonl', '.ndjson'):
+        return iter_jsonl_rows(path)
+    raise ValueError(f'Unsupported file type {extension!r}, expected .csv or .jsonl')
+
+
+def import_file(session, path, table_name=None, batch_size=DEFAULT_BATCH_SIZE, on_batch=None):
+    if table_name is None:
+        # customers.csv, service_tickets.jsonl, ...
+        table_name = os.path.splitext(os.path.basename(path))[0]
+    return bulk_import(session, table_name, iter_file_rows(path), batch_size=batch_size, on_batch=on_batch)
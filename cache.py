@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+# Secondary keys (e.g. a customer's email) point at the primary key entry instead of holding a copy
+_Alias = namedtuple('_Alias', 'pk_column pk')
+
+
+class LRUCache:
+    def __init__(self, maxsize=1024, ttl=300, clock=time.monotonic):
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1')
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()
+        # One cache serves every session and thread; reentrant so LookupCache can call back in
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and self.clock() >= expires_at:
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._get(key)
+            if value is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires_at = self.clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return entry[0] if entry is not None else None
+
+    def discard_where(self, predicate):
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+            }
+
+
+# Caches rows as {column: value} dicts, keyed by (table, column, value) for the primary key and
+# every unique column. Writers only need to invalidate the primary key: alias entries are checked
+# against the row they point at and dropped once it is gone or no longer matches.
+class LookupCache(LRUCache):
+    def lookup(self, table, column, value):
+        with self._lock:
+            entry = self._get((table, column, value))
+            if isinstance(entry, _Alias):
+                row = self._get((table, entry.pk_column, entry.pk))
+                if row is None or row.get(column) != value:
+                    self.pop((table, column, value))
+                    entry = None
+                else:
+                    entry = row
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry
+
+    def remember(self, table, pk_column, row, unique_columns=()):
+        pk = row[pk_column]
+        with self._lock:
+            self.set((table, pk_column, pk), row)
+            for column in unique_columns:
+                if row.get(column) is not None:
+                    self.set((table, column, row[column]), _Alias(pk_column, pk))
+
+    def invalidate(self, table, pk_column, pk):
+        self.pop((table, pk_column, pk))
+
+    def invalidate_table(self, table):
+        self.discard_where(lambda key: key[0] == table)
@@ -0,0 +1,291 @@
+import datetime
+import json
+from dataclasses import dataclass
+from decimal import Decimal
+
+from sqlalchemy import event, insert, inspect, select, tuple_, Column, DateTime, Integer, MetaData, String, Table, Text
+from sqlalchemy.sql.elements import BindParameter
+
+from practice1 import DEFAULT_YIELD_PER, Customer, Mechanic, ServiceMechanic, ServiceTicket, Vehicle
+
+# Append-only change log for downstream consumers (notifications, the search index). Every insert,
+# update and delete of a tracked table made through a session with the change log enabled adds a
+# row to change_log in the same transaction, so a rolled back change is never published. Consumers
+# remember the last seq they processed and call changes_since() to read only what happened after it.
+#
+# Changes flushed from ORM objects are picked up in after_flush, with any columns the objects had
+# expired or deferred read from the database (before the flush for deleted rows). The set-based
+# UPDATE/DELETE and executemany INSERT statements the helpers run through session.execute() are
+# picked up in do_orm_execute, which first selects the rows an UPDATE or DELETE is about to touch
+# and adds RETURNING to INSERTs so generated keys are logged. Writes made on a bare connection
+# (e.g. the search triggers or raw SQL) are not seen.
+#
+# seq comes from an AUTOINCREMENT key, so it never goes backwards or gets reused. SQLite has one
+# writer at a time, so seq order is also commit order.
+
+TRACKED_MODELS = (Customer, Vehicle, Mechanic, ServiceTicket, ServiceMechanic)
+TRACKED_TABLES = {model.__table__.name: model.__table__ for model in TRACKED_MODELS}
+
+changelog_metadata = MetaData()
+DELETED_ROWS_KEY = 'changelog_deleted_rows'
+
+change_log = Table(
+    'change_log', changelog_metadata,
+    Column('seq', Integer, primary_key=True, autoincrement=True),
+    Column('table_name', String(50), nullable=False),
+    Column('operation', String(10), nullable=False),
+    Column('row_key', Text, nullable=False),  # JSON object of the primary key columns
+    Column('data', Text, nullable=True),  # JSON row after the change, or before it for deletes
+    Column('changed_at', DateTime, nullable=False),
+    sqlite_autoincrement=True,
+)
+
+
+@dataclass
+class Change:
+    seq: int
+    table_name: str
+    operation: str
+    key: dict
+    data: dict
+    changed_at: datetime.datetime
+
+
+def install_change_log(bind):
+    changelog_metadata.create_all(bind, tables=[change_log])
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    raise TypeError(f'Cannot log {type(value).__name__} values')
+
+
+def _dumps(value):
+    return json.dumps(value, default=_json_default, sort_keys=True) if value is not None else None
+
+
+def _entry(table, operation, row, changed_at):
+    key = {column.name: row.get(column.name) for column in table.primary_key}
+    return {
+        'table_name': table.name, 'operation': operation, 'row_key': _dumps(key),
+        'data': _dumps(row), 'changed_at': changed_at,
+    }
+
+
+def _write(connection, entries):
+    if entries:
+        connection.execute(insert(change_log), entries)
+
+
+def _tracked_table(statement):
+    table = getattr(statement, 'table', None)
+    if table is None or table.name not in TRACKED_TABLES:
+        return None
+    return table if table.schema is None else None
+
+
+def _object_row(state):
+    mapper = state.mapper
+    row = {
+        attribute.columns[0].name: state.dict[attribute.key]
+        for attribute in mapper.column_attrs
+        if attribute.key in state.dict
+    }
+    # An expired primary key is still known from the identity
+    if state.identity is not None:
+        for column, value in zip(mapper.primary_key, state.identity):
+            row.setdefault(column.name, value)
+    return row
+
+
+# Expired or deferred attributes are missing from the object, so the rest of each row is read by
+# primary key (one query per table) and every logged row is complete
+def _complete_rows(connection, items):
+    incomplete = {}
+    for state, row in items:
+        if any(attribute.key in state.unloaded for attribute in state.mapper.column_attrs):
+            incomplete.setdefault(state.mapper.local_table, []).append(row)
+    for table, rows in incomplete.items():
+        current = {_key(table, found): found for found in _rows(connection, table, _key_criteria(table, [_key(table, row) for row in rows]))}
+        for row in rows:
+            for name, value in current.get(_key(table, row), {}).items():
+                row.setdefault(name, value)
+
+
+def _tracked_states(objects):
+    return [inspect(instance) for instance in objects if isinstance(instance, TRACKED_MODELS)]
+
+
+# The row with its primary key columns set back to their values before the flush
+def _with_old_key(state, row):
+    old = dict(row)
+    for column in state.mapper.primary_key:
+        deleted = state.attrs[state.mapper.get_property_by_column(column).key].history.deleted
+        if deleted and deleted[0] is not None:
+            old[column.name] = deleted[0]
+    return old
+
+
+# Deleted rows are gone once the flush has run, so they are completed before it
+def _before_flush(session, flush_context, instances):
+    rows = {state: _object_row(state) for state in _tracked_states(session.deleted)}
+    _complete_rows(session.connection(), rows.items())
+    flush_context.attributes[DELETED_ROWS_KEY] = rows
+
+
+def _after_flush(session, flush_context):
+    changed_at = datetime.datetime.utcnow()
+    deleted_rows = flush_context.attributes.get(DELETED_ROWS_KEY, {})
+    changes = []
+    for operation, objects in (('insert', session.new), ('update', session.dirty), ('delete', session.deleted)):
+        for state in _tracked_states(objects):
+            if operation == 'update' and not session.is_modified(state.obj(), include_collections=False):
+                continue
+            if operation == 'delete' and state in deleted_rows:
+                changes.append((operation, state, deleted_rows[state]))
+            else:
+                changes.append((operation, state, _object_row(state)))
+    _complete_rows(session.connection(), [(state, row) for operation, state, row in changes if operation != 'delete'])
+    entries = []
+    for operation, state, row in changes:
+        table = state.mapper.local_table
+        if operation == 'update':
+            old_row = _with_old_key(state, row)
+            if old_row != row:
+                entries.extend([_entry(table, 'delete', old_row, changed_at), _entry(table, 'insert', row, changed_at)])
+                continue
+        entries.append(_entry(table, operation, row, changed_at))
+    _write(session.connection(), entries)
+
+
+# Values an UPDATE assigns. Only literal values can be merged into the old rows; anything else
+# (e.g. cost * 2) is read back from the database after the update.
+def _assigned_values(statement):
+    values, computed = {}, []
+    for column, value in (statement._values or {}).items():
+        name = getattr(column, 'name', column)
+        if isinstance(value, BindParameter) and value.callable is None:
+            values[name] = value.value
+        else:
+            computed.append(name)
+    return values, computed
+
+
+def _rows(executor, table, criteria):
+    return [dict(row._mapping) for row in executor.execute(select(*table.c).where(*criteria))]
+
+
+def _key(table, row):
+    return tuple(row[column.name] for column in table.primary_key)
+
+
+def _key_criteria(table, keys):
+    columns = list(table.primary_key)
+    if len(columns) == 1:
+        return [columns[0].in_([key[0] for key in keys])]
+    return [tuple_(*columns).in_(keys)]
+
+
+def _log_insert(orm_execute_state, table, changed_at):
+    statement = orm_execute_state.statement
+    if statement._returning:
+        # The caller already asked for rows back; log the keys that were passed in
+        result = orm_execute_state.invoke_statement()
+        parameters = orm_execute_state.parameters
+        rows = parameters if isinstance(parameters, list) else [parameters or {}]
+        _write(orm_execute_state.session.connection(), [_entry(table, 'insert', dict(row), changed_at) for row in rows])
+        return result
+    frozen = orm_execute_state.invoke_statement(
+        statement=statement.returning(*table.c)
+    ).freeze()
+    rows = [dict(row._mapping) for row in frozen()]
+    _write(orm_execute_state.session.connection(), [_entry(table, 'insert', row, changed_at) for row in rows])
+    return frozen()
+
+
+def _log_update(orm_execute_state, table, changed_at):
+    session = orm_execute_state.session
+    statement = orm_execute_state.statement
+    parameters = orm_execute_state.parameters
+    if isinstance(parameters, list):
+        # ORM bulk UPDATE by primary key: each parameter set names its row
+        changes = {_key(table, row): row for row in parameters}
+        old_rows = _rows(session, table, _key_criteria(table, list(changes))) if changes else []
+        result = orm_execute_state.invoke_statement()
+        new_rows = [{**row, **changes[_key(table, row)]} for row in old_rows]
+    else:
+        old_rows = _rows(session, table, [statement.whereclause] if statement.whereclause is not None else [])
+        result = orm_execute_state.invoke_statement()
+        values, computed = _assigned_values(statement)
+        new_rows = [{**row, **values} for row in old_rows]
+        if computed and new_rows:
+            current = {_key(table, row): row for row in _rows(session, table, _key_criteria(table, [_key(table, row) for row in new_rows]))}
+            new_rows = [current.get(_key(table, row), row) for row in new_rows]
+    entries = []
+    for old, new in zip(old_rows, new_rows):
+        if _key(table, old) == _key(table, new):
+            entries.append(_entry(table, 'update', new, changed_at))
+        else:
+            # A changed primary key (e.g. moving an assignment to another mechanic) is a different row
+            entries.extend([_entry(table, 'delete', old, changed_at), _entry(table, 'insert', new, changed_at)])
+    _write(session.connection(), entries)
+    return result
+
+
+def _log_delete(orm_execute_state, table, changed_at):
+    session = orm_execute_state.session
+    statement = orm_execute_state.statement
+    old_rows = _rows(session, table, [statement.whereclause] if statement.whereclause is not None else [])
+    result = orm_execute_state.invoke_statement()
+    _write(session.connection(), [_entry(table, 'delete', row, changed_at) for row in old_rows])
+    return result
+
+
+def _do_orm_execute(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    table = _tracked_table(orm_execute_state.statement)
+    if table is None:
+        return None
+    changed_at = datetime.datetime.utcnow()
+    if orm_execute_state.is_insert:
+        return _log_insert(orm_execute_state, table, changed_at)
+    if orm_execute_state.is_update:
+        return _log_update(orm_execute_state, table, changed_at)
+    return _log_delete(orm_execute_state, table, changed_at)
+
+
+# target is a Session, a sessionmaker (e.g. from make_sessionmaker()) or a Session subclass; every
+# session it covers then logs its changes; for an AsyncSession pass its sync_session. The change_log
+# table must exist, see install_change_log().
+def enable_change_log(target):
+    if not event.contains(target, 'after_flush', _after_flush):
+        event.listen(target, 'before_flush', _before_flush)
+        event.listen(target, 'after_flush', _after_flush)
+        event.listen(target, 'do_orm_execute', _do_orm_execute)
+
+
+def disable_change_log(target):
+    if event.contains(target, 'after_flush', _after_flush):
+        event.remove(target, 'before_flush', _before_flush)
+        event.remove(target, 'after_flush', _after_flush)
+        event.remove(target, 'do_orm_execute', _do_orm_execute)
+
+
+def latest_seq(session):
+    return session.scalar(select(change_log.c.seq).order_by(change_log.c.seq.desc()).limit(1)) or 0
+
+
+# Streams the changes with a seq greater than `seq`, oldest first, at most `limit` of them. Pass
+# the seq of the last change processed to pick up where a consumer left off.
+def changes_since(session, seq=0, limit=None, batch_size=DEFAULT_YIELD_PER):
+    statement = select(change_log).where(change_log.c.seq > seq).order_by(change_log.c.seq).limit(limit)
+    result = session.execute(statement.execution_options(yield_per=batch_size))
+    for row in result:
+        yield Change(
+            row.seq, row.table_name, row.operation, json.loads(row.row_key),
+            json.loads(row.data) if row.data is not None else None, row.changed_at,
+        )
@@ -0,0 +1,212 @@
+import argparse
+import datetime
+import sys
+
+# Non-interactive entry point behind `python practice1.py <command>`. Only the standard library is
+# imported up front; each command imports practice1 (and with it SQLAlchemy and the models) when
+# it runs, so `--help` and argument errors return at once. Commands call ensure_schema(), which
+# skips create_all when the database already has the current schema version.
+
+COMMAND_DATABASE_URL = 'sqlite:///practice1.db'
+
+
+def import_command(args):
+    import practice1
+    from bulk_import import import_file
+
+    engine = practice1.make_engine(default_url=COMMAND_DATABASE_URL, database_url=args.database)
+    practice1.ensure_schema(engine)
+    session = practice1.make_sessionmaker(engine)()
+
+    def on_batch(stats):
+        print(f'Batch {stats.batch_number}: {stats.inserted} inserted, {stats.rejected} rejected, {stats.rows_per_second:.0f} rows/s')
+
+    report = import_file(session, args.file, table_name=args.table, batch_size=args.batch_size, on_batch=on_batch)
+    for reject in report.rejects:
+        print(f'Row {reject.row_number} rejected: {reject.error}', file=sys.stderr)
+    print(f'Imported {report.inserted} of {report.rows} {report.table_name} rows in {report.seconds:.2f}s ({report.rows_per_second:.0f} rows/s)')
+    session.close()
+    return 1 if report.rejected else 0
+
+
+def load_command(args):
+    import practice1
+    import loader
+
+    engine = practice1.make_engine(default_url=COMMAND_DATABASE_URL, database_url=args.database)
+    practice1.ensure_schema(engine)
+    session = practice1.make_sessionmaker(engine)()
+
+    def on_chunk(table_name, stats):
+        print(f'{table_name} chunk {stats.batch_number}: {stats.inserted} inserted, {stats.rejected} rejected, {stats.rows_per_second:.0f} rows/s')
+
+    report = loader.load(session, args.paths, job=args.job, workers=args.workers, chunk_size=args.chunk_size, on_chunk=on_chunk)
+    session.close()
+    for table_name, table_report in report.tables.items():
+        for reject in table_report.rejects:
+            print(f'{table_name} row {reject.row_number} rejected: {reject.error}', file=sys.stderr)
+    print(loader.format_report(report))
+    return 1 if report.rejected else 0
+
+
+def migrate_command(args):
+    import practice1
+
+    engine = practice1.make_engine(default_url=COMMAND_DATABASE_URL, database_url=args.database)
+    created = practice1.ensure_schema(engine, force=True)
+    for name in created:
+        print(f'Created index {name}')
+    print('Schema is up to date' if not created else f'Created {len(created)} indexes')
+    print(f'Schema version {practice1.stored_schema_version(engine)}')
+    return 0
+
+
+def archive_command(args):
+    import practice1
+    import archive
+
+    engine = practice1.make_engine(default_url=COMMAND_DATABASE_URL, database_url=args.database)
+    practice1.ensure_schema(engine)
+    schema = archive.attach_archive_database(engine, args.archive_database) if args.archive_database else None
+    session = practice1.make_sessionmaker(engine)()
+    progress = {'moved': 0}
+
+    def on_batch(moved):
+        progress['moved'] += moved
+        print(f'Archived {progress["moved"]} tickets')
+
+    try:
+        moved = archive.archive_tickets(session, args.before, batch_size=args.batch_size, schema=schema, on_batch=on_batch)
+        boundary = archive.archive_boundary(session)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 2
+    finally:
+        session.close()
+    print(f'Done, {moved} tickets dated before {boundary:%Y-%m-%d} moved to the archive')
+    return 0
+
+
+def export_command(args):
+    import practice1
+    import export
+
+    engine = practice1.make_engine(default_url=COMMAND_DATABASE_URL, database_url=args.database)
+    session = practice1.make_sessionmaker(engine)()
+
+    def on_batch(rows):
+        print(f'Exported {rows} tickets')
+
+    try:
+        report = export.export_tickets(session, args.file, file_format=args.format, batch_size=args.batch_size, state_path=args.state, on_batch=on_batch)
+    except (ImportError, ValueError) as error:
+        print(error, file=sys.stderr)
+        return 2
+    finally:
+        session.close()
+    if report.rows:
+        print(f'Wrote {report.rows} tickets to {report.path} in {report.seconds:.2f}s ({report.rows_per_second:.0f} rows/s)')
+    else:
+        print('No new tickets to export')
+    return 0
+
+
+# Tab separated, one ticket per line, so the output is easy to feed to other tools
+def tickets_list_command(args):
+    import practice1
+    import archive
+
+    engine = practice1.make_engine(default_url=COMMAND_DATABASE_URL, database_url=args.database)
+    practice1.ensure_schema(engine)
+    session = practice1.make_sessionmaker(engine)()
+    try:
+        tickets = archive.read_tickets_between(session, args.since, args.until, customer_id=args.customer, vin=args.vin, limit=args.limit)
+    finally:
+        session.close()
+    for ticket in tickets:
+        ticket_date = f'{ticket.ticket_date:%Y-%m-%d %H:%M}' if ticket.ticket_date is not None else ''
+        print(f'{ticket.ticket_id}\t{ticket_date}\t{ticket.vin}\t{ticket.customer_id}\t{ticket.cost:.2f}\t{ticket.service_description}')
+    return 0
+
+
+def rebuild_summaries_command(args):
+    import practice1
+    import archive
+
+    engine = practice1.make_engine(default_url=COMMAND_DATABASE_URL, database_url=args.database)
+    practice1.ensure_schema(engine)
+    if args.archive_database:
+        archive.attach_archive_database(engine, args.archive_database)
+    session = practice1.make_sessionmaker(engine)()
+    try:
+        practice1.rebuild_summaries(session)
+    finally:
+        session.close()
+    print('Summary tables rebuilt')
+    return 0
+
+
+def run_command(argv):
+    parser = argparse.ArgumentParser(prog='practice1.py')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help='Bulk load a CSV or JSONL file')
+    import_parser.add_argument('file')
+    import_parser.add_argument('--table', help='Target table, defaults to the file name (e.g. customers.csv)')
+    import_parser.add_argument('--batch-size', type=int, default=1000)
+    import_parser.add_argument('--database', help=f'Database URL, defaults to PRACTICE1_DATABASE_URL or {COMMAND_DATABASE_URL}')
+    import_parser.set_defaults(handler=import_command)
+
+    load_parser = subparsers.add_parser('load', help='Migrate a full data set (one file per table) using parallel parsing')
+    load_parser.add_argument('paths', nargs='+', help='A directory holding customers.csv, vehicles.jsonl, ... or the files themselves')
+    load_parser.add_argument('--job', default='default', help='Name to checkpoint under, rerun with the same name to resume')
+    load_parser.add_argument('--workers', type=int, help='Parser processes, defaults to the number of CPUs')
+    load_parser.add_argument('--chunk-size', type=int, default=2000)
+    load_parser.add_argument('--database', help=f'Database URL, defaults to PRACTICE1_DATABASE_URL or {COMMAND_DATABASE_URL}')
+    load_parser.set_defaults(handler=load_command)
+
+    migrate_parser = subparsers.add_parser('migrate', help='Create missing tables and indexes in an existing database')
+    migrate_parser.add_argument('--database', help=f'Database URL, defaults to PRACTICE1_DATABASE_URL or {COMMAND_DATABASE_URL}')
+    migrate_parser.set_defaults(handler=migrate_command)
+
+    archive_parser = subparsers.add_parser('archive', help='Move old service tickets into per-year archive tables')
+    archive_parser.add_argument('--before', type=datetime.date.fromisoformat, help='Archive tickets dated before this day (YYYY-MM-DD), omit to resume an interrupted run')
+    archive_parser.add_argument('--batch-size', type=int, default=500)
+    archive_parser.add_argument('--archive-database', help='Keep the archive tables in this SQLite file instead of the main database')
+    archive_parser.add_argument('--database', help=f'Database URL, defaults to PRACTICE1_DATABASE_URL or {COMMAND_DATABASE_URL}')
+    archive_parser.set_defaults(handler=archive_command)
+
+    export_parser = subparsers.add_parser('export', help='Write service tickets with vehicle and customer details to Parquet or Arrow IPC')
+    export_parser.add_argument('file', help='Output file, the format follows the extension (.parquet, .arrow, .feather)')
+    export_parser.add_argument('--format', choices=['parquet', 'ipc'])
+    export_parser.add_argument('--batch-size', type=int, default=10000)
+    export_parser.add_argument('--state', help='JSON file holding the last exported ticket; only newer tickets are written and it is advanced afterwards')
+    export_parser.add_argument('--database', help=f'Database URL, defaults to PRACTICE1_DATABASE_URL or {COMMAND_DATABASE_URL}')
+    export_parser.set_defaults(handler=export_command)
+
+    tickets_parser = subparsers.add_parser('tickets', help='Work with service tickets without the interactive menu')
+    tickets_commands = tickets_parser.add_subparsers(dest='tickets_command', required=True)
+    tickets_list_parser = tickets_commands.add_parser('list', help='Print service tickets, archived ones included, oldest first')
+    tickets_list_parser.add_argument('--since', type=datetime.date.fromisoformat, help='Only tickets dated on or after this day (YYYY-MM-DD)')
+    tickets_list_parser.add_argument('--until', type=datetime.date.fromisoformat, help='Only tickets dated before this day (YYYY-MM-DD)')
+    tickets_list_parser.add_argument('--customer', type=int, help='Only tickets of this customer id')
+    tickets_list_parser.add_argument('--vin', help='Only tickets for this vehicle')
+    tickets_list_parser.add_argument('--limit', type=int)
+    tickets_list_parser.add_argument('--database', help=f'Database URL, defaults to PRACTICE1_DATABASE_URL or {COMMAND_DATABASE_URL}')
+    tickets_list_parser.set_defaults(handler=tickets_list_command)
+
+    rebuild_parser = subparsers.add_parser('rebuild-summaries', help='Recompute the dashboard summary tables from the ticket data')
+    rebuild_parser.add_argument('--archive-database', help='SQLite file the archive tables were moved to, so archived tickets are counted')
+    rebuild_parser.add_argument('--database', help=f'Database URL, defaults to PRACTICE1_DATABASE_URL or {COMMAND_DATABASE_URL}')
+    rebuild_parser.set_defaults(handler=rebuild_summaries_command)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+def main(argv=None):
+    return run_command(sys.argv[1:] if argv is None else argv)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,177 @@
+import datetime
+import json
+import os
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+
+from sqlalchemy import select, tuple_
+
+from practice1 import Customer, ServiceTicket, Vehicle
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Streams service tickets joined with their vehicle and customer into Arrow record batches and
+# writes them as Parquet or Arrow IPC. Rows come from a server-side cursor batch_size at a time,
+# so memory stays bounded by one batch whatever the table size.
+#
+# Incremental exports remember the last (ticket_date, ticket_id) written in a small JSON state
+# file and only export rows after it. Tickets backdated before the watermark or edited after
+# being exported are not picked up again; run a full export to refresh those. Tickets without a
+# date are never exported.
+
+DEFAULT_EXPORT_BATCH_SIZE = 10000
+# cost is an unconstrained DECIMAL, which SQLAlchemy reads back with up to 10 decimal places, so
+# the export keeps all of them; a value that doesn't fit raises instead of being rounded
+COST_PRECISION = ServiceTicket.__table__.c.cost.type.precision or 38
+COST_SCALE = ServiceTicket.__table__.c.cost.type.scale or 10
+EXPORT_FORMATS = {'.parquet': 'parquet', '.arrow': 'ipc', '.ipc': 'ipc', '.feather': 'ipc'}
+
+EXPORT_COLUMNS = [
+    ServiceTicket.ticket_id,
+    ServiceTicket.ticket_date,
+    ServiceTicket.service_description,
+    ServiceTicket.cost,
+    Vehicle.vin,
+    Vehicle.make,
+    Vehicle.model,
+    Vehicle.year,
+    Vehicle.license_plate,
+    Customer.customer_id,
+    Customer.first_name,
+    Customer.last_name,
+    Customer.email,
+]
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError('Exports require pyarrow, install it with: pip install pyarrow')
+
+
+def export_schema():
+    _require_pyarrow()
+    return pa.schema([
+        ('ticket_id', pa.int64()),
+        ('ticket_date', pa.timestamp('us')),
+        ('service_description', pa.string()),
+        ('cost', pa.decimal128(COST_PRECISION, COST_SCALE)),
+        ('vin', pa.string()),
+        ('make', pa.string()),
+        ('model', pa.string()),
+        ('year', pa.int32()),
+        ('license_plate', pa.string()),
+        ('customer_id', pa.int64()),
+        ('first_name', pa.string()),
+        ('last_name', pa.string()),
+        ('email', pa.string()),
+    ])
+
+
+@dataclass
+class ExportReport:
+    path: str
+    rows: int
+    batches: int
+    seconds: float
+    watermark: tuple  # (ticket_date, ticket_id) of the last row written, None if nothing was
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else float('inf')
+
+
+def export_format(path, file_format=None):
+    if file_format is not None:
+        if file_format not in set(EXPORT_FORMATS.values()):
+            raise ValueError(f'Unknown export format {file_format!r}, expected parquet or ipc')
+        return file_format
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXPORT_FORMATS:
+        raise ValueError(f'Cannot tell the format of {path}, use one of {", ".join(EXPORT_FORMATS)} or pass the format')
+    return EXPORT_FORMATS[extension]
+
+
+def load_watermark(state_path):
+    if not state_path or not os.path.exists(state_path):
+        return None
+    with open(state_path) as handle:
+        state = json.load(handle)
+    return datetime.datetime.fromisoformat(state['ticket_date']), state['ticket_id']
+
+
+# Written through a temporary file so a crash never leaves a half-written state behind
+def save_watermark(state_path, watermark):
+    temporary_path = state_path + '.tmp'
+    with open(temporary_path, 'w') as handle:
+        json.dump({'ticket_date': watermark[0].isoformat(), 'ticket_id': watermark[1]}, handle)
+    os.replace(temporary_path, state_path)
+
+
+def export_query(after=None):
+    statement = (
+        select(*EXPORT_COLUMNS)
+        .join(Vehicle, Vehicle.vin == ServiceTicket.vin)
+        .join(Customer, Customer.customer_id == ServiceTicket.customer_id)
+        .where(ServiceTicket.ticket_date.is_not(None))
+        .order_by(ServiceTicket.ticket_date, ServiceTicket.ticket_id)
+    )
+    if after is not None:
+        statement = statement.where(tuple_(ServiceTicket.ticket_date, ServiceTicket.ticket_id) > tuple(after))
+    return statement
+
+
+def _cost(value):
+    if value is None or isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+def record_batch(rows, schema):
+    columns = list(zip(*rows))
+    cost_index = schema.get_field_index('cost')
+    columns[cost_index] = [_cost(value) for value in columns[cost_index]]
+    return pa.RecordBatch.from_arrays([pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema)
+
+
+def _open_writer(path, file_format, schema):
+    if file_format == 'parquet':
+        return pq.ParquetWriter(path, schema)
+    return pa.ipc.new_file(path, schema)
+
+
+# Writes every ticket (or, with state_path, every ticket newer than the last export) to path and
+# advances the watermark once the file is complete. No file is written when there is nothing new.
+def export_tickets(session, path, file_format=None, batch_size=DEFAULT_EXPORT_BATCH_SIZE, state_path=None, on_batch=None):
+    _require_pyarrow()
+    file_format = export_format(path, file_format)
+    schema = export_schema()
+    after = load_watermark(state_path)
+    started = time.perf_counter()
+    writer = None
+    rows = batches = 0
+    watermark = None
+    result = session.execute(export_query(after).execution_options(yield_per=batch_size))
+    try:
+        for partition in result.partitions():
+            if writer is None:
+                writer = _open_writer(path, file_format, schema)
+            writer.write_batch(record_batch(partition, schema))
+            rows += len(partition)
+            batches += 1
+            last = partition[-1]
+            watermark = (last.ticket_date, last.ticket_id)
+            if on_batch is not None:
+                on_batch(rows)
+    finally:
+        result.close()
+        if writer is not None:
+            writer.close()
+    if state_path and watermark is not None:
+        save_watermark(state_path, watermark)
+    return ExportReport(path if rows else None, rows, batches, time.perf_counter() - started, watermark)
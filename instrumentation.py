@@ -0,0 +1,271 @@
+import contextvars
+import functools
+import inspect
+import logging
+import re
+import threading
+import time
+import types
+from dataclasses import dataclass
+
+from sqlalchemy import event
+
+import practice1
+
+# Opt-in statement and helper timing. Nothing here is hooked up until enable_instrumentation()
+# is called: it adds engine event listeners and swaps the practice1 helpers for timing wrappers,
+# and disable_instrumentation() removes both again, so an idle process pays nothing.
+#
+# The wrappers replace the module attributes, so only calls made as practice1.get_customer(...)
+# are timed as helpers. A name bound earlier with `from practice1 import get_customer` keeps the
+# plain function; its statements are still recorded, under no helper.
+#
+#   instrumentation.enable_instrumentation(engine, slow_query_threshold=0.2)
+#   ...
+#   instrumentation.snapshot()
+
+HELPER_PREFIXES = ('create_', 'read_', 'iter_', 'list_', 'get_', 'update_', 'delete_', 'rebuild_', 'open_')
+DEFAULT_SLOW_QUERY_THRESHOLD = 0.5  # seconds, None turns the slow-query log off
+REDACTED = '<redacted>'
+
+slow_query_logger = logging.getLogger('practice1.slow_queries')
+
+# Name of the outermost helper running in this thread or task, statements are attributed to it
+_current_helper = contextvars.ContextVar('practice1_helper', default=None)
+
+
+@dataclass
+class TimingStats:
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    rows: int = 0
+
+    def add(self, seconds, rows):
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.rows += rows
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'total_seconds': self.total_seconds,
+            'max_seconds': self.max_seconds,
+            'mean_seconds': self.total_seconds / self.count if self.count else 0.0,
+            'rows': self.rows,
+        }
+
+
+_lock = threading.Lock()
+_statement_stats = {}  # (helper, statement) -> TimingStats
+_helper_stats = {}  # helper -> TimingStats
+_engines = {}  # engine -> slow query threshold
+_original_helpers = {}  # name -> function
+
+
+def _normalize(statement):
+    return re.sub(r'\s+', ' ', statement).strip()
+
+
+# Bound values can hold customer contact details, so only their shape is logged
+def redact_parameters(parameters, executemany=False):
+    if executemany:
+        return f'<{len(parameters)} parameter sets>'
+    if isinstance(parameters, dict):
+        return {key: REDACTED for key in parameters}
+    if isinstance(parameters, (list, tuple)):
+        return [REDACTED] * len(parameters)
+    return REDACTED
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('practice1_query_started', []).append(time.perf_counter())
+
+
+# Statements that return rows (SELECTs, RETURNING) report a rowcount of -1, so their rows are
+# counted as the result fetches them from the cursor instead
+class _RowCountingCursor:
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _count(self, rows):
+        with _lock:
+            self._stats.rows += rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._count(1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._count(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._count(len(rows))
+        return rows
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info['practice1_query_started'].pop()
+    returns_rows = cursor.description is not None
+    rows = 0 if returns_rows or cursor.rowcount is None else max(cursor.rowcount, 0)
+    helper = _current_helper.get()
+    statement = _normalize(statement)
+    with _lock:
+        stats = _statement_stats.get((helper, statement))
+        if stats is None:
+            stats = _statement_stats[(helper, statement)] = TimingStats()
+        stats.add(seconds, rows)
+    if returns_rows and context is not None:
+        context.cursor = _RowCountingCursor(cursor, stats)
+    threshold = _engines.get(conn.engine)
+    if threshold is not None and seconds >= threshold:
+        slow_query_logger.warning(
+            'Slow query (%.1f ms) in %s: %s parameters=%s',
+            seconds * 1000, helper or '<no helper>', statement, redact_parameters(parameters, executemany),
+        )
+
+
+def _handle_error(exception_context):
+    # Keep the start-time stack balanced when a statement fails
+    started = exception_context.connection.info.get('practice1_query_started') if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def _record_helper(name, seconds, rows):
+    with _lock:
+        stats = _helper_stats.get(name)
+        if stats is None:
+            stats = _helper_stats[name] = TimingStats()
+        stats.add(seconds, rows)
+
+
+def _result_rows(result):
+    if result is None:
+        return 0
+    if isinstance(result, bool):
+        return int(result)
+    if isinstance(result, int):
+        return result  # rowcount of a batch update or delete
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return 1
+
+
+def _instrumented_iterator(name, iterator):
+    rows = 0
+    seconds = 0.0
+    try:
+        while True:
+            token = _current_helper.set(name)
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                seconds += time.perf_counter() - started
+                _current_helper.reset(token)
+            rows += 1
+            yield item
+    finally:
+        _record_helper(name, seconds, rows)
+
+
+def _instrument(name, function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        # Helpers called from other helpers are part of the outer call
+        if _current_helper.get() is not None:
+            return function(*args, **kwargs)
+        token = _current_helper.set(name)
+        started = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - started
+            _current_helper.reset(token)
+        if isinstance(result, types.GeneratorType):
+            return _instrumented_iterator(name, result)
+        _record_helper(name, seconds, _result_rows(result))
+        return result
+    return wrapper
+
+
+def _helpers():
+    for name, value in vars(practice1).items():
+        if name.startswith(HELPER_PREFIXES) and inspect.isfunction(value) and value.__module__ == practice1.__name__:
+            yield name, value
+
+
+def _install_helper_wrappers():
+    for name, function in list(_helpers()):
+        _original_helpers[name] = function
+        setattr(practice1, name, _instrument(name, function))
+
+
+def _remove_helper_wrappers():
+    for name, function in _original_helpers.items():
+        setattr(practice1, name, function)
+    _original_helpers.clear()
+
+
+def enable_instrumentation(engine, slow_query_threshold=DEFAULT_SLOW_QUERY_THRESHOLD):
+    engine = getattr(engine, 'sync_engine', engine)  # accept an AsyncEngine too
+    with _lock:
+        if engine not in _engines:
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(engine, 'handle_error', _handle_error)
+        _engines[engine] = slow_query_threshold
+        if not _original_helpers:
+            _install_helper_wrappers()
+
+
+# Detaches one engine, or every engine when none is given; helpers are restored with the last one
+def disable_instrumentation(engine=None):
+    engines = [getattr(engine, 'sync_engine', engine)] if engine is not None else list(_engines)
+    with _lock:
+        for engine in engines:
+            if engine in _engines:
+                del _engines[engine]
+                event.remove(engine, 'before_cursor_execute', _before_cursor_execute)
+                event.remove(engine, 'after_cursor_execute', _after_cursor_execute)
+                event.remove(engine, 'handle_error', _handle_error)
+        if not _engines:
+            _remove_helper_wrappers()
+
+
+def instrumentation_enabled():
+    return bool(_engines)
+
+
+def reset_instrumentation():
+    with _lock:
+        _statement_stats.clear()
+        _helper_stats.clear()
+
+
+# Plain dicts, safe to serialise; helpers and statements are sorted by total time, slowest first
+def snapshot():
+    with _lock:
+        helpers = {name: stats.as_dict() for name, stats in _helper_stats.items()}
+        statements = [
+            dict(helper=helper, statement=statement, **stats.as_dict())
+            for (helper, statement), stats in _statement_stats.items()
+        ]
+    return {
+        'enabled': instrumentation_enabled(),
+        'helpers': dict(sorted(helpers.items(), key=lambda item: -item[1]['total_seconds'])),
+        'statements': sorted(statements, key=lambda stats: -stats['total_seconds']),
+    }
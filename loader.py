@@ -0,0 +1,278 @@
+import collections
+import datetime
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from sqlalchemy import insert, select, update, Boolean, Column, DateTime, Integer, MetaData, String, Table
+from sqlalchemy.exc import SQLAlchemyError
+
+from bulk_import import (
+    BatchStats, ImportReport, RejectedRow, _add_summaries, _execute_inserts, coerce_row, get_table, iter_file_rows,
+)
+from practice1 import _on_primary
+
+# Initial migration loader: worker processes parse and validate chunks of source rows while this
+# process is the only writer, loading the tables in foreign key order. At most max_in_flight chunks
+# are parsed ahead of the writer, so a slow database holds back reading instead of filling memory.
+#
+# Progress is checkpointed in load_checkpoints in the same transaction as each chunk, so a load
+# that is stopped or crashes can be run again with the same job name and carries on after the
+# last committed row without inserting anything twice.
+
+LOAD_ORDER = ('customers', 'vehicles', 'mechanics', 'service_tickets', 'service_mechanics')
+DEFAULT_CHUNK_SIZE = 2000
+SOURCE_EXTENSIONS = ('.csv', '.jsonl', '.ndjson')
+
+loader_metadata = MetaData()
+
+load_checkpoints = Table(
+    'load_checkpoints', loader_metadata,
+    Column('job', String(100), primary_key=True),
+    Column('table_name', String(50), primary_key=True),
+    Column('rows_done', Integer, nullable=False, default=0),
+    Column('completed', Boolean, nullable=False, default=False),
+    Column('updated_at', DateTime, nullable=False),
+)
+
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+def normalize_email(value):
+    value = value.strip().lower()
+    if not EMAIL_PATTERN.match(value):
+        raise ValueError(f'invalid email {value!r}')
+    return value
+
+
+# Digits only, keeping a leading + for international numbers
+def normalize_phone(value):
+    digits = re.sub(r'\D', '', value)
+    if not 7 <= len(digits) <= 15:
+        raise ValueError(f'invalid phone number {value!r}')
+    return ('+' if value.strip().startswith('+') else '') + digits
+
+
+def normalize_plate(value):
+    return re.sub(r'\s+', '', value).upper()
+
+
+# On top of bulk_import.coerce_row(), which already checks and normalises VINs for both paths
+NORMALIZERS = {
+    'customers': {'email': normalize_email, 'phone': normalize_phone},
+    'vehicles': {'license_plate': normalize_plate},
+    'mechanics': {'email': normalize_email, 'phone': normalize_phone},
+}
+NON_NEGATIVE_COLUMNS = ('cost', 'salary')
+
+
+def prepare_row(table, raw):
+    if isinstance(raw, dict):
+        raw = dict(raw)
+        for name, normalize in NORMALIZERS.get(table.name, {}).items():
+            value = raw.get(name)
+            if isinstance(value, str) and value.strip():
+                try:
+                    raw[name] = normalize(value)
+                except ValueError as exc:
+                    raise ValueError(f'{name}: {exc}')
+    values = coerce_row(table, raw)
+    for name in NON_NEGATIVE_COLUMNS:
+        if values.get(name) is not None and values[name] < 0:
+            raise ValueError(f'{name} must not be negative')
+    return values
+
+
+# Runs in a worker process: returns the parsed (row_number, values) pairs, the rejects and the
+# number of the chunk's last source row
+def parse_chunk(table_name, first_row_number, raw_rows):
+    table = get_table(table_name)
+    rows, rejects = [], []
+    for row_number, raw in enumerate(raw_rows, start=first_row_number):
+        try:
+            rows.append((row_number, prepare_row(table, raw)))
+        except (ValueError, TypeError) as exc:
+            rejects.append(RejectedRow(row_number, str(exc), raw))
+    return rows, rejects, first_row_number + len(raw_rows) - 1
+
+
+@dataclass
+class LoadReport:
+    job: str
+    tables: dict = field(default_factory=dict)  # table name -> ImportReport
+    seconds: float = 0.0
+
+    @property
+    def rows(self):
+        return sum(report.rows for report in self.tables.values())
+
+    @property
+    def inserted(self):
+        return sum(report.inserted for report in self.tables.values())
+
+    @property
+    def rejected(self):
+        return sum(report.rejected for report in self.tables.values())
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else float('inf')
+
+
+def format_report(report):
+    lines = [f"{'table':<20}{'rows':>10}{'inserted':>10}{'rejected':>10}{'seconds':>10}{'rows/s':>10}"]
+    for name, table_report in report.tables.items():
+        lines.append(
+            f'{name:<20}{table_report.rows:>10}{table_report.inserted:>10}{table_report.rejected:>10}'
+            f'{table_report.seconds:>10.2f}{table_report.rows_per_second:>10.0f}'
+        )
+    lines.append(f"{'total':<20}{report.rows:>10}{report.inserted:>10}{report.rejected:>10}{report.seconds:>10.2f}{report.rows_per_second:>10.0f}")
+    return '\n'.join(lines)
+
+
+def install_checkpoints(bind):
+    loader_metadata.create_all(bind, tables=[load_checkpoints])
+
+
+def get_checkpoint(session, job, table_name):
+    row = session.execute(
+        select(load_checkpoints.c.rows_done, load_checkpoints.c.completed)
+        .where(load_checkpoints.c.job == job, load_checkpoints.c.table_name == table_name)
+    ).first()
+    return (row.rows_done, row.completed) if row is not None else (0, False)
+
+
+def _save_checkpoint(session, job, table_name, rows_done, completed=False):
+    values = {'rows_done': rows_done, 'completed': completed, 'updated_at': datetime.datetime.utcnow()}
+    result = session.execute(
+        update(load_checkpoints).where(load_checkpoints.c.job == job, load_checkpoints.c.table_name == table_name).values(**values)
+    )
+    if result.rowcount == 0:
+        session.execute(insert(load_checkpoints).values(job=job, table_name=table_name, **values))
+
+
+# Inserts a parsed chunk and advances the checkpoint in the same transaction. If the chunk violates
+# a constraint it is retried row by row, each row committing together with its checkpoint.
+def write_chunk(session, job, table, rows, last_row_number):
+    try:
+        _execute_inserts(session, table, [values for _, values in rows])
+        _add_summaries(session, table, [values for _, values in rows])
+        _save_checkpoint(session, job, table.name, last_row_number)
+        session.commit()
+        return len(rows), []
+    except SQLAlchemyError:
+        session.rollback()
+
+    inserted, rejects = 0, []
+    for row_number, values in rows:
+        try:
+            _execute_inserts(session, table, [values])
+            _add_summaries(session, table, [values])
+            _save_checkpoint(session, job, table.name, row_number)
+            session.commit()
+            inserted += 1
+        except SQLAlchemyError as exc:
+            session.rollback()
+            rejects.append(RejectedRow(row_number, str(getattr(exc, 'orig', None) or exc), values))
+    _save_checkpoint(session, job, table.name, last_row_number)
+    session.commit()
+    return inserted, rejects
+
+
+def _chunks(rows, chunk_size, skip):
+    chunk, first_row_number = [], skip + 1
+    for row_number, raw in enumerate(rows, start=1):
+        if row_number <= skip:
+            continue
+        chunk.append(raw)
+        if len(chunk) >= chunk_size:
+            yield first_row_number, chunk
+            chunk, first_row_number = [], row_number + 1
+    if chunk:
+        yield first_row_number, chunk
+
+
+# Source files for each table: a directory holding customers.csv, vehicles.jsonl, ... or a list of
+# such files
+def find_sources(paths):
+    if isinstance(paths, str):
+        paths = [paths]
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(SOURCE_EXTENSIONS))
+        else:
+            files.append(path)
+    sources = {}
+    for path in files:
+        table_name = os.path.splitext(os.path.basename(path))[0]
+        get_table(table_name)
+        if table_name in sources:
+            raise ValueError(f'More than one source file for {table_name}')
+        sources[table_name] = path
+    return sources
+
+
+def _load_table(session, pool, job, table_name, rows, chunk_size, max_in_flight, on_chunk):
+    table = get_table(table_name)
+    report = ImportReport(table_name)
+    rows_done, completed = get_checkpoint(session, job, table_name)
+    if completed:
+        return report
+
+    in_flight = collections.deque()
+    started = time.perf_counter()
+
+    def write_next():
+        nonlocal started
+        first_row_number, future = in_flight.popleft()
+        parsed, rejects, last_row_number = future.result()
+        inserted, write_rejects = write_chunk(session, job, table, parsed, last_row_number)
+        rejects = sorted(rejects + write_rejects, key=lambda reject: reject.row_number)
+        now = time.perf_counter()
+        stats = BatchStats(len(report.batches) + 1, last_row_number - first_row_number + 1, inserted, len(rejects), now - started)
+        started = now
+        report.batches.append(stats)
+        report.rejects.extend(rejects)
+        if on_chunk is not None:
+            on_chunk(table_name, stats)
+
+    for first_row_number, chunk in _chunks(rows, chunk_size, rows_done):
+        # Backpressure: wait for the oldest chunk to be written before parsing further ahead
+        while len(in_flight) >= max_in_flight:
+            write_next()
+        in_flight.append((first_row_number, pool.submit(parse_chunk, table_name, first_row_number, chunk)))
+    while in_flight:
+        write_next()
+
+    final_rows_done, _ = get_checkpoint(session, job, table_name)
+    _save_checkpoint(session, job, table_name, final_rows_done, completed=True)
+    session.commit()
+    return report
+
+
+# Loads sources ({table name: path} or paths for find_sources) in LOAD_ORDER. on_chunk(table_name,
+# stats) is called after each committed chunk. Rerunning a job skips what is already loaded.
+@_on_primary
+def load(session, sources, job='default', workers=None, chunk_size=DEFAULT_CHUNK_SIZE, max_in_flight=None, on_chunk=None):
+    if not isinstance(sources, dict):
+        sources = find_sources(sources)
+    for table_name in sources:
+        get_table(table_name)
+    install_checkpoints(session.connection())
+    session.commit()
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * workers
+    report = LoadReport(job)
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for table_name in LOAD_ORDER:
+            if table_name in sources:
+                rows = sources[table_name]
+                if isinstance(rows, str):
+                    rows = iter_file_rows(rows)
+                report.tables[table_name] = _load_table(session, pool, job, table_name, rows, chunk_size, max_in_flight, on_chunk)
+    report.seconds = time.perf_counter() - started
+    return report
@@ -1,7 +1,23 @@
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, DateTime, Text, DECIMAL
+import sys
+
+# Subcommands are handed to cli.py before anything else is imported, so scripted runs only pay for
+# SQLAlchemy and the models once the command needs them
+if __name__ == '__main__' and len(sys.argv) > 1:
+    import cli
+
+    sys.exit(cli.main(sys.argv[1:]))
+
+from sqlalchemy import create_engine, cast, delete, event, func, insert, inspect, select, tuple_, union_all, update, Column, Index, Integer, String, ForeignKey, Date, DateTime, Text, DECIMAL
+from sqlalchemy.engine import Connection, make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, sessionmaker
+from sqlalchemy.orm import joinedload, make_transient_to_detached, relationship, selectinload, sessionmaker, Session
+from cache import LookupCache
+import configparser
+import contextlib
 import datetime
+import functools
+from decimal import Decimal
+import os
 
 Base = declarative_base()
 
@@ -30,6 +46,10 @@ class Vehicle(Base):
     year = Column(Integer, nullable=False)
     license_plate = Column(String(20), unique=True, nullable=False)
 
+    __table_args__ = (
+        Index('ix_vehicles_customer_id', 'customer_id'),
+    )
+
     owner = relationship("Customer", back_populates="vehicles")
     service_tickets = relationship("ServiceTicket", back_populates="vehicle")
 
@@ -57,6 +77,13 @@ class ServiceTicket(Base):
     service_description = Column(Text, nullable=False)
     cost = Column(DECIMAL, nullable=False)
 
+    # The composites also serve plain customer_id / vin lookups through their leading column
+    __table_args__ = (
+        Index('ix_service_tickets_customer_id_ticket_date', 'customer_id', 'ticket_date'),
+        Index('ix_service_tickets_vin_ticket_date', 'vin', 'ticket_date'),
+        Index('ix_service_tickets_ticket_date', 'ticket_date'),
+    )
+
     vehicle = relationship("Vehicle", back_populates="service_tickets")
     customer = relationship("Customer", back_populates="service_tickets")
     mechanics = relationship("ServiceMechanic", back_populates="service_ticket")
@@ -68,135 +95,946 @@ class ServiceMechanic(Base):
     service_ticket_id = Column(Integer, ForeignKey('service_tickets.ticket_id'), primary_key=True)
     mechanic_id = Column(Integer, ForeignKey('mechanics.mechanic_id'), primary_key=True)
 
+    # The primary key already covers service_ticket_id lookups
+    __table_args__ = (
+        Index('ix_service_mechanics_mechanic_id', 'mechanic_id'),
+    )
+
     service_ticket = relationship("ServiceTicket", back_populates="mechanics")
     mechanic = relationship("Mechanic", back_populates="service_tickets")
 
+# Daily Revenue Summary Table (kept up to date by the service ticket helpers)
+class DailyRevenue(Base):
+    __tablename__ = 'daily_revenue'
+
+    day = Column(Date, primary_key=True)
+    ticket_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(DECIMAL, nullable=False, default=0)
+
+# Mechanic Ticket Count Summary Table (kept up to date by the service mechanic helpers)
+class MechanicTicketCount(Base):
+    __tablename__ = 'mechanic_ticket_counts'
+
+    mechanic_id = Column(Integer, ForeignKey('mechanics.mechanic_id'), primary_key=True)
+    ticket_count = Column(Integer, nullable=False, default=0)
+
+# Schema Version Table (single row, lets startup skip create_all when the database is current)
+class SchemaVersion(Base):
+    __tablename__ = 'schema_version'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+
+DEFAULT_DATABASE_URL = 'sqlite:///:memory:'
+
+# Settings can come from the [database] section of the file named by PRACTICE1_CONFIG
+# and are overridden by PRACTICE1_<KEY> environment variables, e.g. PRACTICE1_POOL_SIZE=10
+CONFIG_ENV_PREFIX = 'PRACTICE1_'
+CONFIG_KEYS = ('database_url', 'pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle', 'pool_pre_ping', 'sqlite_profile')
+
+# Pragmas applied to every new connection of a file-backed SQLite database
+SQLITE_PRAGMA_PROFILES = {
+    'default': {},
+    'tuned': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 268435456,  # 256 MiB
+        'cache_size': -65536,  # negative values are KiB, so 64 MiB
+    },
+}
+DEFAULT_SQLITE_PROFILE = 'tuned'
+
+
+def load_database_config(path=None, environ=None):
+    environ = os.environ if environ is None else environ
+    config = {}
+    path = path or environ.get(CONFIG_ENV_PREFIX + 'CONFIG')
+    if path:
+        parser = configparser.ConfigParser()
+        if not parser.read(path):
+            raise FileNotFoundError(f'Config file {path} not found')
+        if parser.has_section('database'):
+            config.update((key, value) for key, value in parser.items('database') if key in CONFIG_KEYS)
+    for key in CONFIG_KEYS:
+        value = environ.get(CONFIG_ENV_PREFIX + key.upper())
+        if value is not None:
+            config[key] = value
+    return config
+
+
+def _as_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+
+def _install_sqlite_pragmas(engine, pragmas):
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+# Resolves the URL, create_engine() keyword arguments and SQLite pragmas for a configuration
+def _engine_options(config, default_url, overrides):
+    settings = dict(load_database_config() if config is None else config)
+    settings.update((key, value) for key, value in overrides.items() if value is not None)
+    url = make_url(settings.get('database_url') or default_url)
+    is_sqlite = url.get_backend_name() == 'sqlite'
+    in_memory = is_sqlite and url.database in (None, '', ':memory:')
+
+    kwargs = {}
+    # In-memory SQLite lives on a single connection, so queue pool settings don't apply
+    if not in_memory:
+        for key, convert in (('pool_size', int), ('max_overflow', int), ('pool_timeout', float), ('pool_recycle', int)):
+            if settings.get(key) not in (None, ''):
+                kwargs[key] = convert(settings[key])
+    if settings.get('pool_pre_ping') not in (None, ''):
+        kwargs['pool_pre_ping'] = _as_bool(settings['pool_pre_ping'])
+
+    pragmas = {}
+    if is_sqlite and not in_memory:
+        profile = settings.get('sqlite_profile') or DEFAULT_SQLITE_PROFILE
+        if profile not in SQLITE_PRAGMA_PROFILES:
+            raise ValueError(f'Unknown SQLite profile {profile!r}, expected one of {", ".join(SQLITE_PRAGMA_PROFILES)}')
+        pragmas = SQLITE_PRAGMA_PROFILES[profile]
+    return url, kwargs, pragmas
+
+
+def make_engine(config=None, default_url=DEFAULT_DATABASE_URL, **overrides):
+    url, kwargs, pragmas = _engine_options(config, default_url, overrides)
+    engine = create_engine(url, **kwargs)
+    if pragmas:
+        _install_sqlite_pragmas(engine, pragmas)
+    return engine
+
+
+# Engines get a transaction of their own; a Connection (e.g. the one AsyncConnection.run_sync()
+# hands over) is used as it is, inside the transaction its owner began
+@contextlib.contextmanager
+def _begin(bind):
+    if isinstance(bind, Connection):
+        yield bind
+    else:
+        with bind.begin() as conn:
+            yield conn
+
+
+# create_all only builds indexes together with a new table, so existing databases pick up
+# indexes added to the models here
+def ensure_indexes(engine):
+    with _begin(engine) as conn:
+        return _ensure_indexes(conn)
+
+
+def _ensure_indexes(conn):
+    created = []
+    inspector = inspect(conn)
+    tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name not in existing:
+                index.create(conn)
+                created.append(index.name)
+    return created
+
+
+def init_schema(engine):
+    Base.metadata.create_all(engine)
+    return ensure_indexes(engine)
+
+
+# Bump whenever the tables, indexes or anything ensure_schema() installs change, so existing
+# databases are brought up to date the next time they are opened
+SCHEMA_VERSION = 1
+
+
+def stored_schema_version(engine):
+    with _begin(engine) as conn:
+        if not inspect(conn).has_table(SchemaVersion.__tablename__):
+            return None  # created before versions were stored, or empty
+        return conn.scalar(select(SchemaVersion.version).where(SchemaVersion.id == 1))
+
+
+# Startup path for the menu and the CLI: a current database costs one primary key read. Otherwise
+# the tables and indexes are created along with the archive, change log and (SQLite) search
+# tables, and the version is stored. Returns the names of the indexes created, None if skipped.
+# engine may also be a Connection, every step then runs in the transaction already open on it.
+def ensure_schema(engine, force=False):
+    stored = stored_schema_version(engine)
+    if not force and stored is not None and stored >= SCHEMA_VERSION:
+        return None
+    import archive
+    import changelog
+
+    created = init_schema(engine)
+    archive.install_archive(engine)
+    changelog.install_change_log(engine)
+    if engine.dialect.name == 'sqlite':
+        import search
+
+        created.extend(search.install_search(engine))
+    with _begin(engine) as conn:
+        values = {'version': max(SCHEMA_VERSION, stored or 0), 'updated_at': datetime.datetime.utcnow()}
+        if conn.execute(update(SchemaVersion).where(SchemaVersion.id == 1).values(**values)).rowcount == 0:
+            conn.execute(insert(SchemaVersion).values(id=1, **values))
+    return created
+
+
+DEFAULT_YIELD_PER = 1000
+
+
+# Keyset pagination: rows come back in primary key order, pass the last key seen as `after` to get the next page
+def _read_page(session, model, key_columns, after=None, limit=None):
+    query = session.query(model).order_by(*key_columns)
+    if after is not None:
+        if len(key_columns) == 1:
+            query = query.filter(key_columns[0] > after)
+        else:
+            query = query.filter(tuple_(*key_columns) > tuple(after))
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+
+# Streams rows through a server-side cursor so only batch_size objects are alive at a time
+def _iter_rows(session, model, key_columns, batch_size=DEFAULT_YIELD_PER):
+    query = session.query(model).order_by(*key_columns).execution_options(stream_results=True).yield_per(batch_size)
+    for row in query:
+        yield row
+
+
+# Columns the listing screens show, used when list_* is called without columns
+LISTING_COLUMNS = {
+    'customers': ('customer_id', 'first_name', 'last_name'),
+    'vehicles': ('vin', 'make', 'model'),
+    'mechanics': ('mechanic_id', 'first_name', 'last_name'),
+    'service_tickets': ('ticket_id', 'service_description'),
+    'service_mechanics': ('service_ticket_id', 'mechanic_id'),
+}
+
+
+def _projection(model, columns):
+    table = model.__table__
+    columns = columns or LISTING_COLUMNS[table.name]
+    unknown = [name for name in columns if name not in table.c]
+    if unknown:
+        raise ValueError(f'Unknown {table.name} columns: {", ".join(unknown)}')
+    return [table.c[name] for name in columns]
+
+
+# Projection reads for listings: a Core select() of only the requested columns, streamed as Row
+# named tuples. Nothing is added to the identity map, so rows cost a tuple each instead of a tracked
+# object. Paging with after/limit works as for read_*.
+def _list_rows(session, model, key_columns, columns=None, after=None, limit=None, batch_size=DEFAULT_YIELD_PER):
+    table = model.__table__
+    keys = [table.c[column.key] for column in key_columns]
+    statement = select(*_projection(model, columns)).order_by(*keys)
+    if after is not None:
+        statement = statement.where(keys[0] > after if len(keys) == 1 else tuple_(*keys) > tuple(after))
+    if limit is not None:
+        statement = statement.limit(limit)
+    result = session.execute(statement.execution_options(yield_per=batch_size))
+    for row in result:
+        yield row
+
+
+# Set-based writes: one UPDATE/DELETE statement, no SELECT first, returns the number of affected rows
+def _key_criteria(key_columns, keys):
+    if len(key_columns) == 1:
+        return key_columns[0].in_(keys)
+    return tuple_(*key_columns).in_([tuple(key) for key in keys])
+
+
+def _batch_criteria(key_columns, keys, where):
+    if keys is None and where is None:
+        raise ValueError('Pass the primary keys or a where clause to select the rows to change')
+    criteria = []
+    if keys is not None:
+        criteria.append(_key_criteria(key_columns, keys))
+    if where is not None:
+        criteria.extend(where if isinstance(where, (list, tuple)) else [where])
+    return criteria
+
+
+# keys are the primary keys being changed, used to invalidate the lookup cache; None means not known up front
+def _update_where(session, model, criteria, values, keys=None):
+    if not values:
+        return 0
+    result = session.execute(update(model).where(*criteria).values(**values))
+    _commit(session)
+    _invalidate_lookups(session, model, keys)
+    return result.rowcount
+
+
+def _delete_where(session, model, criteria, keys=None):
+    result = session.execute(delete(model).where(*criteria))
+    _commit(session)
+    _invalidate_lookups(session, model, keys)
+    return result.rowcount
+
+
+def _update_batch(session, model, key_columns, keys, where, values):
+    keys = list(keys) if keys is not None else None
+    criteria = _batch_criteria(key_columns, keys, where)
+    return _update_where(session, model, criteria, values, keys=keys if where is None else None)
+
+
+def _delete_batch(session, model, key_columns, keys, where):
+    keys = list(keys) if keys is not None else None
+    criteria = _batch_criteria(key_columns, keys, where)
+    return _delete_where(session, model, criteria, keys=keys if where is None else None)
+
+
+# Helpers commit their own changes unless they run inside unit_of_work(), which lets the caller
+# group several writes into one transaction. Scopes may nest; only the outermost one commits,
+# and an exception anywhere rolls back the whole unit.
+UNIT_OF_WORK_KEY = 'practice1_unit_of_work'
+PENDING_INVALIDATIONS_KEY = 'practice1_pending_invalidations'
+
+
+# Loaded objects stay usable after commit instead of being reloaded on the next attribute access
+def make_sessionmaker(engine):
+    return sessionmaker(bind=engine, expire_on_commit=False)
+
+
+def in_unit_of_work(session):
+    return session.info.get(UNIT_OF_WORK_KEY, 0) > 0
+
+
+def _begin_unit_of_work(session):
+    depth = session.info.get(UNIT_OF_WORK_KEY, 0)
+    session.info[UNIT_OF_WORK_KEY] = depth + 1
+    return depth
+
+
+def _end_unit_of_work(session, depth):
+    session.info[UNIT_OF_WORK_KEY] = depth
+
+
+@contextlib.contextmanager
+def unit_of_work(session):
+    depth = _begin_unit_of_work(session)
+    try:
+        yield session
+        if depth == 0:
+            session.commit()
+    except BaseException:
+        if depth == 0:
+            session.rollback()
+        raise
+    finally:
+        _end_unit_of_work(session, depth)
+
+
+# Sessions that send reads to replicas (see replicas.py) keep every statement inside use_primary()
+# on the primary, for reads that decide what is written next and must not see a lagging copy
+PRIMARY_ONLY_KEY = 'practice1_primary_only'
+
+
+@contextlib.contextmanager
+def use_primary(session):
+    depth = session.info.get(PRIMARY_ONLY_KEY, 0)
+    session.info[PRIMARY_ONLY_KEY] = depth + 1
+    try:
+        yield session
+    finally:
+        session.info[PRIMARY_ONLY_KEY] = depth
+
+
+def _on_primary(function):
+    @functools.wraps(function)
+    def wrapper(session, *args, **kwargs):
+        with use_primary(session):
+            return function(session, *args, **kwargs)
+    return wrapper
+
+
+# Inside a unit of work the changes are only flushed, so generated keys are available
+def _commit(session):
+    if in_unit_of_work(session):
+        session.flush()
+    else:
+        session.commit()
+
+
+# Optional read-through cache for single-row lookups by primary key or unique column, off by default
+lookup_cache = None
+CACHED_MODELS = (Customer, Vehicle, Mechanic)
+
+
+def enable_lookup_cache(maxsize=1024, ttl=300):
+    global lookup_cache
+    lookup_cache = LookupCache(maxsize=maxsize, ttl=ttl)
+    return lookup_cache
+
+
+def disable_lookup_cache():
+    global lookup_cache
+    lookup_cache = None
+
+
+def _invalidate_lookups(session, model, keys):
+    cache = lookup_cache
+    if cache is None or model not in CACHED_MODELS:
+        return
+    if session is not None and in_unit_of_work(session):
+        session.info.setdefault(PENDING_INVALIDATIONS_KEY, []).append((model, keys))
+    if keys is None:
+        cache.invalidate_table(model.__tablename__)
+        return
+    pk_column = model.__mapper__.primary_key[0].key
+    for key in keys:
+        cache.invalidate(model.__tablename__, pk_column, key)
+
+
+# Objects changed or deleted through the ORM (including ones the cache handed out) are flushed
+# without going through the helpers above, so every flush invalidates the rows it wrote. Another
+# session may cache the old row again before this transaction ends, so the rows are invalidated
+# once more on commit or rollback.
+@event.listens_for(Session, 'after_flush')
+def _invalidate_flushed_lookups(session, flush_context):
+    if lookup_cache is None:
+        return
+    changed = {}
+    for instance in [*session.dirty, *session.deleted]:
+        if isinstance(instance, CACHED_MODELS):
+            model = type(instance)
+            pk = model.__mapper__.primary_key[0].key
+            keys = changed.setdefault(model, set())
+            keys.add(getattr(instance, pk))
+            identity = inspect(instance).identity
+            if identity is not None:
+                keys.add(identity[0])  # the key before the flush, if it was changed
+    for model, keys in changed.items():
+        _invalidate_lookups(None, model, keys)
+        session.info.setdefault(PENDING_INVALIDATIONS_KEY, []).append((model, keys))
+
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _invalidate_pending_lookups(session):
+    for model, keys in session.info.pop(PENDING_INVALIDATIONS_KEY, []):
+        _invalidate_lookups(None, model, keys)
+
+
+def _lookup(session, model, column, value):
+    cache = lookup_cache
+    if cache is None:
+        return session.query(model).filter(column == value).one_or_none()
+
+    table = model.__tablename__
+    row = cache.lookup(table, column.key, value)
+    if row is not None:
+        pk = row[model.__mapper__.primary_key[0].key]
+        # The session's own copy may have unflushed changes, which a merge would overwrite
+        instance = session.identity_map.get(session.identity_key(model, pk))
+        if instance is not None:
+            if getattr(instance, column.key) == value:
+                return instance
+            return session.query(model).filter(column == value).one_or_none()
+        # Rebuild a clean persistent object without going to the database
+        instance = model(**row)
+        make_transient_to_detached(instance)
+        return session.merge(instance, load=False)
+
+    # Whatever a miss reads is shared with every session, so it must not come from a lagging read
+    # replica (see replicas.py): that would put back rows an update has just invalidated
+    with use_primary(session):
+        instance = session.query(model).filter(column == value).one_or_none()
+    if instance is not None:
+        mapper = model.__mapper__
+        row = {attribute.key: getattr(instance, attribute.key) for attribute in mapper.column_attrs}
+        unique_columns = [c.key for c in model.__table__.columns if c.unique]
+        cache.remember(table, mapper.primary_key[0].key, row, unique_columns)
+    return instance
+
 
 def create_customer(session, first_name, last_name, phone, email, address=None):
     new_customer = Customer(first_name=first_name, last_name=last_name, phone=phone, email=email, address=address)
     session.add(new_customer)
-    session.commit()
+    _commit(session)
     return new_customer
 
 
-def read_customers(session):
-    return session.query(Customer).all()
+def read_customers(session, after=None, limit=None):
+    return _read_page(session, Customer, (Customer.customer_id,), after, limit)
+
+
+def iter_customers(session, batch_size=DEFAULT_YIELD_PER):
+    return _iter_rows(session, Customer, (Customer.customer_id,), batch_size)
+
+
+def list_customers(session, columns=None, after=None, limit=None, batch_size=DEFAULT_YIELD_PER):
+    return _list_rows(session, Customer, (Customer.customer_id,), columns, after, limit, batch_size)
+
+
+def get_customer(session, customer_id):
+    return _lookup(session, Customer, Customer.customer_id, customer_id)
+
+
+def get_customer_by_email(session, email):
+    return _lookup(session, Customer, Customer.email, email)
+
+
+def get_customer_by_phone(session, phone):
+    return _lookup(session, Customer, Customer.phone, phone)
 
 
 def update_customer(session, customer_id, **kwargs):
-    customer = session.query(Customer).filter_by(customer_id=customer_id).first()
-    for key, value in kwargs.items():
-        setattr(customer, key, value)
-    session.commit()
+    return _update_where(session, Customer, [Customer.customer_id == customer_id], kwargs, keys=[customer_id])
+
+
+def update_customers(session, customer_ids=None, where=None, **kwargs):
+    return _update_batch(session, Customer, (Customer.customer_id,), customer_ids, where, kwargs)
 
 
 def delete_customer(session, customer_id):
-    customer = session.query(Customer).filter_by(customer_id=customer_id).first()
-    session.delete(customer)
-    session.commit()
+    return _delete_where(session, Customer, [Customer.customer_id == customer_id], keys=[customer_id])
+
+
+def delete_customers(session, customer_ids=None, where=None):
+    return _delete_batch(session, Customer, (Customer.customer_id,), customer_ids, where)
 
 
 def create_vehicle(session, vin, customer_id, make, model, year, license_plate):
     new_vehicle = Vehicle(vin=vin, customer_id=customer_id, make=make, model=model, year=year, license_plate=license_plate)
     session.add(new_vehicle)
-    session.commit()
+    _commit(session)
     return new_vehicle
 
 
-def read_vehicles(session):
-    return session.query(Vehicle).all()
+def read_vehicles(session, after=None, limit=None):
+    return _read_page(session, Vehicle, (Vehicle.vin,), after, limit)
+
+
+def iter_vehicles(session, batch_size=DEFAULT_YIELD_PER):
+    return _iter_rows(session, Vehicle, (Vehicle.vin,), batch_size)
+
+
+def list_vehicles(session, columns=None, after=None, limit=None, batch_size=DEFAULT_YIELD_PER):
+    return _list_rows(session, Vehicle, (Vehicle.vin,), columns, after, limit, batch_size)
+
+
+def get_vehicle(session, vin):
+    return _lookup(session, Vehicle, Vehicle.vin, vin)
+
+
+def get_vehicle_by_license_plate(session, license_plate):
+    return _lookup(session, Vehicle, Vehicle.license_plate, license_plate)
 
 
 def update_vehicle(session, vin, **kwargs):
-    vehicle = session.query(Vehicle).filter_by(vin=vin).first()
-    for key, value in kwargs.items():
-        setattr(vehicle, key, value)
-    session.commit()
+    return _update_where(session, Vehicle, [Vehicle.vin == vin], kwargs, keys=[vin])
+
+
+def update_vehicles(session, vins=None, where=None, **kwargs):
+    return _update_batch(session, Vehicle, (Vehicle.vin,), vins, where, kwargs)
 
 
 def delete_vehicle(session, vin):
-    vehicle = session.query(Vehicle).filter_by(vin=vin).first()
-    session.delete(vehicle)
-    session.commit()
+    return _delete_where(session, Vehicle, [Vehicle.vin == vin], keys=[vin])
+
+
+def delete_vehicles(session, vins=None, where=None):
+    return _delete_batch(session, Vehicle, (Vehicle.vin,), vins, where)
 
 
 def create_mechanic(session, first_name, last_name, email, phone=None, salary=None):
     new_mechanic = Mechanic(first_name=first_name, last_name=last_name, email=email, phone=phone, salary=salary)
     session.add(new_mechanic)
-    session.commit()
+    _commit(session)
     return new_mechanic
 
 
-def read_mechanics(session):
-    return session.query(Mechanic).all()
+def read_mechanics(session, after=None, limit=None):
+    return _read_page(session, Mechanic, (Mechanic.mechanic_id,), after, limit)
+
+
+def iter_mechanics(session, batch_size=DEFAULT_YIELD_PER):
+    return _iter_rows(session, Mechanic, (Mechanic.mechanic_id,), batch_size)
+
+
+def list_mechanics(session, columns=None, after=None, limit=None, batch_size=DEFAULT_YIELD_PER):
+    return _list_rows(session, Mechanic, (Mechanic.mechanic_id,), columns, after, limit, batch_size)
+
+
+def get_mechanic(session, mechanic_id):
+    return _lookup(session, Mechanic, Mechanic.mechanic_id, mechanic_id)
+
+
+def get_mechanic_by_email(session, email):
+    return _lookup(session, Mechanic, Mechanic.email, email)
 
 
 def update_mechanic(session, mechanic_id, **kwargs):
-    mechanic = session.query(Mechanic).filter_by(mechanic_id=mechanic_id).first()
-    for key, value in kwargs.items():
-        setattr(mechanic, key, value)
-    session.commit()
+    return _update_where(session, Mechanic, [Mechanic.mechanic_id == mechanic_id], kwargs, keys=[mechanic_id])
+
+
+def update_mechanics(session, mechanic_ids=None, where=None, **kwargs):
+    return _update_batch(session, Mechanic, (Mechanic.mechanic_id,), mechanic_ids, where, kwargs)
 
 
 def delete_mechanic(session, mechanic_id):
-    mechanic = session.query(Mechanic).filter_by(mechanic_id=mechanic_id).first()
-    session.delete(mechanic)
-    session.commit()
+    return _delete_where(session, Mechanic, [Mechanic.mechanic_id == mechanic_id], keys=[mechanic_id])
+
+
+def delete_mechanics(session, mechanic_ids=None, where=None):
+    return _delete_batch(session, Mechanic, (Mechanic.mechanic_id,), mechanic_ids, where)
 
 
 def create_service_ticket(session, vin, customer_id, ticket_date, service_description, cost):
+    ticket_date = _as_datetime(ticket_date) or datetime.datetime.utcnow()
     new_service_ticket = ServiceTicket(vin=vin, customer_id=customer_id, ticket_date=ticket_date, service_description=service_description, cost=cost)
     session.add(new_service_ticket)
-    session.commit()
+    _add_ticket_summaries(session, [(ticket_date, cost)])
+    _commit(session)
     return new_service_ticket
 
 
-def read_service_tickets(session):
-    return session.query(ServiceTicket).all()
+def read_service_tickets(session, after=None, limit=None):
+    return _read_page(session, ServiceTicket, (ServiceTicket.ticket_id,), after, limit)
 
 
-def update_service_ticket(session, ticket_id, **kwargs):
-    service_ticket = session.query(ServiceTicket).filter_by(ticket_id=ticket_id).first()
-    for key, value in kwargs.items():
-        setattr(service_ticket, key, value)
-    session.commit()
+def iter_service_tickets(session, batch_size=DEFAULT_YIELD_PER):
+    return _iter_rows(session, ServiceTicket, (ServiceTicket.ticket_id,), batch_size)
 
 
+def list_service_tickets(session, columns=None, after=None, limit=None, batch_size=DEFAULT_YIELD_PER):
+    return _list_rows(session, ServiceTicket, (ServiceTicket.ticket_id,), columns, after, limit, batch_size)
+
+
+@_on_primary
+def update_service_ticket(session, ticket_id, **kwargs):
+    if not kwargs:
+        return 0
+    if 'ticket_date' in kwargs:
+        kwargs['ticket_date'] = _as_datetime(kwargs['ticket_date'])
+    criteria = [ServiceTicket.ticket_id == ticket_id]
+    # Only the old date and cost are needed, and only when the daily revenue moves
+    old = None
+    if SUMMARY_TICKET_COLUMNS & kwargs.keys():
+        old = session.execute(select(ServiceTicket.ticket_date, ServiceTicket.cost).where(*criteria)).first()
+    count = session.execute(update(ServiceTicket).where(*criteria).values(**kwargs)).rowcount
+    if old is not None and count:
+        _add_ticket_summaries(session, [(old.ticket_date, old.cost)], sign=-1)
+        _add_ticket_summaries(session, [(kwargs.get('ticket_date', old.ticket_date), kwargs.get('cost', old.cost))])
+    _commit(session)
+    return count
+
+
+@_on_primary
+def update_service_tickets(session, ticket_ids=None, where=None, **kwargs):
+    if not kwargs:
+        return 0
+    if 'ticket_date' in kwargs:
+        kwargs['ticket_date'] = _as_datetime(kwargs['ticket_date'])
+    criteria = _batch_criteria((ServiceTicket.ticket_id,), ticket_ids, where)
+    days = set()
+    if SUMMARY_TICKET_COLUMNS & kwargs.keys():
+        days = _ticket_days(session, criteria)
+        if kwargs.get('ticket_date') is not None:
+            days.add(kwargs['ticket_date'].date())
+    count = session.execute(update(ServiceTicket).where(*criteria).values(**kwargs)).rowcount
+    _refresh_daily_revenue(session, days)
+    _commit(session)
+    return count
+
+
+@_on_primary
 def delete_service_ticket(session, ticket_id):
-    service_ticket = session.query(ServiceTicket).filter_by(ticket_id=ticket_id).first()
-    session.delete(service_ticket)
-    session.commit()
+    criteria = [ServiceTicket.ticket_id == ticket_id]
+    old = session.execute(select(ServiceTicket.ticket_date, ServiceTicket.cost).where(*criteria)).first()
+    count = session.execute(delete(ServiceTicket).where(*criteria)).rowcount
+    if old is not None and count:
+        _add_ticket_summaries(session, [(old.ticket_date, old.cost)], sign=-1)
+    _commit(session)
+    return count
+
+
+@_on_primary
+def delete_service_tickets(session, ticket_ids=None, where=None):
+    criteria = _batch_criteria((ServiceTicket.ticket_id,), ticket_ids, where)
+    days = _ticket_days(session, criteria)
+    count = session.execute(delete(ServiceTicket).where(*criteria)).rowcount
+    _refresh_daily_revenue(session, days)
+    _commit(session)
+    return count
 
 
 def create_service_mechanic(session, service_ticket_id, mechanic_id):
     new_service_mechanic = ServiceMechanic(service_ticket_id=service_ticket_id, mechanic_id=mechanic_id)
     session.add(new_service_mechanic)
-    session.commit()
+    _add_mechanic_ticket_counts(session, {mechanic_id: 1})
+    _commit(session)
     return new_service_mechanic
 
 
-def read_service_mechanics(session):
-    return session.query(ServiceMechanic).all()
+def read_service_mechanics(session, after=None, limit=None):
+    return _read_page(session, ServiceMechanic, (ServiceMechanic.service_ticket_id, ServiceMechanic.mechanic_id), after, limit)
+
+
+def iter_service_mechanics(session, batch_size=DEFAULT_YIELD_PER):
+    return _iter_rows(session, ServiceMechanic, (ServiceMechanic.service_ticket_id, ServiceMechanic.mechanic_id), batch_size)
+
+
+def list_service_mechanics(session, columns=None, after=None, limit=None, batch_size=DEFAULT_YIELD_PER):
+    return _list_rows(session, ServiceMechanic, (ServiceMechanic.service_ticket_id, ServiceMechanic.mechanic_id), columns, after, limit, batch_size)
 
 
 def update_service_mechanic(session, service_ticket_id, mechanic_id, **kwargs):
-    service_mechanic = session.query(ServiceMechanic).filter_by(service_ticket_id=service_ticket_id, mechanic_id=mechanic_id).first()
-    for key, value in kwargs.items():
-        setattr(service_mechanic, key, value)
-    session.commit()
+    return _update_service_mechanics(session, [ServiceMechanic.service_ticket_id == service_ticket_id, ServiceMechanic.mechanic_id == mechanic_id], kwargs)
 
 
-def delete_service_mechanic(session, service_ticket_id, mechanic_id):
-    service_mechanic = session.query(ServiceMechanic).filter_by(service_ticket_id=service_ticket_id, mechanic_id=mechanic_id).first()
-    session.delete(service_mechanic)
-    session.commit()
+# keys are (service_ticket_id, mechanic_id) pairs
+def update_service_mechanics(session, keys=None, where=None, **kwargs):
+    return _update_service_mechanics(session, _batch_criteria((ServiceMechanic.service_ticket_id, ServiceMechanic.mechanic_id), keys, where), kwargs)
 
 
-def main():
-    engine = create_engine('sqlite:///:memory:')
-    Base.metadata.create_all(engine)
-    Session = sessionmaker(bind=engine)
-    session = Session()
+@_on_primary
+def _update_service_mechanics(session, criteria, values):
+    if not values:
+        return 0
+    moved = _assignment_counts(session, criteria) if 'mechanic_id' in values else {}
+    count = session.execute(update(ServiceMechanic).where(*criteria).values(**values)).rowcount
+    if moved and count:
+        deltas = {mechanic_id: -assignments for mechanic_id, assignments in moved.items()}
+        deltas[values['mechanic_id']] = deltas.get(values['mechanic_id'], 0) + count
+        _add_mechanic_ticket_counts(session, deltas)
+    _commit(session)
+    return count
+
+
+def delete_service_mechanic(session, service_ticket_id, mechanic_id):
+    count = session.execute(delete(ServiceMechanic).where(ServiceMechanic.service_ticket_id == service_ticket_id, ServiceMechanic.mechanic_id == mechanic_id)).rowcount
+    _add_mechanic_ticket_counts(session, {mechanic_id: -count})
+    _commit(session)
+    return count
+
+
+@_on_primary
+def delete_service_mechanics(session, keys=None, where=None):
+    criteria = _batch_criteria((ServiceMechanic.service_ticket_id, ServiceMechanic.mechanic_id), keys, where)
+    removed = _assignment_counts(session, criteria)
+    count = session.execute(delete(ServiceMechanic).where(*criteria)).rowcount
+    _add_mechanic_ticket_counts(session, {mechanic_id: -assignments for mechanic_id, assignments in removed.items()})
+    _commit(session)
+    return count
+
+
+# Creates a ticket and its mechanic assignments in one transaction: one INSERT for the ticket,
+# one executemany for the assignments and one summary update each for revenue and mechanic counts
+def open_ticket(session, vin, customer_id, service_description, cost, mechanic_ids=(), ticket_date=None):
+    ticket_date = _as_datetime(ticket_date) or datetime.datetime.utcnow()
+    mechanic_ids = list(dict.fromkeys(mechanic_ids))
+    with unit_of_work(session):
+        ticket = ServiceTicket(vin=vin, customer_id=customer_id, ticket_date=ticket_date, service_description=service_description, cost=cost)
+        session.add(ticket)
+        session.flush()
+        if mechanic_ids:
+            session.execute(insert(ServiceMechanic), [{'service_ticket_id': ticket.ticket_id, 'mechanic_id': mechanic_id} for mechanic_id in mechanic_ids])
+        _add_ticket_summaries(session, [(ticket_date, cost)])
+        _add_mechanic_ticket_counts(session, dict.fromkeys(mechanic_ids, 1))
+    return ticket
+
+
+# Summary tables: the helpers above adjust them in the same transaction as the change itself, so
+# dashboard reads are single primary key lookups. rebuild_summaries() recomputes them from scratch.
+SUMMARY_TICKET_COLUMNS = {'ticket_date', 'cost'}
+
+
+def _as_datetime(value):
+    if isinstance(value, str):
+        return datetime.datetime.fromisoformat(value)
+    if isinstance(value, datetime.date) and not isinstance(value, datetime.datetime):
+        return datetime.datetime.combine(value, datetime.time())
+    return value
+
+
+def _as_date(value):
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value)
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    return value
+
+
+def _day_expression(dialect_name, column):
+    if dialect_name == 'sqlite':
+        return func.date(column)
+    return cast(column, Date)
+
+
+def _upsert_counter(session, table, key_column, key, increments):
+    result = session.execute(
+        update(table).where(key_column == key).values({name: table.c[name] + delta for name, delta in increments.items()})
+    )
+    if result.rowcount == 0:
+        session.execute(insert(table).values({key_column.name: key, **increments}))
+
+
+# tickets are (ticket_date, cost) pairs, sign=-1 takes them back out
+def _add_ticket_summaries(session, tickets, sign=1):
+    deltas = {}
+    for ticket_date, cost in tickets:
+        if ticket_date is None:
+            continue
+        count, revenue = deltas.get(ticket_date.date(), (0, Decimal(0)))
+        deltas[ticket_date.date()] = (count + sign, revenue + sign * Decimal(str(cost)))
+    table = DailyRevenue.__table__
+    for day, (count, revenue) in sorted(deltas.items()):
+        _upsert_counter(session, table, table.c.day, day, {'ticket_count': count, 'revenue': revenue})
+
+
+# One UPDATE per distinct delta, usually just one; rows are only inserted for mechanics without a summary yet
+def _add_mechanic_ticket_counts(session, deltas):
+    table = MechanicTicketCount.__table__
+    by_delta = {}
+    for mechanic_id, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(mechanic_id)
+    for delta, mechanic_ids in sorted(by_delta.items()):
+        mechanic_ids.sort()
+        updated = session.execute(
+            update(table).where(table.c.mechanic_id.in_(mechanic_ids)).values(ticket_count=table.c.ticket_count + delta)
+        ).rowcount
+        if updated < len(mechanic_ids):
+            existing = set(session.scalars(select(table.c.mechanic_id).where(table.c.mechanic_id.in_(mechanic_ids)))) if updated else set()
+            session.execute(insert(table), [{'mechanic_id': mechanic_id, 'ticket_count': delta} for mechanic_id in mechanic_ids if mechanic_id not in existing])
+
+
+def _ticket_days(session, criteria):
+    day = _day_expression(session.get_bind().dialect.name, ServiceTicket.ticket_date)
+    rows = session.execute(select(day).where(*criteria, ServiceTicket.ticket_date.is_not(None)).distinct())
+    return {_as_date(row[0]) for row in rows}
+
+
+def _assignment_counts(session, criteria):
+    rows = session.execute(select(ServiceMechanic.mechanic_id, func.count()).where(*criteria).group_by(ServiceMechanic.mechanic_id))
+    return {mechanic_id: count for mechanic_id, count in rows}
+
+
+# Recomputes the given days from service_tickets, used when a batch change makes per-row deltas impractical
+# Tickets moved to the archive (see archive.py) keep counting towards the summaries, so these read
+# the archive tables of the years overlapping start <= ticket_date < end next to the live ones
+def _summary_sources(session, start=None, end=None):
+    import archive
+
+    tickets, assignments = [ServiceTicket.__table__], [ServiceMechanic.__table__]
+    for ticket_table, mechanic_table in archive.partition_tables(session, start, end):
+        tickets.append(ticket_table)
+        assignments.append(mechanic_table)
+    return tickets, assignments
+
+
+def _combined(selects):
+    return (selects[0] if len(selects) == 1 else union_all(*selects)).subquery()
+
+
+def _refresh_daily_revenue(session, days):
+    days = sorted(days)
+    if not days:
+        return
+    table = DailyRevenue.__table__
+    first = datetime.datetime.combine(days[0], datetime.time())
+    tickets, _ = _summary_sources(session, first, datetime.datetime.combine(days[-1], datetime.time()) + datetime.timedelta(days=1))
+    for day in days:
+        start = datetime.datetime.combine(day, datetime.time())
+        end = start + datetime.timedelta(days=1)
+        rows = _combined([select(source.c.cost).where(source.c.ticket_date >= start, source.c.ticket_date < end) for source in tickets])
+        count, revenue = session.execute(select(func.count(), func.coalesce(func.sum(rows.c.cost), 0)).select_from(rows)).one()
+        session.execute(delete(table).where(table.c.day == day))
+        if count:
+            session.execute(insert(table).values(day=day, ticket_count=count, revenue=revenue))
+
+
+def rebuild_summaries(session):
+    revenue_table = DailyRevenue.__table__
+    counts_table = MechanicTicketCount.__table__
+    tickets, assignments = _summary_sources(session)
+    rows = _combined([select(source.c.ticket_date, source.c.cost).where(source.c.ticket_date.is_not(None)) for source in tickets])
+    day = _day_expression(session.get_bind().dialect.name, rows.c.ticket_date)
+    session.execute(delete(revenue_table))
+    session.execute(
+        insert(revenue_table).from_select(
+            ['day', 'ticket_count', 'revenue'],
+            select(day, func.count(), func.sum(rows.c.cost)).group_by(day),
+        )
+    )
+    assigned = _combined([select(source.c.mechanic_id) for source in assignments])
+    session.execute(delete(counts_table))
+    session.execute(
+        insert(counts_table).from_select(
+            ['mechanic_id', 'ticket_count'],
+            select(assigned.c.mechanic_id, func.count()).group_by(assigned.c.mechanic_id),
+        )
+    )
+    _commit(session)
+
+
+def get_daily_revenue(session, day=None):
+    summary = session.get(DailyRevenue, _as_date(day) or datetime.datetime.utcnow().date())
+    return (summary.ticket_count, summary.revenue) if summary is not None else (0, Decimal(0))
+
+
+def get_mechanic_ticket_count(session, mechanic_id):
+    summary = session.get(MechanicTicketCount, mechanic_id)
+    return summary.ticket_count if summary is not None else 0
+
+
+# History loaders fetch the whole graph up front (one query per relationship level, independent of
+# how many vehicles, tickets or assignments there are) so rendering it never lazy loads
+def _ticket_mechanics_loader(path):
+    return path.selectinload(ServiceTicket.mechanics).joinedload(ServiceMechanic.mechanic)
+
+
+def get_customer_history(session, customer_id):
+    return (
+        session.query(Customer)
+        .options(
+            _ticket_mechanics_loader(selectinload(Customer.vehicles).selectinload(Vehicle.service_tickets)),
+            _ticket_mechanics_loader(selectinload(Customer.service_tickets)),
+        )
+        .filter(Customer.customer_id == customer_id)
+        .one_or_none()
+    )
+
+
+def get_vehicle_history(session, vin):
+    return (
+        session.query(Vehicle)
+        .options(
+            joinedload(Vehicle.owner),
+            _ticket_mechanics_loader(selectinload(Vehicle.service_tickets)),
+        )
+        .filter(Vehicle.vin == vin)
+        .one_or_none()
+    )
+
+
+# Menu prompts use blank answers for "leave unchanged"
+def _filled_in(**fields):
+    return {name: value for name, value in fields.items() if value}
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv:
+        import cli
+
+        return cli.run_command(argv)
+
+    engine = make_engine()
+    ensure_schema(engine)
+    session = make_sessionmaker(engine)()
 
     while True:
         print("1. Add Customer")
@@ -219,7 +1057,9 @@ def main():
         print("18. View Service Mechanics")
         print("19. Update Service Mechanic")
         print("20. Delete Service Mechanic")
-        print("21. Exit")
+        print("21. Reports")
+        print("22. Search")
+        print("23. Exit")
         choice = input("Choose an option: ")
 
         if choice == '1':
@@ -232,7 +1072,7 @@ def main():
             print("Customer added!")
 
         elif choice == '2':
-            customers = read_customers(session)
+            customers = list_customers(session)
             for customer in customers:
                 print(f'{customer.customer_id}: {customer.first_name} {customer.last_name}')
 
@@ -242,7 +1082,7 @@ def main():
             last_name = input("New Last Name (leave blank to skip): ")
             phone = input("New Phone (leave blank to skip): ")
             email = input("New Email (leave blank to skip): ")
-            update_customer(session, customer_id, first_name=first_name or None, last_name=last_name or None, phone=phone or None, email=email or None)
+            update_customer(session, customer_id, **_filled_in(first_name=first_name, last_name=last_name, phone=phone, email=email))
             print("Customer updated!")
 
         elif choice == '4':
@@ -261,7 +1101,7 @@ def main():
             print("Vehicle added!")
 
         elif choice == '6':
-            vehicles = read_vehicles(session)
+            vehicles = list_vehicles(session)
             for vehicle in vehicles:
                 print(f'{vehicle.vin}: {vehicle.make} {vehicle.model}')
 
@@ -271,7 +1111,7 @@ def main():
             model = input("New Model (leave blank to skip): ")
             year = input("New Year (leave blank to skip): ")
             license_plate = input("New License Plate (leave blank to skip): ")
-            update_vehicle(session, vin, make=make or None, model=model or None, year=year or None, license_plate=license_plate or None)
+            update_vehicle(session, vin, **_filled_in(make=make, model=model, year=year, license_plate=license_plate))
             print("Vehicle updated!")
 
         elif choice == '8':
@@ -289,7 +1129,7 @@ def main():
             print("Mechanic added!")
 
         elif choice == '10':
-            mechanics = read_mechanics(session)
+            mechanics = list_mechanics(session)
             for mechanic in mechanics:
                 print(f'{mechanic.mechanic_id}: {mechanic.first_name} {mechanic.last_name}')
 
@@ -300,7 +1140,7 @@ def main():
             email = input("New Email (leave blank to skip): ")
             phone = input("New Phone (leave blank to skip): ")
             salary = input("New Salary (leave blank to skip): ")
-            update_mechanic(session, mechanic_id, first_name=first_name or None, last_name=last_name or None, email=email or None, phone=phone or None, salary=salary or None)
+            update_mechanic(session, mechanic_id, **_filled_in(first_name=first_name, last_name=last_name, email=email, phone=phone, salary=salary))
             print("Mechanic updated!")
 
         elif choice == '12':
@@ -318,7 +1158,7 @@ def main():
             print("Service Ticket added!")
 
         elif choice == '14':
-            service_tickets = read_service_tickets(session)
+            service_tickets = list_service_tickets(session)
             for service_ticket in service_tickets:
                 print(f'{service_ticket.ticket_id}: {service_ticket.service_description}')
 
@@ -329,7 +1169,7 @@ def main():
             ticket_date = input("New Ticket Date (leave blank to skip): ")
             service_description = input("New Service Description (leave blank to skip): ")
             cost = input("New Cost (leave blank to skip): ")
-            update_service_ticket(session, ticket_id, vin=vin or None, customer_id=customer_id or None, ticket_date=ticket_date or None, service_description=service_description or None, cost=cost or None)
+            update_service_ticket(session, ticket_id, **_filled_in(vin=vin, customer_id=customer_id, ticket_date=ticket_date, service_description=service_description, cost=cost))
             print("Service Ticket updated!")
 
         elif choice == '16':
@@ -344,7 +1184,7 @@ def main():
             print("Service Mechanic added!")
 
         elif choice == '18':
-            service_mechanics = read_service_mechanics(session)
+            service_mechanics = list_service_mechanics(session)
             for service_mechanic in service_mechanics:
                 print(f'{service_mechanic.service_ticket_id}: {service_mechanic.mechanic_id}')
 
@@ -361,7 +1201,36 @@ def main():
             print("Service Mechanic deleted!")
 
         elif choice == '21':
+            import reporting
+
+            start = input("From date (YYYY-MM-DD, leave blank for all): ")
+            end = input("Until date, exclusive (YYYY-MM-DD, leave blank for all): ")
+            start = datetime.date.fromisoformat(start) if start else None
+            end = datetime.date.fromisoformat(end) if end else None
+            print("Revenue per month:")
+            for month, tickets, revenue in reporting.revenue_by_month(session, start, end):
+                print(f'{month}: {tickets} tickets, {revenue:.2f}')
+            print("Revenue per customer:")
+            for customer_id, first_name, last_name, tickets, revenue in reporting.revenue_by_customer(session, start, end):
+                print(f'{customer_id}: {first_name} {last_name}, {tickets} tickets, {revenue:.2f}')
+            print("Tickets per mechanic:")
+            for mechanic_id, first_name, last_name, tickets, revenue in reporting.tickets_per_mechanic(session, start, end):
+                print(f'{mechanic_id}: {first_name} {last_name}, {tickets} tickets, {revenue:.2f}')
+
+        elif choice == '22':
+            import search
+
+            search_text = input("Search for: ")
+            license_plate = input("License Plate (optional, narrows ticket results): ")
+            print("Customers:")
+            for customer_id, first_name, last_name, phone, email, score in search.search_customers(session, search_text):
+                print(f'{customer_id}: {first_name} {last_name}, {phone}, {email}')
+            print("Service Tickets:")
+            for ticket_id, ticket_date, vin, plate, service_description, score in search.search_tickets(session, search_text, license_plate or None):
+                print(f'{ticket_id}: {ticket_date:%Y-%m-%d} {plate} {service_description}')
+
+        elif choice == '23':
             break
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
@@ -0,0 +1,168 @@
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.selectable import SelectBase
+
+from practice1 import PRIMARY_ONLY_KEY
+
+# Read/write splitting: sessions from make_routing_sessionmaker() send plain SELECTs (the read_*,
+# list_*, get_* helpers, reporting and search queries) to read-only replicas, round-robin, and
+# everything else (flushes, INSERT/UPDATE/DELETE, DDL, SELECT ... FOR UPDATE) to the primary.
+#
+# A transaction keeps the replica it first read from, so its reads are consistent with each other;
+# the next transaction moves on to the next replica. Once a transaction has written, its remaining
+# reads go to the primary so they see its own changes, as does anything inside
+# practice1.use_primary() - the helpers that read rows before changing them use it already. With
+# read_your_writes=seconds a session also keeps reading from the primary for that long after
+# committing a write, while the replicas catch up.
+#
+# Replicas are health checked (SELECT 1) when first used and again every health_check_interval
+# seconds; failing ones are skipped until a later check passes. A check that has not answered
+# within health_check_timeout seconds counts as failed. Checks run outside the router's lock, and
+# while one is running other sessions go by the replica's last result (skipping it if it has none),
+# so a hanging replica only holds up the session that checks it. With no healthy replica reads fall
+# back to the primary.
+
+DEFAULT_HEALTH_CHECK_INTERVAL = 30  # seconds
+DEFAULT_HEALTH_CHECK_TIMEOUT = 2  # seconds
+
+
+def sqlite_replica_url(path):
+    return f'sqlite:///file:{path}?mode=ro&uri=true'
+
+
+class Replica:
+    def __init__(self, engine):
+        self.engine = engine
+        self.healthy = True
+        self.checked_at = None
+        self.checking = False
+
+
+class ReplicaRouter:
+    def __init__(self, primary, replicas=(), read_your_writes=None, health_check_interval=DEFAULT_HEALTH_CHECK_INTERVAL,
+                 health_check_timeout=DEFAULT_HEALTH_CHECK_TIMEOUT, clock=time.monotonic):
+        self.primary = primary
+        self.replicas = [Replica(engine) for engine in replicas]
+        self.read_your_writes = read_your_writes
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self.clock = clock
+        self._next = 0
+        self._lock = threading.Lock()
+        for replica in self.replicas:
+            event.listen(replica.engine, 'handle_error', self._handle_error)
+
+    # A dropped connection takes the replica out of rotation until its next health check
+    def _handle_error(self, exception_context):
+        if exception_context.is_disconnect:
+            self.mark_unhealthy(exception_context.engine)
+
+    def mark_unhealthy(self, engine):
+        for replica in self.replicas:
+            if replica.engine is engine:
+                replica.healthy = False
+                replica.checked_at = self.clock()
+
+    # The probe runs in its own thread so a replica that never answers (e.g. an unreachable host
+    # or a locked file) is given up on after health_check_timeout; the probe is left to finish
+    def check(self, replica):
+        answered = []
+
+        def probe():
+            try:
+                with replica.engine.connect() as conn:
+                    conn.exec_driver_sql('SELECT 1')
+                answered.append(True)
+            except DBAPIError:
+                pass
+
+        thread = threading.Thread(target=probe, daemon=True)
+        thread.start()
+        thread.join(self.health_check_timeout)
+        replica.healthy = bool(answered)
+        replica.checked_at = self.clock()
+        return replica.healthy
+
+    def _check_due(self, replica):
+        return replica.checked_at is None or self.clock() - replica.checked_at >= self.health_check_interval
+
+    # Next healthy replica engine in turn, None when there is none
+    def next_replica(self):
+        if not self.replicas:
+            return None
+        with self._lock:
+            start = self._next
+            self._next = (start + 1) % len(self.replicas)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            with self._lock:
+                # While another session checks it a replica keeps its last result
+                if replica.checking or not self._check_due(replica):
+                    if replica.healthy and replica.checked_at is not None:
+                        return replica.engine
+                    continue
+                replica.checking = True
+            try:
+                healthy = self.check(replica)
+            finally:
+                replica.checking = False
+            if healthy:
+                return replica.engine
+        return None
+
+    def status(self):
+        return [(replica.engine.url.render_as_string(hide_password=True), replica.healthy) for replica in self.replicas]
+
+
+class RoutingSession(Session):
+    def __init__(self, *args, router, **kwargs):
+        kwargs.setdefault('bind', router.primary)
+        super().__init__(*args, **kwargs)
+        self.router = router
+        self._replica = None  # replica this transaction reads from
+        self._wrote = False  # this transaction has sent a write to the primary
+        self._primary_until = None  # read-your-writes deadline on the router's clock
+
+    def _reads_from_primary(self):
+        if self._wrote or self.info.get(PRIMARY_ONLY_KEY):
+            return True
+        if self._primary_until is not None:
+            if self.router.clock() < self._primary_until:
+                return True
+            self._primary_until = None
+        return False
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return bind
+        if not self.in_transaction():
+            self._replica, self._wrote = None, False
+        if isinstance(clause, SelectBase) and getattr(clause, '_for_update_arg', None) is None and not self._flushing:
+            if self._reads_from_primary():
+                return self.router.primary
+            if self._replica is None:
+                self._replica = self.router.next_replica()
+            return self._replica or self.router.primary
+        if self._flushing or clause is not None:
+            self._wrote = True
+        return self.router.primary
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _after_commit(session):
+    if session._wrote and session.router.read_your_writes:
+        session._primary_until = session.router.clock() + session.router.read_your_writes
+    session._replica, session._wrote = None, False
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _after_rollback(session):
+    session._replica, session._wrote = None, False
+
+
+def make_routing_sessionmaker(router):
+    return sessionmaker(class_=RoutingSession, router=router, expire_on_commit=False)
@@ -0,0 +1,89 @@
+from sqlalchemy import func, select
+
+from practice1 import Customer, Mechanic, _as_datetime, _combined, _summary_sources
+
+# All reports aggregate in the database and return plain tuples. start/end select tickets with
+# start <= ticket_date < end and may be dates or datetimes; either can be left open.
+#
+# Tickets are read from the live table and the archive years the range overlaps (see archive.py),
+# so archiving does not change any report.
+
+
+def _date_range(column, start, end):
+    criteria = []
+    if start is not None:
+        criteria.append(column >= start)
+    if end is not None:
+        criteria.append(column < end)
+    return criteria
+
+
+# Tickets in the range from the live and archive tables, as one subquery
+def _tickets(session, start, end):
+    start, end = _as_datetime(start), _as_datetime(end)
+    tickets, _ = _summary_sources(session, start, end)
+    return _combined([
+        select(source.c.ticket_id, source.c.customer_id, source.c.ticket_date, source.c.cost).where(*_date_range(source.c.ticket_date, start, end))
+        for source in tickets
+    ])
+
+
+# Mechanic assignments of the tickets in the range, with the ticket's cost; an archive year keeps
+# the assignments next to its tickets
+def _assignments(session, start, end):
+    start, end = _as_datetime(start), _as_datetime(end)
+    tickets, assignments = _summary_sources(session, start, end)
+    return _combined([
+        select(assigned.c.mechanic_id, source.c.ticket_id, source.c.cost)
+        .join(assigned, assigned.c.service_ticket_id == source.c.ticket_id)
+        .where(*_date_range(source.c.ticket_date, start, end))
+        for source, assigned in zip(tickets, assignments)
+    ])
+
+
+def month_expression(dialect_name, column):
+    if dialect_name == 'sqlite':
+        return func.strftime('%Y-%m', column)
+    if dialect_name == 'postgresql':
+        return func.to_char(column, 'YYYY-MM')
+    return func.date_format(column, '%Y-%m')
+
+
+def _revenue(rows):
+    return func.coalesce(func.sum(rows.c.cost), 0)
+
+
+def revenue_by_month(session, start=None, end=None):
+    tickets = _tickets(session, start, end)
+    month = month_expression(session.get_bind().dialect.name, tickets.c.ticket_date).label('month')
+    statement = (
+        select(month, func.count(tickets.c.ticket_id), _revenue(tickets))
+        .group_by(month)
+        .order_by(month)
+    )
+    return [tuple(row) for row in session.execute(statement)]
+
+
+def revenue_by_customer(session, start=None, end=None, limit=None):
+    tickets = _tickets(session, start, end)
+    revenue = _revenue(tickets).label('revenue')
+    statement = (
+        select(Customer.customer_id, Customer.first_name, Customer.last_name, func.count(tickets.c.ticket_id), revenue)
+        .join(tickets, tickets.c.customer_id == Customer.customer_id)
+        .group_by(Customer.customer_id, Customer.first_name, Customer.last_name)
+        .order_by(revenue.desc(), Customer.customer_id)
+        .limit(limit)
+    )
+    return [tuple(row) for row in session.execute(statement)]
+
+
+# Mechanics without tickets in the range are included with zero counts
+def tickets_per_mechanic(session, start=None, end=None):
+    assignments = _assignments(session, start, end)
+    statement = (
+        select(Mechanic.mechanic_id, Mechanic.first_name, Mechanic.last_name, func.count(assignments.c.ticket_id), _revenue(assignments))
+        .outerjoin(assignments, assignments.c.mechanic_id == Mechanic.mechanic_id)
+        .group_by(Mechanic.mechanic_id, Mechanic.first_name, Mechanic.last_name)
+        .order_by(Mechanic.mechanic_id)
+    )
+    return [tuple(row) for row in session.execute(statement)]
@@ -0,0 +1,182 @@
+import datetime
+import heapq
+from collections import Counter
+from decimal import Decimal
+
+from sqlalchemy import exists, insert, select
+
+from practice1 import Mechanic, ServiceMechanic, ServiceTicket, _add_mechanic_ticket_counts, _commit, _on_primary
+
+# Assigns mechanics by workload without aggregate queries per ticket. The schema has no ticket
+# status or labour hours, so a mechanic's workload is taken to be the tickets assigned to them
+# that are dated within the last `window` ("open" tickets) and the hours those represent,
+# estimated from the ticket cost at ESTIMATED_HOURLY_RATE.
+#
+# WorkloadIndex is built with one query and then kept up to date in memory. Mechanics sit in a
+# min-heap keyed by (open tickets, hours, mechanic_id); changed entries are pushed again and the
+# superseded ones skipped when they surface (lazy invalidation), so each decision is O(log n).
+# Once superseded entries outnumber the mechanics (more than twice plus HEAP_COMPACTION_SLACK
+# entries in all), the heap is rebuilt from the current loads, so a long-lived index stays small.
+# Tickets leaving the window are expired from a second heap ordered by expiry time.
+#
+# The index only sees what goes through it. Mechanics hired or removed and assignments made, moved
+# or deleted elsewhere (create_service_mechanic(), open_ticket(), delete_service_mechanic(), ...)
+# are not picked up: report them with add_mechanic(), remove_mechanic() and record(), or call
+# refresh(session) to re-read everything, e.g. before each scheduling run of a long-lived index.
+
+DEFAULT_WINDOW = datetime.timedelta(days=7)
+ESTIMATED_HOURLY_RATE = Decimal('100')
+HEAP_COMPACTION_SLACK = 64
+
+
+class WorkloadIndex:
+    def __init__(self, mechanic_ids=(), window=DEFAULT_WINDOW, hourly_rate=ESTIMATED_HOURLY_RATE, clock=datetime.datetime.utcnow):
+        self.window = window
+        self.hourly_rate = Decimal(hourly_rate)
+        self.clock = clock
+        self._load = {}  # mechanic_id -> [open tickets, hours]
+        # Versions keep growing across removals, so entries left from before a mechanic was removed
+        # never become current again if they are added back
+        self._versions = {}  # mechanic_id -> version of its current heap entry
+        self._generations = {}  # mechanic_id -> times removed, expiries from earlier ones are ignored
+        self._heap = []  # (open tickets, hours, mechanic_id, version)
+        self._expiries = []  # (expires_at, mechanic_id, hours, generation)
+        self._now = None
+        for mechanic_id in mechanic_ids:
+            self.add_mechanic(mechanic_id)
+
+    @classmethod
+    def build(cls, session, now=None, **kwargs):
+        index = cls(**kwargs)
+        index.refresh(session, now)
+        return index
+
+    # Starts over from the database: one query for the mechanics and one for the assignments
+    # inside the window
+    def refresh(self, session, now=None):
+        now = now or self.clock()
+        self._load, self._heap, self._expiries, self._now = {}, [], [], None
+        for mechanic_id in session.scalars(select(Mechanic.mechanic_id)).all():
+            self.add_mechanic(mechanic_id)
+        rows = session.execute(
+            select(ServiceMechanic.mechanic_id, ServiceTicket.ticket_date, ServiceTicket.cost)
+            .join(ServiceTicket, ServiceTicket.ticket_id == ServiceMechanic.service_ticket_id)
+            .where(ServiceTicket.ticket_date >= now - self.window, ServiceTicket.ticket_date <= now)
+        )
+        for mechanic_id, ticket_date, cost in rows:
+            self.record(mechanic_id, ticket_date, cost, now=now)
+
+    def __len__(self):
+        return len(self._load)
+
+    def __contains__(self, mechanic_id):
+        return mechanic_id in self._load
+
+    def estimate_hours(self, cost):
+        return float(Decimal(str(cost or 0)) / self.hourly_rate)
+
+    def _push(self, mechanic_id):
+        version = self._versions.get(mechanic_id, 0) + 1
+        self._versions[mechanic_id] = version
+        open_tickets, hours = self._load[mechanic_id]
+        heapq.heappush(self._heap, (open_tickets, round(hours, 6), mechanic_id, version))
+        if len(self._heap) > 2 * len(self._load) + HEAP_COMPACTION_SLACK:
+            self._compact()
+
+    # Drops every superseded entry, keeping the current versions
+    def _compact(self):
+        self._heap = [
+            (open_tickets, round(hours, 6), mechanic_id, self._versions[mechanic_id])
+            for mechanic_id, (open_tickets, hours) in self._load.items()
+        ]
+        heapq.heapify(self._heap)
+
+    def add_mechanic(self, mechanic_id):
+        if mechanic_id not in self._load:
+            self._load[mechanic_id] = [0, 0.0]
+            self._push(mechanic_id)
+
+    # The heap entry is left behind and skipped once it reaches the top
+    def remove_mechanic(self, mechanic_id):
+        if self._load.pop(mechanic_id, None) is not None:
+            self._versions[mechanic_id] += 1
+            self._generations[mechanic_id] = self._generations.get(mechanic_id, 0) + 1
+
+    def _adjust(self, mechanic_id, tickets, hours):
+        load = self._load[mechanic_id]
+        load[0] += tickets
+        load[1] = max(0.0, load[1] + hours)
+        self._push(mechanic_id)
+
+    def advance(self, now=None):
+        now = now or self.clock()
+        self._now = now
+        while self._expiries and self._expiries[0][0] <= now:
+            _, mechanic_id, hours, generation = heapq.heappop(self._expiries)
+            if mechanic_id in self._load and generation == self._generations.get(mechanic_id, 0):
+                self._adjust(mechanic_id, -1, -hours)
+
+    # Counts a ticket towards the mechanic's workload until it leaves the window. Tickets dated
+    # before `now` (e.g. a backlog being assigned late) count from `now`.
+    def record(self, mechanic_id, ticket_date, cost, now=None):
+        now = now or self._now or self.clock()
+        if ticket_date is None or ticket_date < now - self.window:
+            ticket_date = now
+        self.add_mechanic(mechanic_id)
+        hours = self.estimate_hours(cost)
+        self._adjust(mechanic_id, 1, hours)
+        heapq.heappush(self._expiries, (ticket_date + self.window, mechanic_id, hours, self._generations.get(mechanic_id, 0)))
+
+    def workload(self, mechanic_id):
+        open_tickets, hours = self._load[mechanic_id]
+        return open_tickets, hours
+
+    def least_loaded(self, now=None):
+        self.advance(now)
+        while self._heap:
+            open_tickets, hours, mechanic_id, version = self._heap[0]
+            if self._versions.get(mechanic_id) == version:
+                return mechanic_id
+            heapq.heappop(self._heap)
+        return None
+
+    # Picks the least loaded mechanic for a ticket and counts the ticket against them
+    def assign(self, ticket_date, cost, now=None):
+        mechanic_id = self.least_loaded(now)
+        if mechanic_id is None:
+            raise LookupError('No mechanics to assign tickets to')
+        self.record(mechanic_id, ticket_date, cost, now=self._now)
+        return mechanic_id
+
+    def snapshot(self):
+        return {mechanic_id: {'open_tickets': load[0], 'hours': load[1]} for mechanic_id, load in sorted(self._load.items())}
+
+
+def pending_tickets(session, limit=None):
+    assigned = exists().where(ServiceMechanic.service_ticket_id == ServiceTicket.ticket_id)
+    statement = (
+        select(ServiceTicket.ticket_id, ServiceTicket.ticket_date, ServiceTicket.cost)
+        .where(~assigned)
+        .order_by(ServiceTicket.ticket_date, ServiceTicket.ticket_id)
+        .limit(limit)
+    )
+    return session.execute(statement).all()
+
+
+# Assigns every ticket without a mechanic (oldest first) to the least loaded mechanic, inserting
+# the assignments with one executemany and updating the ticket counts. Returns the
+# (ticket_id, mechanic_id) pairs. Pass a long-lived index to avoid rebuilding it on every call,
+# refreshing it when assignments were changed elsewhere; if this raises, the index has already
+# counted the failed assignments and should be refreshed.
+@_on_primary
+def assign_pending(session, index=None, now=None, limit=None):
+    index = index or WorkloadIndex.build(session, now=now)
+    now = now or index.clock()
+    assignments = []
+    for ticket_id, ticket_date, cost in pending_tickets(session, limit):
+        assignments.append((ticket_id, index.assign(ticket_date, cost, now=now)))
+    if assignments:
+        session.execute(insert(ServiceMechanic), [{'service_ticket_id': ticket_id, 'mechanic_id': mechanic_id} for ticket_id, mechanic_id in assignments])
+        _add_mechanic_ticket_counts(session, Counter(mechanic_id for _, mechanic_id in assignments))
+        _commit(session)
+    return assignments
@@ -0,0 +1,133 @@
+import re
+
+from sqlalchemy import column, text, DateTime, Float, Integer, String
+
+from practice1 import _begin
+
+# Full-text search over service descriptions and customer contact data, backed by SQLite FTS5.
+# Triggers keep the indexes in step with every write, including set-based and bulk ones.
+
+# Ticket descriptions are indexed straight from service_tickets (external content table)
+TICKET_SEARCH_DDL = [
+    """CREATE VIRTUAL TABLE service_tickets_fts USING fts5(
+        service_description, content='service_tickets', content_rowid='ticket_id', prefix='2 3'
+    )""",
+    """CREATE TRIGGER service_tickets_fts_insert AFTER INSERT ON service_tickets BEGIN
+        INSERT INTO service_tickets_fts(rowid, service_description) VALUES (new.ticket_id, new.service_description);
+    END""",
+    """CREATE TRIGGER service_tickets_fts_delete AFTER DELETE ON service_tickets BEGIN
+        INSERT INTO service_tickets_fts(service_tickets_fts, rowid, service_description) VALUES ('delete', old.ticket_id, old.service_description);
+    END""",
+    """CREATE TRIGGER service_tickets_fts_update AFTER UPDATE OF ticket_id, service_description ON service_tickets BEGIN
+        INSERT INTO service_tickets_fts(service_tickets_fts, rowid, service_description) VALUES ('delete', old.ticket_id, old.service_description);
+        INSERT INTO service_tickets_fts(rowid, service_description) VALUES (new.ticket_id, new.service_description);
+    END""",
+]
+
+# Phone numbers are indexed as bare digits so "555 0100" finds "(555) 010-0100"
+_PHONE_DIGITS = "replace(replace(replace(replace(replace(replace({0}.phone, '-', ''), ' ', ''), '(', ''), ')', ''), '.', ''), '+', '')"
+_CUSTOMER_VALUES = "{0}.customer_id, {0}.first_name || ' ' || {0}.last_name, " + _PHONE_DIGITS + ", {0}.email"
+
+# Customers use a contentless index because the indexed phone differs from the stored one
+CUSTOMER_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE customers_fts USING fts5(name, phone, email, content='', prefix='2 3')",
+    """CREATE TRIGGER customers_fts_insert AFTER INSERT ON customers BEGIN
+        INSERT INTO customers_fts(rowid, name, phone, email) VALUES ({new});
+    END""".format(new=_CUSTOMER_VALUES.format('new')),
+    """CREATE TRIGGER customers_fts_delete AFTER DELETE ON customers BEGIN
+        INSERT INTO customers_fts(customers_fts, rowid, name, phone, email) VALUES ('delete', {old});
+    END""".format(old=_CUSTOMER_VALUES.format('old')),
+    """CREATE TRIGGER customers_fts_update AFTER UPDATE ON customers BEGIN
+        INSERT INTO customers_fts(customers_fts, rowid, name, phone, email) VALUES ('delete', {old});
+        INSERT INTO customers_fts(rowid, name, phone, email) VALUES ({new});
+    END""".format(old=_CUSTOMER_VALUES.format('old'), new=_CUSTOMER_VALUES.format('new')),
+]
+
+REBUILD_TICKET_SEARCH = "INSERT INTO service_tickets_fts(service_tickets_fts) VALUES ('rebuild')"
+REBUILD_CUSTOMER_SEARCH = [
+    "INSERT INTO customers_fts(customers_fts) VALUES ('delete-all')",
+    "INSERT INTO customers_fts(rowid, name, phone, email) SELECT {0} FROM customers".format(_CUSTOMER_VALUES.format('customers')),
+]
+
+TICKET_SEARCH_SQL = """
+    SELECT t.ticket_id, t.ticket_date, t.vin, v.license_plate, t.service_description, bm25(service_tickets_fts) AS score
+    FROM service_tickets_fts
+    JOIN service_tickets AS t ON t.ticket_id = service_tickets_fts.rowid
+    JOIN vehicles AS v ON v.vin = t.vin
+    WHERE service_tickets_fts MATCH :query {plate_filter}
+    ORDER BY score
+    LIMIT :limit
+"""
+
+CUSTOMER_SEARCH_SQL = """
+    SELECT c.customer_id, c.first_name, c.last_name, c.phone, c.email, bm25(customers_fts) AS score
+    FROM customers_fts
+    JOIN customers AS c ON c.customer_id = customers_fts.rowid
+    WHERE customers_fts MATCH :query
+    ORDER BY score
+    LIMIT :limit
+"""
+
+
+def _table_exists(conn, name):
+    return conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = :name"), {'name': name}).first() is not None
+
+
+# Creates the search indexes and triggers if they are missing and fills them from the existing rows
+def install_search(engine):
+    if engine.dialect.name != 'sqlite':
+        raise ValueError('Full-text search requires SQLite with FTS5')
+    created = []
+    with _begin(engine) as conn:
+        if not _table_exists(conn, 'service_tickets_fts'):
+            for statement in TICKET_SEARCH_DDL:
+                conn.exec_driver_sql(statement)
+            conn.exec_driver_sql(REBUILD_TICKET_SEARCH)
+            created.append('service_tickets_fts')
+        if not _table_exists(conn, 'customers_fts'):
+            for statement in CUSTOMER_SEARCH_DDL:
+                conn.exec_driver_sql(statement)
+            for statement in REBUILD_CUSTOMER_SEARCH:
+                conn.exec_driver_sql(statement)
+            created.append('customers_fts')
+    return created
+
+
+def rebuild_search(engine):
+    with engine.begin() as conn:
+        conn.exec_driver_sql(REBUILD_TICKET_SEARCH)
+        for statement in REBUILD_CUSTOMER_SEARCH:
+            conn.exec_driver_sql(statement)
+
+
+# Turns free text into an FTS5 query that requires every word, each matched as a prefix
+def match_query(search_text):
+    search_text = re.sub(r'(?<=\d)[\s\-().]+(?=\d)', '', search_text)
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', search_text))
+
+
+def search_tickets(session, search_text, license_plate=None, limit=20):
+    query = match_query(search_text)
+    if not query:
+        return []
+    params = {'query': query, 'limit': limit}
+    plate_filter = ''
+    if license_plate:
+        plate_filter = 'AND v.license_plate = :license_plate'
+        params['license_plate'] = license_plate
+    statement = text(TICKET_SEARCH_SQL.format(plate_filter=plate_filter)).columns(
+        column('ticket_id', Integer), column('ticket_date', DateTime), column('vin', String),
+        column('license_plate', String), column('service_description', String), column('score', Float),
+    )
+    return [tuple(row) for row in session.execute(statement, params)]
+
+
+def search_customers(session, search_text, limit=20):
+    query = match_query(search_text)
+    if not query:
+        return []
+    statement = text(CUSTOMER_SEARCH_SQL).columns(
+        column('customer_id', Integer), column('first_name', String), column('last_name', String),
+        column('phone', String), column('email', String), column('score', Float),
+    )
+    return [tuple(row) for row in session.execute(statement, {'query': query, 'limit': limit})]
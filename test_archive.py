@@ -0,0 +1,137 @@
+import datetime
+import os
+import tempfile
+import unittest
+from unittest import mock
+from sqlalchemy import create_engine, event, inspect
+import practice1
+from practice1 import ServiceMechanic, ServiceTicket
+import archive
+import reporting
+
+
+class TestArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.engine = create_engine('sqlite:///' + os.path.join(self.tmpdir.name, 'shop.db'))
+        practice1.init_schema(self.engine)
+        archive.install_archive(self.engine)
+        self.session = practice1.make_sessionmaker(self.engine)()
+        practice1.create_customer(self.session, 'John', 'Doe', '1234567890', 'john@example.com')
+        practice1.create_vehicle(self.session, '1HGBH41JXMN109186', 1, 'Honda', 'Civic', 2020, 'ABC123')
+        practice1.create_mechanic(self.session, 'Alice', 'Smith', 'alice@example.com', salary=50000)
+        # Two tickets a year from 2019 to 2024, each assigned to Alice
+        for year in range(2019, 2025):
+            for month in (3, 9):
+                practice1.open_ticket(self.session, '1HGBH41JXMN109186', 1, f'Service {year}-{month}', 100, [1], ticket_date=datetime.datetime(year, month, 1))
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def all_ticket_dates(self):
+        return [row.ticket_date for row in archive.read_tickets_between(self.session)]
+
+    def test_moves_old_tickets_in_batches(self):
+        before = self.all_ticket_dates()
+        batches = []
+        moved = archive.archive_tickets(self.session, datetime.date(2022, 1, 1), batch_size=4, on_batch=batches.append)
+        self.assertEqual((moved, batches), (6, [4, 2]))
+        self.assertEqual(self.session.query(ServiceTicket).count(), 6)
+        self.assertEqual(self.session.query(ServiceMechanic).count(), 6)
+        self.assertEqual(archive.count_archived_tickets(self.session), 6)
+        self.assertTrue(inspect(self.engine).has_table('service_tickets_2019'))
+        # Nothing is lost and nothing is duplicated
+        self.assertEqual(self.all_ticket_dates(), before)
+        archived = archive.read_tickets_between(self.session, end=datetime.date(2020, 1, 1))
+        self.assertEqual([(row.ticket_date.month, row.archived) for row in archived], [(3, True), (9, True)])
+        self.assertEqual(archive.archived_ticket_mechanics(self.session, archived[0].ticket_id, archived[0].ticket_date), [1])
+        # Summaries keep counting archived work
+        self.assertEqual(practice1.get_mechanic_ticket_count(self.session, 1), 12)
+
+    def test_rebuilding_summaries_keeps_archived_totals(self):
+        def totals():
+            revenue = [practice1.get_daily_revenue(self.session, datetime.date(year, month, 1)) for year in range(2019, 2025) for month in (3, 9)]
+            return revenue, practice1.get_mechanic_ticket_count(self.session, 1)
+
+        before = totals()
+        archive.archive_tickets(self.session, datetime.date(2022, 1, 1))
+        practice1.rebuild_summaries(self.session)
+        self.assertEqual(totals(), before)
+        # Refreshing a day also counts what was archived on it
+        old = practice1.create_service_ticket(self.session, '1HGBH41JXMN109186', 1, datetime.datetime(2025, 1, 1), 'Moved back', 50)
+        practice1.update_service_ticket(self.session, old.ticket_id, ticket_date=datetime.datetime(2020, 3, 1, 12))
+        self.assertEqual(practice1.get_daily_revenue(self.session, datetime.date(2020, 3, 1)), (2, 150))
+
+    def test_reports_keep_archived_totals(self):
+        def reports():
+            return [
+                reporting.revenue_by_month(self.session),
+                reporting.revenue_by_month(self.session, datetime.date(2021, 6, 1), datetime.date(2022, 6, 1)),
+                reporting.revenue_by_customer(self.session),
+                reporting.tickets_per_mechanic(self.session),
+                reporting.tickets_per_mechanic(self.session, end=datetime.date(2020, 1, 1)),
+            ]
+
+        before = reports()
+        archive.archive_tickets(self.session, datetime.date(2022, 1, 1))
+        self.assertEqual(reports(), before)
+        self.assertEqual(before[3], [(1, 'Alice', 'Smith', 12, 1200)])
+
+    def test_recent_ranges_skip_the_archive(self):
+        archive.archive_tickets(self.session, datetime.date(2022, 1, 1))
+        statements = []
+        event.listen(self.engine, 'before_cursor_execute', lambda conn, cursor, statement, *args: statements.append(statement))
+        recent = archive.read_tickets_between(self.session, datetime.date(2023, 1, 1), datetime.date(2024, 1, 1))
+        self.assertEqual([row.ticket_date.month for row in recent], [3, 9])
+        self.assertFalse(any('service_tickets_20' in statement for statement in statements))
+
+        statements.clear()
+        spanning = archive.read_tickets_between(self.session, datetime.date(2021, 6, 1), datetime.date(2022, 6, 1))
+        self.assertEqual([row.ticket_date for row in spanning], [datetime.datetime(2021, 9, 1), datetime.datetime(2022, 3, 1)])
+        self.assertTrue(any('service_tickets_2021' in statement for statement in statements))
+        self.assertFalse(any('service_tickets_2019' in statement for statement in statements))
+
+    def test_interrupted_run_resumes(self):
+        original = archive._move_batch
+        calls = []
+
+        def fail_second_batch(*args):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError('disk full')
+            original(*args)
+
+        with mock.patch.object(archive, '_move_batch', side_effect=fail_second_batch):
+            with self.assertRaises(RuntimeError):
+                archive.archive_tickets(self.session, datetime.date(2022, 1, 1), batch_size=2)
+        # The first batch is committed, the failed one left no trace
+        self.assertEqual(archive.count_archived_tickets(self.session), 2)
+        self.assertEqual(self.session.query(ServiceTicket).count(), 10)
+        self.assertEqual(len(self.all_ticket_dates()), 12)
+
+        self.assertEqual(archive.archive_tickets(self.session, batch_size=2), 4)
+        self.assertEqual(archive.archive_boundary(self.session), datetime.datetime(2022, 1, 1))
+        self.assertEqual(len(self.all_ticket_dates()), 12)
+        with self.assertRaises(ValueError):
+            archive.archive_tickets(self.session)
+
+    def test_attached_archive_database(self):
+        path = os.path.join(self.tmpdir.name, 'archive.db')
+        self.session.close()
+        archive.attach_archive_database(self.engine, path)
+        self.session = practice1.make_sessionmaker(self.engine)()
+        archive.archive_tickets(self.session, datetime.date(2021, 1, 1), schema=archive.ARCHIVE_SCHEMA)
+        self.assertFalse(inspect(self.engine).has_table('service_tickets_2019'))
+        archive_engine = create_engine('sqlite:///' + path)
+        with archive_engine.connect() as conn:
+            self.assertEqual(conn.exec_driver_sql('SELECT count(*) FROM service_tickets_2019').scalar(), 2)
+        archive_engine.dispose()
+        self.assertEqual(len(archive.read_tickets_between(self.session, end=datetime.date(2021, 1, 1), customer_id=1)), 4)
+        practice1.rebuild_summaries(self.session)
+        self.assertEqual(practice1.get_mechanic_ticket_count(self.session, 1), 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+try:
+    import aiosqlite
+    import greenlet
+except ImportError:
+    aiosqlite = None
+
+if aiosqlite is not None:
+    from sqlalchemy import inspect
+    import async_crud
+    import practice1
+    from practice1 import ServiceTicket
+
+
+@unittest.skipIf(aiosqlite is None, 'aiosqlite and greenlet are required for the async layer')
+class TestAsyncCRUD(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        url = 'sqlite:///' + os.path.join(self.tmpdir.name, 'async.db')
+        self.engine = async_crud.make_async_engine({'database_url': url, 'pool_size': '10', 'max_overflow': '20'})
+        await async_crud.init_schema(self.engine)
+        self.Session = async_crud.make_async_sessionmaker(self.engine)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+        self.tmpdir.cleanup()
+
+    async def test_crud_round_trip(self):
+        async with self.Session() as session:
+            customer = await async_crud.create_customer(session, 'John', 'Doe', '1234567890', 'john@example.com')
+            self.assertEqual(customer.customer_id, 1)
+            await async_crud.create_vehicle(session, '1HGBH41JXMN109186', customer.customer_id, 'Honda', 'Civic', 2020, 'ABC123')
+            await async_crud.create_mechanic(session, 'Alice', 'Smith', 'alice@example.com', salary=50000)
+            ticket = await async_crud.create_service_ticket(session, '1HGBH41JXMN109186', 1, None, 'Oil Change', 50.0)
+            await async_crud.create_service_mechanic(session, ticket.ticket_id, 1)
+
+            self.assertEqual(await async_crud.update_customer(session, 1, first_name='Jane'), 1)
+            self.assertEqual([c.first_name for c in await async_crud.read_customers(session, limit=10)], ['Jane'])
+            self.assertEqual(await async_crud.update_service_tickets(session, where=ServiceTicket.cost > 10, cost=40), 1)
+
+            history = await async_crud.get_customer_history(session, 1)
+            self.assertEqual(history.vehicles[0].service_tickets[0].mechanics[0].mechanic.first_name, 'Alice')
+
+            self.assertEqual(await async_crud.delete_service_mechanic(session, ticket.ticket_id, 1), 1)
+            self.assertEqual(await async_crud.delete_service_tickets(session, ticket_ids=[ticket.ticket_id]), 1)
+            self.assertEqual(await async_crud.read_service_tickets(session), [])
+
+    async def test_unit_of_work_and_open_ticket(self):
+        async with self.Session() as session:
+            async with async_crud.unit_of_work(session):
+                await async_crud.create_customer(session, 'John', 'Doe', '1234567890', 'john@example.com')
+                await async_crud.create_vehicle(session, '1HGBH41JXMN109186', 1, 'Honda', 'Civic', 2020, 'ABC123')
+                await async_crud.create_mechanic(session, 'Alice', 'Smith', 'alice@example.com', salary=50000)
+                self.assertTrue(session.in_transaction())
+            ticket = await async_crud.open_ticket(session, '1HGBH41JXMN109186', 1, 'Oil Change', 50, [1])
+        async with self.Session() as session:
+            self.assertEqual(await async_crud.get_mechanic_ticket_count(session, 1), 1)
+            self.assertEqual([t.ticket_id for t in await async_crud.read_service_tickets(session)], [ticket.ticket_id])
+
+    async def test_init_schema_matches_ensure_schema(self):
+        async with self.engine.connect() as conn:
+            tables = set(await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names()))
+            self.assertEqual(await conn.run_sync(practice1.stored_schema_version), practice1.SCHEMA_VERSION)
+        self.assertLessEqual({'change_log', 'archive_state', 'service_tickets_fts', 'schema_version'}, tables)
+        # Current databases are left alone
+        self.assertIsNone(await async_crud.init_schema(self.engine))
+
+    async def test_iter_streams_in_key_order(self):
+        async with self.Session() as session:
+            for i in range(12):
+                await async_crud.create_mechanic(session, 'Alice', f'Smith{i}', f'alice{i}@example.com', salary=50000)
+            names = [mechanic.last_name async for mechanic in async_crud.iter_mechanics(session, batch_size=5)]
+        self.assertEqual(names, [f'Smith{i}' for i in range(12)])
+
+    async def test_concurrent_clients(self):
+        clients, tickets_per_client = 25, 4
+
+        async def client(number):
+            async with self.Session() as session:
+                customer = await async_crud.create_customer(session, 'Client', str(number), f'555-{number:04d}', f'client{number}@example.com')
+                vin = f'1HGBH41JXMN{number:06d}'
+                await async_crud.create_vehicle(session, vin, customer.customer_id, 'Honda', 'Civic', 2020, f'PLATE{number}')
+                for _ in range(tickets_per_client):
+                    await async_crud.create_service_ticket(session, vin, customer.customer_id, None, 'Oil Change', 50.0)
+                history = await async_crud.get_vehicle_history(session, vin)
+                return len(history.service_tickets)
+
+        counts = await asyncio.gather(*(client(number) for number in range(clients)))
+
+        self.assertEqual(counts, [tickets_per_client] * clients)
+        async with self.Session() as session:
+            self.assertEqual(len(await async_crud.read_service_tickets(session)), clients * tickets_per_client)
+
+
+if __name__ == '__main__':
+    unittest.main()
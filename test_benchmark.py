@@ -0,0 +1,107 @@
+import os
+import tempfile
+import unittest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+import practice1
+from practice1 import Base, Customer, Vehicle, Mechanic, ServiceTicket, ServiceMechanic
+from bulk_import import is_valid_vin
+import benchmark
+
+
+class TestDataGenerator(unittest.TestCase):
+    def make_session(self):
+        engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(engine)
+        self.addCleanup(engine.dispose)
+        session = sessionmaker(bind=engine)()
+        self.addCleanup(session.close)
+        return session
+
+    def test_parse_scale(self):
+        self.assertEqual([benchmark.parse_scale(value) for value in ('10k', '100K', '1M', '2500')], [10_000, 100_000, 1_000_000, 2500])
+
+    def test_generated_rows(self):
+        session = self.make_session()
+        sizes = benchmark.generate_dataset(session, 2000, seed=1)
+        self.assertEqual(sizes, {'customers': 200, 'vehicles': 250, 'mechanics': 5, 'service_tickets': 2000})
+        for model, count in ((Customer, 200), (Vehicle, 250), (Mechanic, 5), (ServiceTicket, 2000)):
+            self.assertEqual(session.scalar(select(func.count()).select_from(model)), count)
+        assignments = session.scalar(select(func.count()).select_from(ServiceMechanic))
+        self.assertTrue(2000 <= assignments <= 6000)
+        vins = session.scalars(select(Vehicle.vin)).all()
+        self.assertTrue(all(is_valid_vin(vin) for vin in vins))
+        # Summaries are built from the generated tickets
+        self.assertEqual(sum(practice1.get_mechanic_ticket_count(session, mechanic_id) for mechanic_id in range(1, 6)), assignments)
+
+    def test_same_seed_same_data(self):
+        def snapshot(seed):
+            session = self.make_session()
+            benchmark.generate_dataset(session, 500, seed=seed)
+            return session.execute(select(ServiceTicket.vin, ServiceTicket.ticket_date, ServiceTicket.cost).order_by(ServiceTicket.ticket_id)).all()
+
+        self.assertEqual(snapshot(3), snapshot(3))
+        self.assertNotEqual(snapshot(3), snapshot(4))
+
+
+class TestBenchmarkRun(unittest.TestCase):
+    def test_results_round_trip_and_compare(self):
+        engine = create_engine('sqlite:///:memory:')
+        practice1.init_schema(engine)
+        results = benchmark.run_benchmarks(engine, 500, operations=5)
+        engine.dispose()
+        self.assertIn('create_customer', results['results'])
+        for result in results['results'].values():
+            self.assertEqual(result['ops'], 5)
+            self.assertGreater(result['ops_per_sec'], 0)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'results.json')
+            benchmark.save_results(results, path)
+            baseline = benchmark.load_results(path)
+        baseline['results']['get_customer']['ops_per_sec'] /= 2
+        ratios = benchmark.compare_results(results, baseline)
+        self.assertAlmostEqual(ratios['get_customer'], 2.0)
+        self.assertAlmostEqual(ratios['create_customer'], 1.0)
+        self.assertIn('get_customer', benchmark.format_results(results, ratios))
+
+    def test_benchmarks_run_on_their_own(self):
+        engine = create_engine('sqlite:///:memory:')
+        practice1.init_schema(engine)
+        only = ['create_service_ticket', 'create_service_mechanic', 'delete_customer', 'delete_service_mechanic']
+        results = benchmark.run_benchmarks(engine, 500, operations=5, only=only)
+        self.assertEqual(sorted(results['results']), sorted(only))
+        session = practice1.make_sessionmaker(engine)()
+        # The customers delete_customer added beforehand are gone again; the tickets the two
+        # service_mechanic setups added stay, next to the 5 create_service_ticket made
+        self.assertEqual(session.scalar(select(func.count()).select_from(Customer)), 50)
+        self.assertEqual(session.scalar(select(func.count()).select_from(ServiceTicket)), 515)
+        session.close()
+        engine.dispose()
+
+    def test_projection_listings_use_less_memory(self):
+        engine = create_engine('sqlite:///:memory:')
+        practice1.init_schema(engine)
+        session = practice1.make_sessionmaker(engine)()
+        benchmark.generate_dataset(session, 2000)
+        session.close()
+        listings = benchmark.benchmark_listings(engine, ['customers', 'service_tickets'])
+        engine.dispose()
+        for result in listings.values():
+            self.assertEqual(result['orm']['rows'], result['projection']['rows'])
+            self.assertLess(result['projection']['peak_bytes'], result['orm']['peak_bytes'])
+        self.assertIn('service_tickets', benchmark.format_listings(listings))
+
+    def test_pragma_profiles(self):
+        with tempfile.TemporaryDirectory() as directory:
+            profiles = benchmark.benchmark_pragma_profiles(directory, rows=200, commit_every=20, reads=2)
+        self.assertEqual(list(profiles), list(practice1.SQLITE_PRAGMA_PROFILES))
+        for result in profiles.values():
+            self.assertEqual(result['rows'], 200)
+            self.assertGreater(result['inserts_per_sec'], 0)
+        self.assertIn('tuned', benchmark.format_pragma_profiles(profiles))
+
+
+if __name__ == '__main__':
+    unittest.main()
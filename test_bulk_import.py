@@ -0,0 +1,107 @@
+import datetime
+import json
+import os
+import tempfile
+import unittest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import practice1
+from practice1 import Base, Customer, Vehicle, ServiceTicket
+from bulk_import import bulk_import, coerce_row, get_table, import_file
+import loader
+
+
+class TestBulkImport(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def customer_rows(self, count):
+        return [{'first_name': f'First{i}', 'last_name': f'Last{i}', 'phone': f'555-{i:04d}', 'email': f'c{i}@example.com'} for i in range(count)]
+
+    def test_batches_and_commits(self):
+        batches = []
+        report = bulk_import(self.session, 'customers', self.customer_rows(25), batch_size=10, on_batch=batches.append)
+        self.assertEqual([batch.rows for batch in batches], [10, 10, 5])
+        self.assertEqual(report.inserted, 25)
+        self.assertEqual(report.rejected, 0)
+        self.assertEqual(self.session.query(Customer).count(), 25)
+        self.assertTrue(all(batch.rows_per_second > 0 for batch in batches))
+
+    def test_bad_rows_are_rejected_without_aborting(self):
+        rows = self.customer_rows(5)
+        rows[1]['email'] = ''  # missing required column
+        rows[3]['phone'] = rows[0]['phone']  # unique violation, only caught by the database
+        report = bulk_import(self.session, 'customers', rows, batch_size=10)
+        self.assertEqual(report.inserted, 3)
+        self.assertEqual(sorted(reject.row_number for reject in report.rejects), [2, 4])
+        self.assertEqual(self.session.query(Customer).count(), 3)
+
+    def test_import_csv_and_jsonl_files(self):
+        customers_path = os.path.join(self.tmpdir.name, 'customers.csv')
+        with open(customers_path, 'w') as handle:
+            handle.write('customer_id,first_name,last_name,phone,email,address\n')
+            handle.write('7,John,Doe,1234567890,john@example.com,\n')
+        vehicles_path = os.path.join(self.tmpdir.name, 'vehicles.jsonl')
+        with open(vehicles_path, 'w') as handle:
+            handle.write(json.dumps({'vin': '1HGBH41JXMN109186', 'customer_id': 7, 'make': 'Honda', 'model': 'Civic', 'year': '2020', 'license_plate': 'ABC123'}) + '\n')
+            handle.write('{not json\n')
+        tickets_path = os.path.join(self.tmpdir.name, 'tickets.jsonl')
+        with open(tickets_path, 'w') as handle:
+            handle.write(json.dumps({'vin': '1HGBH41JXMN109186', 'customer_id': 7, 'ticket_date': '2024-03-01T09:30:00', 'service_description': 'Oil Change', 'cost': '49.99'}) + '\n')
+            handle.write(json.dumps({'vin': '1HGBH41JXMN109186', 'customer_id': 7, 'service_description': 'Tire Rotation', 'cost': 'free'}) + '\n')
+
+        self.assertEqual(import_file(self.session, customers_path).inserted, 1)
+        vehicles = import_file(self.session, vehicles_path)
+        self.assertEqual((vehicles.inserted, vehicles.rejected), (1, 1))
+        tickets = import_file(self.session, tickets_path, table_name='service_tickets')
+        self.assertEqual((tickets.inserted, tickets.rejected), (1, 1))
+        self.assertIn('cost', tickets.rejects[0].error)
+
+        self.assertEqual(self.session.query(Vehicle).one().year, 2020)
+        ticket = self.session.query(ServiceTicket).one()
+        self.assertEqual(ticket.customer_id, 7)
+        self.assertEqual(ticket.ticket_date.day, 1)
+
+    def test_ticket_imports_maintain_summaries(self):
+        bulk_import(self.session, 'customers', self.customer_rows(1))
+        bulk_import(self.session, 'vehicles', [{'vin': '1HGBH41JXMN109186', 'customer_id': 1, 'make': 'Honda', 'model': 'Civic', 'year': 2020, 'license_plate': 'ABC123'}])
+        bulk_import(self.session, 'mechanics', [{'first_name': 'Alice', 'last_name': 'Smith', 'email': 'alice@example.com', 'salary': '50000'}])
+        tickets = [{'vin': '1HGBH41JXMN109186', 'customer_id': 1, 'ticket_date': f'2024-01-0{1 + i % 2}', 'service_description': 'Oil Change', 'cost': '10.50'} for i in range(5)]
+        bulk_import(self.session, 'service_tickets', tickets, batch_size=2)
+        bulk_import(self.session, 'service_mechanics', [{'service_ticket_id': i, 'mechanic_id': 1} for i in (1, 2, 2)])
+        self.assertEqual(practice1.get_daily_revenue(self.session, datetime.date(2024, 1, 1)), (3, 31.5))
+        self.assertEqual(practice1.get_daily_revenue(self.session, datetime.date(2024, 1, 2)), (2, 21))
+        self.assertEqual(practice1.get_mechanic_ticket_count(self.session, 1), 2)
+
+    def test_vins_are_checked_like_the_loader(self):
+        table = get_table('vehicles')
+        vehicle = {'customer_id': 1, 'make': 'BMW', 'model': '330i', 'year': 2020, 'license_plate': 'ABC123'}
+        vins = {
+            ' 1hgbh41jxmn109186 ': '1HGBH41JXMN109186',
+            'WBA8E9G50GNU12345': 'WBA8E9G50GNU12345',  # position 9 is not a check digit outside North America
+            '1HGBH41J0MN109186': None,  # wrong check digit
+            'WBA8E9G50GNU1234O': None,  # O is never used
+        }
+        for vin, expected in vins.items():
+            for prepare in (coerce_row, loader.prepare_row):
+                if expected is None:
+                    with self.assertRaisesRegex(ValueError, 'invalid VIN'):
+                        prepare(table, dict(vehicle, vin=vin))
+                else:
+                    self.assertEqual(prepare(table, dict(vehicle, vin=vin))['vin'], expected)
+
+    def test_unknown_table(self):
+        with self.assertRaises(ValueError):
+            bulk_import(self.session, 'invoices', [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import threading
+import unittest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+import practice1
+from practice1 import Base, Customer, Vehicle, Mechanic
+from cache import LRUCache, LookupCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = LRUCache(maxsize=2, ttl=None)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)  # 'b' is now least recently used
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.stats(), {'hits': 2, 'misses': 1, 'evictions': 1, 'expirations': 0, 'size': 2, 'maxsize': 2})
+
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        cache = LRUCache(maxsize=10, ttl=5, clock=clock)
+        cache.set('a', 1)
+        clock.now = 4.9
+        self.assertEqual(cache.get('a'), 1)
+        clock.now = 5.0
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.expirations, 1)
+        self.assertEqual(len(cache), 0)
+
+    def test_alias_follows_primary_entry(self):
+        cache = LookupCache(maxsize=10, ttl=None)
+        cache.remember('customers', 'customer_id', {'customer_id': 1, 'email': 'old@example.com'}, ['email'])
+        self.assertEqual(cache.lookup('customers', 'email', 'old@example.com')['customer_id'], 1)
+        cache.remember('customers', 'customer_id', {'customer_id': 1, 'email': 'new@example.com'}, ['email'])
+        self.assertIsNone(cache.lookup('customers', 'email', 'old@example.com'))
+        cache.invalidate('customers', 'customer_id', 1)
+        self.assertIsNone(cache.lookup('customers', 'email', 'new@example.com'))
+
+    def test_shared_between_threads(self):
+        cache = LookupCache(maxsize=50, ttl=None)
+
+        def worker(offset):
+            for i in range(2000):
+                pk = (offset + i) % 80
+                cache.remember('customers', 'customer_id', {'customer_id': pk, 'email': f'{pk}@example.com'}, ['email'])
+                cache.lookup('customers', 'email', f'{(pk + 1) % 80}@example.com')
+                if i % 7 == 0:
+                    cache.invalidate('customers', 'customer_id', pk)
+
+        threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(0, 80, 10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLessEqual(len(cache), 50)
+
+
+class TestCachedLookups(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        session = self.Session()
+        session.add(Customer(first_name='John', last_name='Doe', phone='1234567890', email='john@example.com'))
+        session.add(Vehicle(vin='1HGBH41JXMN109186', customer_id=1, make='Honda', model='Civic', year=2020, license_plate='ABC123'))
+        session.add(Mechanic(first_name='Alice', last_name='Smith', email='alice@example.com', salary=50000))
+        session.commit()
+        session.close()
+        self.cache = practice1.enable_lookup_cache(maxsize=100, ttl=60)
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute', self.record_statement)
+
+    def tearDown(self):
+        practice1.disable_lookup_cache()
+        event.remove(self.engine, 'before_cursor_execute', self.record_statement)
+        self.engine.dispose()
+
+    def record_statement(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('SELECT'):
+            self.statements.append(statement)
+
+    def test_hits_skip_the_database(self):
+        self.assertEqual(practice1.get_customer_by_email(self.Session(), 'john@example.com').customer_id, 1)
+        session = self.Session()
+        customer = practice1.get_customer(session, 1)
+        self.assertEqual(customer.last_name, 'Doe')
+        self.assertEqual(practice1.get_customer_by_phone(session, '1234567890').first_name, 'John')
+        self.assertIs(practice1.get_customer_by_email(session, 'john@example.com'), customer)
+        self.assertEqual(len(self.statements), 1)
+        self.assertEqual(self.cache.stats()['hits'], 3)
+
+    def test_cached_object_is_usable(self):
+        practice1.get_vehicle_by_license_plate(self.Session(), 'ABC123')
+        session = self.Session()
+        vehicle = practice1.get_vehicle(session, '1HGBH41JXMN109186')
+        self.assertEqual(vehicle.owner.email, 'john@example.com')  # relationships still lazy load
+        vehicle.model = 'Accord'
+        session.commit()
+        self.assertEqual(session.query(Vehicle).one().model, 'Accord')
+
+    def test_writes_invalidate(self):
+        session = self.Session()
+        practice1.get_mechanic_by_email(session, 'alice@example.com')
+        practice1.update_mechanic(session, 1, email='alice.smith@example.com')
+        session.close()
+        self.assertIsNone(practice1.get_mechanic_by_email(self.Session(), 'alice@example.com'))
+        self.assertEqual(practice1.get_mechanic(self.Session(), 1).email, 'alice.smith@example.com')
+
+        practice1.update_customers(self.Session(), where=Customer.last_name == 'Doe', last_name='Roe')
+        self.assertEqual(practice1.get_customer(self.Session(), 1).last_name, 'Roe')
+
+        practice1.delete_vehicles(self.Session(), vins=iter(['1HGBH41JXMN109186']))
+        self.assertIsNone(practice1.get_vehicle(self.Session(), '1HGBH41JXMN109186'))
+
+    def test_orm_edits_invalidate(self):
+        session = self.Session()
+        customer = practice1.get_customer(session, 1)
+        customer.last_name = 'Roe'
+        session.commit()
+        self.assertEqual(practice1.get_customer(self.Session(), 1).last_name, 'Roe')
+
+        session.delete(practice1.get_mechanic_by_email(session, 'alice@example.com'))
+        session.commit()
+        self.assertIsNone(practice1.get_mechanic(self.Session(), 1))
+
+    def test_hits_keep_unflushed_changes(self):
+        practice1.get_customer(self.Session(), 1)
+        session = self.Session()
+        customer = session.query(Customer).one()
+        customer.first_name = 'Jim'
+        self.assertIs(practice1.get_customer_by_email(session, 'john@example.com'), customer)
+        self.assertEqual(customer.first_name, 'Jim')
+        # A pending change to the column looked up is flushed and queried like without the cache
+        customer.email = 'jim@example.com'
+        self.assertIsNone(practice1.get_customer_by_email(session, 'john@example.com'))
+        session.rollback()
+        self.assertEqual(practice1.get_customer(self.Session(), 1).first_name, 'John')
+
+    def test_disabled_cache_always_queries(self):
+        practice1.disable_lookup_cache()
+        for _ in range(3):
+            practice1.get_customer(self.Session(), 1)
+        self.assertEqual(len(self.statements), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
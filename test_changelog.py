@@ -0,0 +1,156 @@
+import datetime
+import unittest
+from decimal import Decimal
+from sqlalchemy import create_engine, insert
+import practice1
+from practice1 import ServiceMechanic, ServiceTicket
+from bulk_import import get_table
+import changelog
+
+VIN = '1HGBH41JXMN109186'
+
+
+class TestChangeLog(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        practice1.init_schema(self.engine)
+        changelog.install_change_log(self.engine)
+        self.sessions = practice1.make_sessionmaker(self.engine)
+        changelog.enable_change_log(self.sessions)
+        self.session = self.sessions()
+        practice1.create_customer(self.session, 'John', 'Doe', '1234567890', 'john@example.com')
+        practice1.create_vehicle(self.session, VIN, 1, 'Honda', 'Civic', 2020, 'ABC123')
+        practice1.create_mechanic(self.session, 'Alice', 'Smith', 'alice@example.com', salary=50000)
+        practice1.create_mechanic(self.session, 'Bob', 'Jones', 'bob@example.com', salary=50000)
+
+    def tearDown(self):
+        changelog.disable_change_log(self.sessions)
+        self.session.close()
+        self.engine.dispose()
+
+    def changes(self, seq=0):
+        return [(change.table_name, change.operation, change.key) for change in changelog.changes_since(self.session, seq)]
+
+    def test_helpers_are_logged_in_order(self):
+        seq = changelog.latest_seq(self.session)
+        self.assertEqual(self.changes(), [
+            ('customers', 'insert', {'customer_id': 1}),
+            ('vehicles', 'insert', {'vin': VIN}),
+            ('mechanics', 'insert', {'mechanic_id': 1}),
+            ('mechanics', 'insert', {'mechanic_id': 2}),
+        ])
+        ticket = practice1.open_ticket(self.session, VIN, 1, 'Oil change', 49.99, [1, 2], ticket_date=datetime.datetime(2024, 5, 1))
+        practice1.update_service_ticket(self.session, ticket.ticket_id, cost=59.99)
+        practice1.update_customers(self.session, where=practice1.Customer.last_name == 'Doe', address='1 Main St')
+        practice1.delete_service_mechanic(self.session, ticket.ticket_id, 2)
+        self.assertEqual(self.changes(seq), [
+            ('service_tickets', 'insert', {'ticket_id': 1}),
+            ('service_mechanics', 'insert', {'service_ticket_id': 1, 'mechanic_id': 1}),
+            ('service_mechanics', 'insert', {'service_ticket_id': 1, 'mechanic_id': 2}),
+            ('service_tickets', 'update', {'ticket_id': 1}),
+            ('customers', 'update', {'customer_id': 1}),
+            ('service_mechanics', 'delete', {'service_ticket_id': 1, 'mechanic_id': 2}),
+        ])
+        changes = list(changelog.changes_since(self.session, seq))
+        self.assertEqual([change.seq for change in changes], list(range(seq + 1, seq + 7)))
+        self.assertEqual(changes[0].data['ticket_date'], '2024-05-01T00:00:00')
+        # Updates carry the whole row after the change
+        self.assertEqual(Decimal(str(changes[3].data['cost'])), Decimal('59.99'))
+        self.assertEqual(changes[3].data['service_description'], 'Oil change')
+        self.assertEqual(changes[4].data['address'], '1 Main St')
+
+    def test_deletes_carry_the_old_row(self):
+        seq = changelog.latest_seq(self.session)
+        practice1.delete_mechanics(self.session, where=practice1.Mechanic.last_name == 'Jones')
+        [change] = changelog.changes_since(self.session, seq)
+        self.assertEqual((change.operation, change.key, change.data['email']), ('delete', {'mechanic_id': 2}, 'bob@example.com'))
+
+    def test_flushed_objects_are_logged(self):
+        seq = changelog.latest_seq(self.session)
+        customer = practice1.get_customer(self.session, 1)
+        customer.phone = '5550100'
+        self.session.commit()
+        ticket = practice1.create_service_ticket(self.session, VIN, 1, None, 'Brakes', 200)
+        assignment = practice1.create_service_mechanic(self.session, ticket.ticket_id, 1)
+        # Moving the assignment changes its primary key, so it is logged as a different row
+        assignment.mechanic_id = 2
+        self.session.commit()
+        self.session.delete(assignment)
+        self.session.commit()
+        self.assertEqual(self.changes(seq), [
+            ('customers', 'update', {'customer_id': 1}),
+            ('service_tickets', 'insert', {'ticket_id': ticket.ticket_id}),
+            ('service_mechanics', 'insert', {'service_ticket_id': ticket.ticket_id, 'mechanic_id': 1}),
+            ('service_mechanics', 'delete', {'service_ticket_id': ticket.ticket_id, 'mechanic_id': 1}),
+            ('service_mechanics', 'insert', {'service_ticket_id': ticket.ticket_id, 'mechanic_id': 2}),
+            ('service_mechanics', 'delete', {'service_ticket_id': ticket.ticket_id, 'mechanic_id': 2}),
+        ])
+
+    def test_expired_objects_are_logged_whole(self):
+        seq = changelog.latest_seq(self.session)
+        # Only some attributes expired, so the flush has no reason to load the others
+        customer = practice1.get_customer(self.session, 1)
+        self.session.expire(customer, ['email', 'last_name'])
+        customer.phone = '5550100'
+        mechanic = self.session.get(practice1.Mechanic, 2)
+        self.session.expire(mechanic, ['email'])
+        self.session.delete(mechanic)
+        self.session.commit()
+        update, delete = changelog.changes_since(self.session, seq)
+        self.assertEqual((update.operation, update.data['phone'], update.data['email'], update.data['last_name']), ('update', '5550100', 'john@example.com', 'Doe'))
+        self.assertEqual((delete.operation, delete.key, delete.data['email']), ('delete', {'mechanic_id': 2}, 'bob@example.com'))
+
+    def test_set_based_key_changes_are_logged_as_a_move(self):
+        ticket = practice1.open_ticket(self.session, VIN, 1, 'Oil change', 49.99, [1])
+        seq = changelog.latest_seq(self.session)
+        practice1.update_service_mechanics(self.session, [(ticket.ticket_id, 1)], mechanic_id=2)
+        self.assertEqual(self.changes(seq), [
+            ('service_mechanics', 'delete', {'service_ticket_id': ticket.ticket_id, 'mechanic_id': 1}),
+            ('service_mechanics', 'insert', {'service_ticket_id': ticket.ticket_id, 'mechanic_id': 2}),
+        ])
+
+    def test_bulk_inserts_log_generated_keys(self):
+        seq = changelog.latest_seq(self.session)
+        self.session.execute(insert(get_table('customers')), [
+            {'first_name': 'Jane', 'last_name': 'Roe', 'phone': '555', 'email': 'jane@example.com'},
+            {'first_name': 'Jim', 'last_name': 'Poe', 'phone': '556', 'email': 'jim@example.com'},
+        ])
+        self.session.commit()
+        changes = list(changelog.changes_since(self.session, seq))
+        self.assertEqual(sorted(change.key['customer_id'] for change in changes), [2, 3])
+        self.assertEqual(sorted(change.data['email'] for change in changes), ['jane@example.com', 'jim@example.com'])
+
+    def test_rolled_back_changes_are_not_logged(self):
+        seq = changelog.latest_seq(self.session)
+        with self.assertRaises(RuntimeError):
+            with practice1.unit_of_work(self.session):
+                practice1.open_ticket(self.session, VIN, 1, 'Oil change', 49.99, [1])
+                practice1.update_mechanic(self.session, 1, salary=60000)
+                raise RuntimeError('boom')
+        self.assertEqual(self.changes(seq), [])
+        self.assertEqual(self.session.query(ServiceTicket).count(), 0)
+
+    def test_consumers_page_with_seq_and_limit(self):
+        for i in range(5):
+            practice1.update_mechanic(self.session, 1, salary=50000 + i)
+        seen, seq = [], 0
+        while True:
+            page = list(changelog.changes_since(self.session, seq, limit=3))
+            if not page:
+                break
+            seen.extend(change.seq for change in page)
+            seq = page[-1].seq
+        self.assertEqual(seen, list(range(1, 10)))
+        self.assertEqual(changelog.latest_seq(self.session), 9)
+
+    def test_sessions_without_the_change_log_are_not_logged(self):
+        other = practice1.make_sessionmaker(self.engine)()
+        practice1.create_mechanic(other, 'Carol', 'White', 'carol@example.com', salary=50000)
+        other.execute(insert(ServiceMechanic), [{'service_ticket_id': 1, 'mechanic_id': 3}])
+        other.commit()
+        other.close()
+        self.assertEqual(changelog.latest_seq(self.session), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
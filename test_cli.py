@@ -0,0 +1,150 @@
+import contextlib
+import datetime
+import io
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+from sqlalchemy import event, update
+import practice1
+from practice1 import SchemaVersion
+import cli
+
+REPO = os.path.dirname(os.path.abspath(__file__))
+VIN = '1HGBH41JXMN109186'
+
+
+def run_python(*args):
+    return subprocess.run([sys.executable, *args], cwd=REPO, capture_output=True, text=True, timeout=120)
+
+
+# Cumulative import time in microseconds per module, from python -X importtime
+def import_times(module):
+    result = run_python('-X', 'importtime', '-c', f'import {module}')
+    times = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)$', line)
+        if match:
+            times[match.group(2)] = int(match.group(1))
+    return times
+
+
+class TestStartup(unittest.TestCase):
+    def test_cli_imports_without_sqlalchemy(self):
+        cli_times = import_times('cli')
+        practice1_times = import_times('practice1')
+        self.assertIn('cli', cli_times)
+        self.assertFalse([name for name in cli_times if name.startswith('sqlalchemy')])
+        # Far cheaper than loading SQLAlchemy and declaring the models
+        self.assertLess(cli_times['cli'] * 5, practice1_times['practice1'])
+
+    def test_help_does_not_load_the_models(self):
+        result = run_python('-X', 'importtime', 'practice1.py', 'tickets', 'list', '--help')
+        self.assertEqual(result.returncode, 0)
+        self.assertIn('--since', result.stdout)
+        self.assertNotIn('sqlalchemy', result.stderr)
+
+
+class TestCommands(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.url = 'sqlite:///' + os.path.join(self.tmpdir.name, 'shop.db')
+        self.engine = practice1.make_engine(default_url=self.url)
+        practice1.ensure_schema(self.engine)
+        session = practice1.make_sessionmaker(self.engine)()
+        practice1.create_customer(session, 'John', 'Doe', '1234567890', 'john@example.com')
+        practice1.create_vehicle(session, VIN, 1, 'Honda', 'Civic', 2020, 'ABC123')
+        for day in (1, 10, 20):
+            practice1.create_service_ticket(session, VIN, 1, datetime.datetime(2024, 6, day, 9), f'Service {day}', 100 + day)
+        session.close()
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def run_command(self, *argv):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            code = cli.main([*argv, '--database', self.url])
+        return code, output.getvalue()
+
+    def test_tickets_list_since(self):
+        code, output = self.run_command('tickets', 'list', '--since', '2024-06-05')
+        self.assertEqual(code, 0)
+        self.assertEqual(output.splitlines(), [
+            f'2\t2024-06-10 09:00\t{VIN}\t1\t110.00\tService 10',
+            f'3\t2024-06-20 09:00\t{VIN}\t1\t120.00\tService 20',
+        ])
+        code, output = self.run_command('tickets', 'list', '--since', '2024-06-01', '--until', '2024-06-15', '--limit', '1')
+        self.assertEqual(output.splitlines(), [f'1\t2024-06-01 09:00\t{VIN}\t1\t101.00\tService 1'])
+
+    def test_current_schema_skips_create_all(self):
+        with mock.patch.object(practice1, 'init_schema', wraps=practice1.init_schema) as init_schema:
+            self.run_command('tickets', 'list')
+            init_schema.assert_not_called()
+
+            # An older stored version brings the database up to date once
+            with self.engine.begin() as conn:
+                conn.execute(update(SchemaVersion).values(version=practice1.SCHEMA_VERSION - 1))
+            self.run_command('tickets', 'list')
+            self.run_command('tickets', 'list')
+            self.assertEqual(init_schema.call_count, 1)
+        self.assertEqual(practice1.stored_schema_version(self.engine), practice1.SCHEMA_VERSION)
+
+    def test_current_schema_issues_no_ddl(self):
+        def statements(**kwargs):
+            issued = []
+            record = lambda conn, cursor, statement, *args: issued.append(statement.lstrip().split(None, 1)[0].upper())
+            event.listen(self.engine, 'before_cursor_execute', record)
+            try:
+                practice1.ensure_schema(self.engine, **kwargs)
+            finally:
+                event.remove(self.engine, 'before_cursor_execute', record)
+            return issued
+
+        current = statements()
+        self.assertFalse({'CREATE', 'ALTER', 'DROP'} & set(current))
+        # Only the stored version is read, not every table and index
+        self.assertLess(len(current), len(statements(force=True)))
+
+    def test_migrate_always_checks_the_schema(self):
+        with mock.patch.object(practice1, 'init_schema', wraps=practice1.init_schema) as init_schema:
+            code, output = self.run_command('migrate')
+        self.assertEqual((code, init_schema.call_count), (0, 1))
+        self.assertIn(f'Schema version {practice1.SCHEMA_VERSION}', output)
+
+    def test_unversioned_databases_get_a_version(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            engine = practice1.make_engine(default_url='sqlite:///' + os.path.join(tmpdir, 'old.db'))
+            practice1.init_schema(engine)
+            self.assertIsNone(practice1.stored_schema_version(engine))
+            self.assertIsNotNone(practice1.ensure_schema(engine))
+            self.assertIsNone(practice1.ensure_schema(engine))
+            engine.dispose()
+
+    def test_script_runs_a_subcommand(self):
+        result = run_python('practice1.py', 'tickets', 'list', '--since', '2024-06-15', '--database', self.url)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(len(result.stdout.splitlines()), 1)
+
+    def test_first_command_costs_little_more_than_importing_the_models(self):
+        def best_of(runs, *args):
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                self.assertEqual(run_python(*args).returncode, 0)
+                timings.append(time.perf_counter() - started)
+            return min(timings)
+
+        imported = best_of(3, '-c', 'import practice1')
+        command = best_of(3, 'practice1.py', 'tickets', 'list', '--database', self.url)
+        # About 1.2 times here; the schema check on a current database must not add a create_all
+        self.assertLess(command, imported * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
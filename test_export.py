@@ -0,0 +1,98 @@
+import datetime
+import json
+import os
+import tempfile
+import unittest
+from decimal import Decimal
+from sqlalchemy import create_engine
+import practice1
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+import export
+
+
+@unittest.skipIf(pyarrow is None, 'pyarrow is required for exports')
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.engine = create_engine('sqlite:///' + os.path.join(self.tmpdir.name, 'shop.db'))
+        practice1.init_schema(self.engine)
+        self.session = practice1.make_sessionmaker(self.engine)()
+        practice1.create_customer(self.session, 'John', 'Doe', '1234567890', 'john@example.com')
+        practice1.create_vehicle(self.session, '1HGBH41JXMN109186', 1, 'Honda', 'Civic', 2020, 'ABC123')
+        self.add_tickets(range(25), day=1)
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def add_tickets(self, numbers, day):
+        # Several tickets share each timestamp so the watermark has to use the ticket id too
+        for i in numbers:
+            practice1.create_service_ticket(self.session, '1HGBH41JXMN109186', 1, datetime.datetime(2024, 1, day, 9 + i % 3), f'Service {i}', Decimal(f'{i}.10') + Decimal('0.05') * (i % 2))
+
+    def test_parquet_export_is_streamed_in_batches(self):
+        report = export.export_tickets(self.session, self.path('tickets.parquet'), batch_size=10)
+        self.assertEqual((report.rows, report.batches), (25, 3))
+        parquet = pyarrow.parquet.ParquetFile(report.path)
+        self.assertEqual(parquet.metadata.num_row_groups, 3)
+        table = parquet.read()
+        self.assertEqual(table.schema.field('cost').type, pyarrow.decimal128(export.COST_PRECISION, export.COST_SCALE))
+        rows = table.to_pylist()
+        self.assertEqual(rows[0]['license_plate'], 'ABC123')
+        self.assertEqual(rows[0]['email'], 'john@example.com')
+        self.assertEqual(sorted(row['cost'] for row in rows)[:3], [Decimal('0.10'), Decimal('1.15'), Decimal('2.10')])
+        dates = [(row['ticket_date'], row['ticket_id']) for row in rows]
+        self.assertEqual(dates, sorted(dates))
+
+    def test_costs_are_not_rounded(self):
+        practice1.create_service_ticket(self.session, '1HGBH41JXMN109186', 1, datetime.datetime(2024, 2, 1), 'Fuel surcharge', Decimal('12.345'))
+        report = export.export_tickets(self.session, self.path('tickets.arrow'))
+        rows = pyarrow.ipc.open_file(report.path).read_all().to_pylist()
+        self.assertEqual(rows[-1]['cost'], Decimal('12.345'))
+        # Values the column type can't hold fail the export instead of being rounded
+        schema = export.export_schema()
+        row = tuple(Decimal('0.12345678901') if field.name == 'cost' else None for field in schema)
+        with self.assertRaises(ValueError):
+            export.record_batch([row], schema)
+
+    def test_incremental_exports_only_write_new_rows(self):
+        state = self.path('state.json')
+        first = export.export_tickets(self.session, self.path('night1.arrow'), batch_size=7, state_path=state)
+        self.assertEqual(first.rows, 25)
+        with open(state) as handle:
+            self.assertEqual(json.load(handle)['ticket_id'], first.watermark[1])
+
+        self.assertEqual(export.export_tickets(self.session, self.path('night2.arrow'), state_path=state).rows, 0)
+        self.assertFalse(os.path.exists(self.path('night2.arrow')))
+
+        # New tickets at the watermark's timestamp and later are exported; those dated earlier are
+        # backdated and only a full export picks them up
+        self.add_tickets(range(25, 31), day=1)
+        self.add_tickets(range(31, 35), day=2)
+        third = export.export_tickets(self.session, self.path('night3.arrow'), state_path=state)
+        with pyarrow.ipc.open_file(third.path) as reader:
+            exported = reader.read_all().column('ticket_id').to_pylist()
+        self.assertEqual(first.watermark[0], datetime.datetime(2024, 1, 1, 11))
+        self.assertEqual(sorted(exported), [27, 30, 32, 33, 34, 35])
+
+    def test_format_detection(self):
+        self.assertEqual(export.export_format('out.parquet'), 'parquet')
+        self.assertEqual(export.export_format('out.feather'), 'ipc')
+        self.assertEqual(export.export_format('out.bin', 'ipc'), 'ipc')
+        with self.assertRaises(ValueError):
+            export.export_format('out.csv')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+from decimal import Decimal
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+import practice1
+from practice1 import Base
+import instrumentation
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.original_create_customer = practice1.create_customer
+        instrumentation.reset_instrumentation()
+
+    def tearDown(self):
+        instrumentation.disable_instrumentation()
+        instrumentation.reset_instrumentation()
+        self.session.close()
+        self.engine.dispose()
+
+    def test_disabled_adds_nothing(self):
+        instrumentation.enable_instrumentation(self.engine)
+        instrumentation.disable_instrumentation(self.engine)
+        self.assertIs(practice1.create_customer, self.original_create_customer)
+        self.assertFalse(event.contains(self.engine, 'before_cursor_execute', instrumentation._before_cursor_execute))
+        practice1.create_customer(self.session, 'John', 'Doe', '1234567890', 'john@example.com')
+        self.assertEqual(instrumentation.snapshot(), {'enabled': False, 'helpers': {}, 'statements': []})
+
+    def test_statements_are_attributed_to_helpers(self):
+        instrumentation.enable_instrumentation(self.engine)
+        for i in range(3):
+            practice1.create_customer(self.session, 'John', 'Doe', f'555-000{i}', f'john{i}@example.com')
+        self.assertEqual(len(practice1.read_customers(self.session)), 3)
+        self.assertEqual(practice1.update_customers(self.session, customer_ids=[1, 2], address='1 Main St'), 2)
+        self.assertEqual(len(list(practice1.iter_customers(self.session, batch_size=2))), 3)
+
+        stats = instrumentation.snapshot()
+        self.assertEqual(stats['helpers']['create_customer']['count'], 3)
+        self.assertEqual(stats['helpers']['read_customers']['rows'], 3)
+        self.assertEqual(stats['helpers']['update_customers']['rows'], 2)
+        self.assertEqual(stats['helpers']['iter_customers']['rows'], 3)
+        inserts = [s for s in stats['statements'] if s['helper'] == 'create_customer' and s['statement'].startswith('INSERT INTO customers')]
+        self.assertEqual((inserts[0]['count'], inserts[0]['rows']), (3, 3))
+        updates = [s for s in stats['statements'] if s['helper'] == 'update_customers' and s['statement'].startswith('UPDATE customers')]
+        self.assertEqual(updates[0]['rows'], 2)
+        self.assertTrue(any(s['helper'] == 'iter_customers' for s in stats['statements']))
+        # SELECTs count the rows fetched, also when streamed in batches
+        for helper in ('read_customers', 'iter_customers'):
+            selects = [s for s in stats['statements'] if s['helper'] == helper and s['statement'].startswith('SELECT')]
+            self.assertEqual([s['rows'] for s in selects], [3])
+        for entry in stats['statements']:
+            self.assertGreaterEqual(entry['max_seconds'], 0)
+            self.assertLessEqual(entry['max_seconds'], entry['total_seconds'])
+
+    def test_slow_query_log_redacts_parameters(self):
+        instrumentation.enable_instrumentation(self.engine, slow_query_threshold=0)
+        with self.assertLogs('practice1.slow_queries', level='WARNING') as logs:
+            practice1.create_mechanic(self.session, 'Alice', 'Smith', 'alice@example.com', '555-0199', Decimal('50000'))
+        message = '\n'.join(logs.output)
+        self.assertIn('INSERT INTO mechanics', message)
+        self.assertIn('create_mechanic', message)
+        self.assertIn(instrumentation.REDACTED, message)
+        self.assertNotIn('alice@example.com', message)
+        self.assertNotIn('555-0199', message)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from sqlalchemy import create_engine
+import practice1
+from practice1 import Customer, Vehicle, ServiceTicket, ServiceMechanic
+import loader
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='') as handle:
+        writer = csv.DictWriter(handle, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+class LazyFuture:
+    def __init__(self, pool, function, args):
+        self.pool, self.function, self.args = pool, function, args
+
+    def result(self):
+        self.pool.outstanding -= 1
+        return self.function(*self.args)
+
+
+# Runs chunks in process when they are written, recording how far parsing got ahead of the writer
+class RecordingPool:
+    def __init__(self):
+        self.outstanding = self.most_outstanding = 0
+
+    def submit(self, function, *args):
+        self.outstanding += 1
+        self.most_outstanding = max(self.most_outstanding, self.outstanding)
+        return LazyFuture(self, function, args)
+
+
+class TestLoader(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.engine = create_engine('sqlite:///' + os.path.join(self.tmpdir.name, 'shop.db'))
+        practice1.init_schema(self.engine)
+        self.session = practice1.make_sessionmaker(self.engine)()
+        self.source = os.path.join(self.tmpdir.name, 'source')
+        os.mkdir(self.source)
+        customers = [{'customer_id': i, 'first_name': f'First{i}', 'last_name': f'Last{i}', 'phone': f'(555) 01{i:02d}-000', 'email': f' C{i}@Example.com '} for i in range(1, 41)]
+        customers[4]['email'] = 'not an email'
+        customers[9]['phone'] = '555-01-03-000'  # same digits as customer 3, rejected by the database
+        write_csv(os.path.join(self.source, 'customers.csv'), customers)
+        with open(os.path.join(self.source, 'vehicles.jsonl'), 'w') as handle:
+            handle.write(json.dumps({'vin': '1hgbh41jxmn109186', 'customer_id': 1, 'make': 'Honda', 'model': 'Civic', 'year': 2020, 'license_plate': 'abc 123'}) + '\n')
+            handle.write(json.dumps({'vin': '1HGBH41J0MN109186', 'customer_id': 2, 'make': 'Honda', 'model': 'Civic', 'year': 2020, 'license_plate': 'XYZ789'}) + '\n')
+        write_csv(os.path.join(self.source, 'mechanics.csv'), [{'mechanic_id': 1, 'first_name': 'Alice', 'last_name': 'Smith', 'email': 'alice@example.com', 'phone': '', 'salary': '50000.00'}])
+        self.tickets = [{'ticket_id': i, 'vin': '1HGBH41JXMN109186', 'customer_id': 1, 'ticket_date': f'2024-01-{1 + i % 28:02d}', 'service_description': 'Oil Change', 'cost': '49.99'} for i in range(1, 101)]
+        self.tickets[6]['cost'] = '-5'
+        write_csv(os.path.join(self.source, 'service_tickets.csv'), self.tickets)
+        write_csv(os.path.join(self.source, 'service_mechanics.csv'), [{'service_ticket_id': i, 'mechanic_id': 1} for i in range(1, 11)])
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def test_loads_in_foreign_key_order_with_validation(self):
+        chunks = []
+        report = loader.load(self.session, self.source, workers=2, chunk_size=16, on_chunk=lambda table, stats: chunks.append(table))
+        self.assertEqual(list(report.tables), ['customers', 'vehicles', 'mechanics', 'service_tickets', 'service_mechanics'])
+        self.assertEqual(chunks[:3], ['customers'] * 3)
+        self.assertEqual(report.tables['customers'].inserted, 38)
+        self.assertEqual(sorted(reject.row_number for reject in report.tables['customers'].rejects), [5, 10])
+        self.assertIn('invalid VIN', report.tables['vehicles'].rejects[0].error)
+        self.assertEqual([reject.row_number for reject in report.tables['service_tickets'].rejects], [7])
+        self.assertEqual((report.rows, report.inserted, report.rejected), (153, 149, 4))
+        self.assertIn('total', loader.format_report(report))
+
+        customer = self.session.get(Customer, 1)
+        self.assertEqual((customer.email, customer.phone), ('c1@example.com', '5550101000'))
+        self.assertEqual(self.session.get(Vehicle, '1HGBH41JXMN109186').license_plate, 'ABC123')
+        self.assertEqual(practice1.get_mechanic_ticket_count(self.session, 1), 10)
+        self.assertEqual(sum(practice1.get_daily_revenue(self.session, f'2024-01-{day:02d}')[0] for day in range(1, 29)), 99)
+
+    def test_interrupted_load_resumes_without_duplicates(self):
+        original = loader.write_chunk
+        calls = []
+
+        def crash_on_seventh_chunk(*args):
+            calls.append(args[2].name)
+            if len(calls) == 7:
+                raise KeyboardInterrupt
+            return original(*args)
+
+        with mock.patch.object(loader, 'write_chunk', side_effect=crash_on_seventh_chunk):
+            with self.assertRaises(KeyboardInterrupt):
+                loader.load(self.session, self.source, job='shop-1', workers=2, chunk_size=16)
+        self.session.rollback()
+        self.assertEqual(calls[-1], 'service_tickets')
+        # The first ticket chunk was committed, row 7 of it rejected
+        self.assertEqual(self.session.query(ServiceTicket).count(), 15)
+        self.assertEqual(loader.get_checkpoint(self.session, 'shop-1', 'service_tickets'), (16, False))
+
+        report = loader.load(self.session, self.source, job='shop-1', workers=2, chunk_size=16)
+        self.assertEqual(report.tables['customers'].rows, 0)
+        self.assertEqual(report.tables['service_tickets'].rows, 84)
+        self.assertEqual(self.session.query(ServiceTicket).count(), 99)
+        self.assertEqual(self.session.query(ServiceMechanic).count(), 10)
+        self.assertEqual(loader.get_checkpoint(self.session, 'shop-1', 'service_tickets'), (100, True))
+
+    def test_parsing_is_bounded_by_the_writer(self):
+        loader.install_checkpoints(self.engine)
+        pool = RecordingPool()
+        rows = ({'first_name': 'A', 'last_name': 'B', 'phone': f'555{i:07d}', 'email': f'a{i}@example.com'} for i in range(100))
+        report = loader._load_table(self.session, pool, 'bounded', 'customers', rows, 5, 3, None)
+        self.assertEqual(report.inserted, 100)
+        self.assertEqual(pool.most_outstanding, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
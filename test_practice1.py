@@ -1,7 +1,14 @@
+import datetime
+from decimal import Decimal
+import os
+import re
+import tempfile
 import unittest
-from sqlalchemy import create_engine
+from unittest import mock
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker
-from practice1 import Base, Customer, Vehicle, Mechanic, ServiceTicket
+from practice1 import Base, Customer, Vehicle, Mechanic, ServiceTicket, ServiceMechanic, DailyRevenue, MechanicTicketCount
+import practice1
 
 class TestCRUDOperations(unittest.TestCase):
     @classmethod
@@ -191,5 +198,453 @@ class TestCRUDOperations(unittest.TestCase):
         print(f"Deleted service ticket: {deleted_service_ticket}")
         self.assertIsNone(deleted_service_ticket)
 
+
+class TestPagination(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        for i in range(25):
+            self.session.add(Customer(first_name=f'First{i}', last_name=f'Last{i}', phone=f'555-{i:04d}', email=f'c{i}@example.com'))
+        self.session.add(Vehicle(vin='1HGBH41JXMN109186', customer_id=1, make='Honda', model='Civic', year=2020, license_plate='ABC123'))
+        self.session.add(Mechanic(first_name='Alice', last_name='Smith', email='alice@example.com', salary=50000))
+        self.session.add(Mechanic(first_name='Bob', last_name='Jones', email='bob@example.com', salary=50000))
+        for _ in range(2):
+            self.session.add(ServiceTicket(vin='1HGBH41JXMN109186', customer_id=1, service_description='Oil Change', cost=50.0))
+        self.session.flush()
+        for ticket_id in (1, 2):
+            for mechanic_id in (1, 2):
+                self.session.add(ServiceMechanic(service_ticket_id=ticket_id, mechanic_id=mechanic_id))
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def test_keyset_pages(self):
+        seen, after = [], None
+        while True:
+            page = practice1.read_customers(self.session, after=after, limit=10)
+            if not page:
+                break
+            seen.extend(customer.customer_id for customer in page)
+            after = page[-1].customer_id
+        self.assertEqual(seen, list(range(1, 26)))
+
+    def test_read_without_limit_returns_everything(self):
+        self.assertEqual(len(practice1.read_customers(self.session)), 25)
+
+    def test_composite_key_cursor(self):
+        page = practice1.read_service_mechanics(self.session, after=(1, 1), limit=2)
+        self.assertEqual([(row.service_ticket_id, row.mechanic_id) for row in page], [(1, 2), (2, 1)])
+
+    def test_iter_streams_in_key_order(self):
+        ids = [customer.customer_id for customer in practice1.iter_customers(self.session, batch_size=7)]
+        self.assertEqual(ids, list(range(1, 26)))
+        self.assertEqual(len(list(practice1.iter_service_mechanics(self.session, batch_size=3))), 4)
+
+
+class TestSetBasedWrites(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.session.add(Customer(first_name='John', last_name='Doe', phone='1234567890', email='john@example.com'))
+        self.session.add(Vehicle(vin='1HGBH41JXMN109186', customer_id=1, make='Honda', model='Civic', year=2020, license_plate='ABC123'))
+        self.session.add(Mechanic(first_name='Alice', last_name='Smith', email='alice@example.com', salary=50000))
+        for cost in (50.0, -10.0, -20.0):
+            self.session.add(ServiceTicket(vin='1HGBH41JXMN109186', customer_id=1, service_description='Oil Change', cost=cost))
+        self.session.flush()
+        for ticket_id in (1, 2, 3):
+            self.session.add(ServiceMechanic(service_ticket_id=ticket_id, mechanic_id=1))
+        self.session.commit()
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute', self.record_statement)
+
+    def tearDown(self):
+        event.remove(self.engine, 'before_cursor_execute', self.record_statement)
+        self.session.close()
+        self.engine.dispose()
+
+    def record_statement(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def test_update_is_a_single_statement(self):
+        self.assertEqual(practice1.update_customer(self.session, 1, first_name='Jane'), 1)
+        self.assertEqual(len(self.statements), 1)
+        self.assertTrue(self.statements[0].startswith('UPDATE customers'))
+        self.assertEqual(self.session.query(Customer).one().first_name, 'Jane')
+
+    def test_update_syncs_loaded_objects(self):
+        vehicle = self.session.query(Vehicle).one()
+        practice1.update_vehicle(self.session, vehicle.vin, make='Toyota')
+        self.assertEqual(vehicle.make, 'Toyota')
+
+    def test_missing_row_reports_zero(self):
+        self.assertEqual(practice1.update_mechanic(self.session, 99, first_name='Bob'), 0)
+        self.assertEqual(practice1.delete_mechanic(self.session, 99), 0)
+
+    def test_delete_is_a_single_statement(self):
+        self.assertEqual(practice1.delete_service_mechanic(self.session, 1, 1), 1)
+        # The only other statements keep the mechanic_ticket_counts summary in step
+        self.assertEqual([statement for statement in self.statements if 'service_mechanics' in statement], ['DELETE FROM service_mechanics WHERE service_mechanics.service_ticket_id = ? AND service_mechanics.mechanic_id = ?'])
+        self.assertFalse(any(statement.startswith('SELECT') for statement in self.statements))
+        self.assertEqual(self.session.query(ServiceMechanic).count(), 2)
+
+    def test_batch_update_by_filter(self):
+        updated = practice1.update_service_tickets(self.session, where=ServiceTicket.cost < 0, service_description='Refund')
+        self.assertEqual(updated, 2)
+        self.assertEqual(len(self.statements), 1)
+        self.assertEqual(sorted(ticket.service_description for ticket in self.session.query(ServiceTicket)), ['Oil Change', 'Refund', 'Refund'])
+
+    def test_batch_delete_by_keys(self):
+        self.assertEqual(practice1.delete_service_mechanics(self.session, keys=[(1, 1), (3, 1)]), 2)
+        self.assertEqual(practice1.delete_service_tickets(self.session, ticket_ids=[1, 3]), 2)
+        self.assertEqual([ticket.ticket_id for ticket in self.session.query(ServiceTicket)], [2])
+
+    def test_batch_requires_keys_or_filter(self):
+        with self.assertRaises(ValueError):
+            practice1.delete_customers(self.session)
+
+
+class TestEngineFactory(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_environment_overrides_config_file(self):
+        path = os.path.join(self.tmpdir.name, 'practice1.ini')
+        with open(path, 'w') as handle:
+            handle.write('[database]\ndatabase_url = sqlite:///from-file.db\npool_size = 3\n')
+        config = practice1.load_database_config(path, environ={'PRACTICE1_POOL_SIZE': '7', 'PRACTICE1_POOL_PRE_PING': 'true'})
+        self.assertEqual(config, {'database_url': 'sqlite:///from-file.db', 'pool_size': '7', 'pool_pre_ping': 'true'})
+
+    def test_pool_settings_and_pragmas(self):
+        url = 'sqlite:///' + os.path.join(self.tmpdir.name, 'pool.db')
+        engine = practice1.make_engine({'database_url': url, 'pool_size': '4', 'max_overflow': '2', 'pool_recycle': '60', 'pool_pre_ping': '1'})
+        self.assertEqual(engine.pool.size(), 4)
+        with engine.connect() as conn:
+            self.assertEqual(conn.execute(text('PRAGMA journal_mode')).scalar(), 'wal')
+            self.assertEqual(conn.execute(text('PRAGMA synchronous')).scalar(), 1)  # NORMAL
+            self.assertEqual(conn.execute(text('PRAGMA cache_size')).scalar(), -65536)
+        engine.dispose()
+
+    def test_in_memory_ignores_pool_settings(self):
+        engine = practice1.make_engine({'pool_size': '4'})
+        with engine.connect() as conn:
+            self.assertEqual(conn.execute(text('SELECT 1')).scalar(), 1)
+        engine.dispose()
+
+    def test_unknown_profile(self):
+        url = 'sqlite:///' + os.path.join(self.tmpdir.name, 'bad.db')
+        with self.assertRaises(ValueError):
+            practice1.make_engine({'database_url': url, 'sqlite_profile': 'turbo'})
+
+
+class TestIndexes(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        practice1.init_schema(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def query_plan(self, sql):
+        with self.engine.connect() as conn:
+            return ' '.join(row[-1] for row in conn.execute(text('EXPLAIN QUERY PLAN ' + sql)))
+
+    def test_hot_lookups_use_indexes(self):
+        cases = {
+            "SELECT * FROM service_tickets WHERE customer_id = 1 AND ticket_date >= '2024-01-01'": 'ix_service_tickets_customer_id_ticket_date',
+            "SELECT * FROM service_tickets WHERE customer_id = 1": 'ix_service_tickets_customer_id_ticket_date',
+            "SELECT * FROM service_tickets WHERE vin = '1HGBH41JXMN109186' ORDER BY ticket_date": 'ix_service_tickets_vin_ticket_date',
+            "SELECT * FROM service_tickets WHERE ticket_date BETWEEN '2024-01-01' AND '2024-02-01'": 'ix_service_tickets_ticket_date',
+            "SELECT * FROM vehicles WHERE customer_id = 1": 'ix_vehicles_customer_id',
+            "SELECT * FROM service_mechanics WHERE mechanic_id = 1": 'ix_service_mechanics_mechanic_id',
+        }
+        for sql, index_name in cases.items():
+            plan = self.query_plan(sql)
+            self.assertIn(f'USING INDEX {index_name}', plan, sql)
+            self.assertNotIn('USE TEMP B-TREE', plan, sql)
+
+    def test_ensure_indexes_migrates_existing_database(self):
+        with self.engine.begin() as conn:
+            conn.execute(text('DROP INDEX ix_service_tickets_vin_ticket_date'))
+            conn.execute(text('DROP INDEX ix_vehicles_customer_id'))
+        self.assertEqual(practice1.ensure_indexes(self.engine), ['ix_vehicles_customer_id', 'ix_service_tickets_vin_ticket_date'])
+        self.assertEqual(practice1.ensure_indexes(self.engine), [])
+
+
+class TestHistory(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        practice1.init_schema(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.session.add(Customer(first_name='John', last_name='Doe', phone='1234567890', email='john@example.com'))
+        for i in range(3):
+            self.session.add(Mechanic(first_name='Alice', last_name='Smith', email=f'alice{i}@example.com', salary=50000))
+        self.session.commit()
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute', self.record_statement)
+
+    def tearDown(self):
+        event.remove(self.engine, 'before_cursor_execute', self.record_statement)
+        self.session.close()
+        self.engine.dispose()
+
+    def record_statement(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def add_vehicles(self, count, tickets_per_vehicle):
+        first = self.session.query(Vehicle).count()
+        for v in range(first, first + count):
+            vin = f'1HGBH41JXMN{v:06d}'
+            self.session.add(Vehicle(vin=vin, customer_id=1, make='Honda', model='Civic', year=2020, license_plate=f'PLATE{v}'))
+            for _ in range(tickets_per_vehicle):
+                ticket = ServiceTicket(vin=vin, customer_id=1, service_description='Oil Change', cost=50.0)
+                self.session.add(ticket)
+                self.session.flush()
+                for mechanic_id in (1, 2, 3):
+                    self.session.add(ServiceMechanic(service_ticket_id=ticket.ticket_id, mechanic_id=mechanic_id))
+        self.session.commit()
+        self.session.close()
+        self.statements.clear()
+
+    def render_customer(self, customer):
+        lines = []
+        for vehicle in customer.vehicles:
+            for ticket in vehicle.service_tickets:
+                names = [assignment.mechanic.first_name for assignment in ticket.mechanics]
+                lines.append((vehicle.vin, ticket.ticket_id, ticket.customer.last_name, tuple(names)))
+        for ticket in customer.service_tickets:
+            lines.append((ticket.vehicle.make, len(ticket.mechanics)))
+        return lines
+
+    def test_customer_history_query_count_is_fixed(self):
+        self.add_vehicles(2, 2)
+        lines = self.render_customer(practice1.get_customer_history(self.session, 1))
+        small_count = len(self.statements)
+        self.assertEqual(len(lines), 8)
+
+        self.add_vehicles(10, 5)
+        lines = self.render_customer(practice1.get_customer_history(self.session, 1))
+        self.assertEqual(len(lines), 108)
+        self.assertEqual(len(self.statements), small_count)
+        self.assertLessEqual(small_count, 6)
+
+    def test_vehicle_history(self):
+        self.add_vehicles(1, 4)
+        vehicle = practice1.get_vehicle_history(self.session, '1HGBH41JXMN000000')
+        self.assertEqual(vehicle.owner.email, 'john@example.com')
+        self.assertEqual(sum(len(ticket.mechanics) for ticket in vehicle.service_tickets), 12)
+        self.assertEqual({assignment.mechanic.email for ticket in vehicle.service_tickets for assignment in ticket.mechanics}, {'alice0@example.com', 'alice1@example.com', 'alice2@example.com'})
+        self.assertLessEqual(len(self.statements), 3)
+
+    def test_missing_history(self):
+        self.assertIsNone(practice1.get_customer_history(self.session, 42))
+        self.assertIsNone(practice1.get_vehicle_history(self.session, 'NOPE'))
+
+
+class TestSummaries(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        practice1.init_schema(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        practice1.create_customer(self.session, 'John', 'Doe', '1234567890', 'john@example.com')
+        practice1.create_vehicle(self.session, '1HGBH41JXMN109186', 1, 'Honda', 'Civic', 2020, 'ABC123')
+        for name in ('Alice', 'Bob'):
+            practice1.create_mechanic(self.session, name, 'Smith', f'{name.lower()}@example.com', salary=50000)
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def summaries(self):
+        revenue = {(row.day, row.ticket_count, float(row.revenue)) for row in self.session.query(DailyRevenue) if row.ticket_count}
+        counts = {(row.mechanic_id, row.ticket_count) for row in self.session.query(MechanicTicketCount) if row.ticket_count}
+        return revenue, counts
+
+    def assert_matches_rebuild(self):
+        incremental = self.summaries()
+        practice1.rebuild_summaries(self.session)
+        self.assertEqual(incremental, self.summaries())
+
+    def add_ticket(self, day, cost, mechanic_ids=()):
+        ticket = practice1.create_service_ticket(self.session, '1HGBH41JXMN109186', 1, day, 'Oil Change', cost)
+        for mechanic_id in mechanic_ids:
+            practice1.create_service_mechanic(self.session, ticket.ticket_id, mechanic_id)
+        return ticket.ticket_id
+
+    def test_create_updates_counters(self):
+        self.add_ticket('2024-01-05', 100, [1, 2])
+        self.add_ticket(datetime.datetime(2024, 1, 5, 17, 30), 50.5, [1])
+        self.add_ticket(datetime.date(2024, 1, 6), 20)
+        self.assertEqual(practice1.get_daily_revenue(self.session, datetime.date(2024, 1, 5))[0], 2)
+        self.assertAlmostEqual(float(practice1.get_daily_revenue(self.session, '2024-01-05')[1]), 150.5)
+        self.assertEqual(practice1.get_daily_revenue(self.session, datetime.date(2024, 1, 7))[0], 0)
+        self.assertEqual(practice1.get_mechanic_ticket_count(self.session, 1), 2)
+        self.assertEqual(practice1.get_mechanic_ticket_count(self.session, 2), 1)
+        self.assert_matches_rebuild()
+
+    def test_todays_revenue(self):
+        self.add_ticket(None, 75)
+        self.assertEqual(practice1.get_daily_revenue(self.session), (1, 75))
+
+    def test_updates_and_deletes_stay_in_step(self):
+        first = self.add_ticket('2024-01-05', 100, [1, 2])
+        second = self.add_ticket('2024-01-05', 50, [1])
+        third = self.add_ticket('2024-01-06', 20, [2])
+        practice1.update_service_ticket(self.session, first, cost=120)
+        practice1.update_service_ticket(self.session, second, ticket_date='2024-01-07')
+        practice1.update_service_ticket(self.session, third, service_description='Brakes')
+        self.assert_matches_rebuild()
+
+        practice1.update_service_tickets(self.session, where=ServiceTicket.cost < 100, ticket_date=datetime.datetime(2024, 2, 1))
+        practice1.update_service_mechanics(self.session, keys=[(third, 2)], mechanic_id=1)
+        self.assertEqual(practice1.update_service_mechanic(self.session, first, 3), 0)
+        self.assert_matches_rebuild()
+
+        practice1.delete_service_mechanics(self.session, where=ServiceMechanic.service_ticket_id == first)
+        practice1.delete_service_mechanic(self.session, third, 2)
+        practice1.delete_service_ticket(self.session, first)
+        practice1.delete_service_tickets(self.session, ticket_ids=[second])
+        self.assert_matches_rebuild()
+        self.assertEqual(self.summaries(), ({(datetime.date(2024, 2, 1), 1, 20.0)}, {(1, 2)}))
+
+    def test_rebuild_recovers_from_drift(self):
+        self.add_ticket('2024-01-05', 100, [1])
+        self.session.query(DailyRevenue).delete()
+        self.session.add(MechanicTicketCount(mechanic_id=2, ticket_count=7))
+        self.session.commit()
+        practice1.rebuild_summaries(self.session)
+        self.assertEqual(self.summaries(), ({(datetime.date(2024, 1, 5), 1, 100.0)}, {(1, 1)}))
+
+
+class TestProjections(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        practice1.init_schema(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        for i in range(5):
+            practice1.create_customer(self.session, f'First{i}', f'Last{i}', f'555-000{i}', f'c{i}@example.com', f'{i} Main St')
+        practice1.create_vehicle(self.session, '1HGBH41JXMN109186', 1, 'Honda', 'Civic', 2020, 'ABC123')
+        practice1.create_mechanic(self.session, 'Alice', 'Smith', 'alice@example.com', salary=50000)
+        practice1.create_mechanic(self.session, 'Bob', 'Jones', 'bob@example.com', salary=50000)
+        ticket = practice1.create_service_ticket(self.session, '1HGBH41JXMN109186', 1, None, 'Oil Change', 50)
+        for mechanic_id in (1, 2):
+            practice1.create_service_mechanic(self.session, ticket.ticket_id, mechanic_id)
+        self.session.expunge_all()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def test_listing_columns_as_tuples(self):
+        rows = list(practice1.list_customers(self.session))
+        self.assertEqual([tuple(row) for row in rows[:2]], [(1, 'First0', 'Last0'), (2, 'First1', 'Last1')])
+        self.assertEqual(rows[0].last_name, 'Last0')
+        self.assertEqual(rows[0]._fields, ('customer_id', 'first_name', 'last_name'))
+        # No ORM objects were built or tracked
+        self.assertEqual(len(self.session.identity_map), 0)
+        self.assertEqual([tuple(row) for row in practice1.list_vehicles(self.session)], [('1HGBH41JXMN109186', 'Honda', 'Civic')])
+        self.assertEqual([tuple(row) for row in practice1.list_service_tickets(self.session)], [(1, 'Oil Change')])
+
+    def test_requested_columns_and_paging(self):
+        page = list(practice1.list_customers(self.session, columns=('customer_id', 'email'), after=2, limit=2))
+        self.assertEqual([tuple(row) for row in page], [(3, 'c2@example.com'), (4, 'c3@example.com')])
+        self.assertEqual([tuple(row) for row in practice1.list_service_mechanics(self.session, after=(1, 1))], [(1, 2)])
+        self.assertEqual([row.mechanic_id for row in practice1.list_mechanics(self.session, batch_size=1)], [1, 2])
+        with self.assertRaises(ValueError):
+            list(practice1.list_customers(self.session, columns=('customer_id', 'password')))
+
+
+class TestUnitOfWork(unittest.TestCase):
+    def setUp(self):
+        # File backed, so a second session really uses a second connection
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.engine = create_engine('sqlite:///' + os.path.join(self.tmpdir.name, 'shop.db'))
+        practice1.init_schema(self.engine)
+        self.session = practice1.make_sessionmaker(self.engine)()
+        practice1.create_customer(self.session, 'John', 'Doe', '1234567890', 'john@example.com')
+        practice1.create_vehicle(self.session, '1HGBH41JXMN109186', 1, 'Honda', 'Civic', 2020, 'ABC123')
+        for name in ('Alice', 'Bob', 'Carol'):
+            practice1.create_mechanic(self.session, name, 'Smith', f'{name.lower()}@example.com', salary=50000)
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute', self.record_statement)
+
+    def tearDown(self):
+        practice1.disable_lookup_cache()
+        self.session.close()
+        self.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def record_statement(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def test_helpers_join_the_callers_transaction(self):
+        with practice1.unit_of_work(self.session):
+            ticket = practice1.create_service_ticket(self.session, '1HGBH41JXMN109186', 1, datetime.datetime(2024, 1, 1), 'Oil Change', 50)
+            for mechanic_id in (1, 2):
+                practice1.create_service_mechanic(self.session, ticket.ticket_id, mechanic_id)
+            self.assertTrue(self.session.in_transaction())
+        self.assertFalse(self.session.in_transaction())
+        self.assertEqual([s for s in self.statements if s in ('COMMIT', 'ROLLBACK')], [])  # pysqlite commits without SQL
+        self.assertEqual(self.session.query(ServiceMechanic).count(), 2)
+        # expire_on_commit=False keeps loaded values without another SELECT
+        count = len(self.statements)
+        self.assertEqual(ticket.service_description, 'Oil Change')
+        self.assertEqual(len(self.statements), count)
+
+    def test_exception_rolls_back_everything(self):
+        with self.assertRaises(RuntimeError):
+            with practice1.unit_of_work(self.session):
+                practice1.create_service_ticket(self.session, '1HGBH41JXMN109186', 1, datetime.datetime(2024, 1, 1), 'Oil Change', 50)
+                with practice1.unit_of_work(self.session):
+                    practice1.update_customer(self.session, 1, first_name='Jane')
+                raise RuntimeError('abort')
+        self.assertEqual(self.session.query(ServiceTicket).count(), 0)
+        self.assertEqual(self.session.query(Customer).one().first_name, 'John')
+        self.assertEqual(practice1.get_daily_revenue(self.session, datetime.date(2024, 1, 1)), (0, 0))
+        self.assertFalse(practice1.in_unit_of_work(self.session))
+
+    def test_cache_is_invalidated_after_commit(self):
+        practice1.enable_lookup_cache()
+        self.assertEqual(practice1.get_customer(self.session, 1).first_name, 'John')
+        with practice1.unit_of_work(self.session):
+            practice1.update_customer(self.session, 1, first_name='Jane')
+            # Another session caches the row as it was before this transaction committed
+            other = sessionmaker(bind=self.engine)()
+            self.assertEqual(practice1.get_customer(other, 1).first_name, 'John')
+            other.close()
+        self.session.expunge_all()
+        self.assertEqual(practice1.get_customer(self.session, 1).first_name, 'Jane')
+
+    def test_open_ticket(self):
+        ticket = practice1.open_ticket(self.session, '1HGBH41JXMN109186', 1, 'Brake pads', Decimal('250.00'), [1, 2, 3], ticket_date=datetime.datetime(2024, 1, 1, 9))
+        writes = [' '.join(re.match(r'(\w+) (?:INTO )?(\w+)', s).groups()) for s in self.statements if not s.startswith('SELECT')]
+        self.assertEqual(writes, [
+            'INSERT service_tickets', 'INSERT service_mechanics',
+            'UPDATE daily_revenue', 'INSERT daily_revenue',
+            'UPDATE mechanic_ticket_counts', 'INSERT mechanic_ticket_counts',
+        ])
+        self.assertEqual(sorted(m.mechanic_id for m in ticket.mechanics), [1, 2, 3])
+        self.assertEqual(practice1.get_daily_revenue(self.session, datetime.date(2024, 1, 1)), (1, Decimal('250.00')))
+        self.assertEqual([practice1.get_mechanic_ticket_count(self.session, m) for m in (1, 2, 3)], [1, 1, 1])
+
+        practice1.open_ticket(self.session, '1HGBH41JXMN109186', 1, 'Oil Change', Decimal('50.00'), [2], ticket_date=datetime.datetime(2024, 1, 1, 11))
+        self.assertEqual(practice1.get_daily_revenue(self.session, datetime.date(2024, 1, 1)), (2, Decimal('300.00')))
+        self.assertEqual(practice1.get_mechanic_ticket_count(self.session, 2), 2)
+
+    def test_open_ticket_is_atomic(self):
+        with mock.patch.object(practice1, '_add_mechanic_ticket_counts', side_effect=RuntimeError('summary failed')):
+            with self.assertRaises(RuntimeError):
+                practice1.open_ticket(self.session, '1HGBH41JXMN109186', 1, 'Oil Change', 50, [1, 2])
+        self.assertEqual(self.session.query(ServiceTicket).count(), 0)
+        self.assertEqual(self.session.query(ServiceMechanic).count(), 0)
+        self.assertEqual(self.session.query(DailyRevenue).count(), 0)
+
+
 if __name__ == '__main__':
     unittest.main()
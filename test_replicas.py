@@ -0,0 +1,202 @@
+import datetime
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+import practice1
+import reporting
+from replicas import ReplicaRouter, make_routing_sessionmaker, sqlite_replica_url
+
+VIN = '1HGBH41JXMN109186'
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestReplicaRouting(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.primary_path = self.path('primary.db')
+        self.primary = create_engine('sqlite:///' + self.primary_path)
+        practice1.init_schema(self.primary)
+        session = practice1.make_sessionmaker(self.primary)()
+        practice1.create_customer(session, 'John', 'Doe', '1234567890', 'john@example.com')
+        practice1.create_vehicle(session, VIN, 1, 'Honda', 'Civic', 2020, 'ABC123')
+        practice1.create_service_ticket(session, VIN, 1, datetime.datetime(2024, 6, 1), 'Oil change', 50)
+        session.close()
+        self.primary.dispose()
+        # Read-only copies taken now, so later writes to the primary are missing from them
+        self.replicas = []
+        for name in ('replica1.db', 'replica2.db'):
+            shutil.copy(self.primary_path, self.path(name))
+            self.replicas.append(create_engine(sqlite_replica_url(self.path(name))))
+        self.statements = {}
+        for name, engine in [('primary', self.primary), ('replica1', self.replicas[0]), ('replica2', self.replicas[1])]:
+            self.statements[name] = []
+            event.listen(engine, 'before_cursor_execute', self.recorder(name))
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        for engine in [self.primary, *self.replicas]:
+            engine.dispose()
+        self.tmpdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def recorder(self, name):
+        def record(conn, cursor, statement, *args):
+            if statement != 'SELECT 1':
+                self.statements[name].append(statement)
+        return record
+
+    def served(self):
+        served = {name: len(statements) for name, statements in self.statements.items()}
+        for statements in self.statements.values():
+            statements.clear()
+        return served
+
+    def session(self, **options):
+        router = ReplicaRouter(self.primary, self.replicas, clock=self.clock, **options)
+        return make_routing_sessionmaker(router)()
+
+    def test_replicas_are_read_only(self):
+        with self.replicas[0].connect() as conn:
+            with self.assertRaises(OperationalError):
+                conn.execute(text("DELETE FROM customers"))
+
+    def test_reads_round_robin_per_transaction(self):
+        session = self.session()
+        answered = []
+        for _ in range(4):
+            self.assertEqual(len(practice1.read_customers(session)), 1)
+            # Both statements of one transaction come from the same replica
+            self.assertEqual(len(reporting.revenue_by_month(session)), 1)
+            served = self.served()
+            answered.append([name for name, count in served.items() if count])
+            session.rollback()
+        self.assertEqual(answered, [['replica1'], ['replica2'], ['replica1'], ['replica2']])
+        session.close()
+
+    def test_writes_go_to_the_primary(self):
+        session = self.session()
+        practice1.create_customer(session, 'Jane', 'Roe', '555', 'jane@example.com')
+        practice1.update_customer(session, 2, address='1 Main St')
+        practice1.delete_customers(session, where=practice1.Customer.last_name == 'Roe')
+        served = self.served()
+        self.assertGreater(served['primary'], 0)
+        self.assertEqual((served['replica1'], served['replica2']), (0, 0))
+        session.close()
+
+    def test_helpers_that_read_before_writing_stay_on_the_primary(self):
+        session = self.session()
+        practice1.update_service_ticket(session, 1, cost=75)
+        practice1.delete_service_tickets(session, [1])
+        served = self.served()
+        self.assertEqual((served['replica1'], served['replica2']), (0, 0))
+        # Reads default to a replica, which has not seen the change
+        self.assertEqual(practice1.get_daily_revenue(session, datetime.date(2024, 6, 1))[0], 1)
+        session.rollback()
+        with practice1.use_primary(session):
+            self.assertEqual(practice1.get_daily_revenue(session, datetime.date(2024, 6, 1)), (0, 0))
+        session.close()
+
+    def test_reads_after_a_write_in_the_same_transaction_see_it(self):
+        session = self.session()
+        with practice1.unit_of_work(session):
+            practice1.create_customer(session, 'Jane', 'Roe', '555', 'jane@example.com')
+            self.assertEqual(len(practice1.read_customers(session)), 2)
+        self.assertEqual(self.served()['replica1'], 0)
+        # The copies do not have the new customer yet
+        self.assertEqual(len(practice1.read_customers(session)), 1)
+        session.close()
+
+    def test_read_your_writes_window(self):
+        session = self.session(read_your_writes=5)
+        practice1.create_customer(session, 'Jane', 'Roe', '555', 'jane@example.com')
+        self.served()
+        self.assertEqual(len(practice1.read_customers(session)), 2)
+        self.assertEqual(self.served()['primary'], 1)
+        session.rollback()
+        self.clock.now += 6
+        self.assertEqual(len(practice1.read_customers(session)), 1)
+        self.assertEqual(self.served()['primary'], 0)
+        # The window belongs to the session that wrote
+        other = self.session(read_your_writes=5)
+        practice1.create_customer(session, 'Jim', 'Poe', '556', 'jim@example.com')
+        self.served()
+        practice1.read_customers(other)
+        self.assertEqual(self.served()['primary'], 0)
+        other.close()
+        session.close()
+
+    def test_unhealthy_replicas_are_skipped(self):
+        os.rename(self.path('replica2.db'), self.path('replica2.db.offline'))
+        session = self.session(health_check_interval=10)
+        for _ in range(3):
+            practice1.read_customers(session)
+            session.rollback()
+        self.assertEqual(self.served(), {'primary': 0, 'replica1': 3, 'replica2': 0})
+        self.assertEqual([healthy for _, healthy in session.router.status()], [True, False])
+
+        # Back in rotation once a later health check passes
+        os.rename(self.path('replica2.db.offline'), self.path('replica2.db'))
+        self.clock.now += 11
+        for _ in range(2):
+            practice1.read_customers(session)
+            session.rollback()
+        served = self.served()
+        self.assertEqual((served['replica1'], served['replica2']), (1, 1))
+        session.close()
+
+    def test_cached_lookups_are_filled_from_the_primary(self):
+        practice1.enable_lookup_cache()
+        self.addCleanup(practice1.disable_lookup_cache)
+        writer, reader = self.session(), self.session()
+        self.assertEqual(practice1.get_customer(writer, 1).address, None)
+        practice1.update_customer(writer, 1, address='1 Main St')
+        # The replicas still have the old row, the cache must not get it back from them
+        self.assertEqual(practice1.get_customer(reader, 1).address, '1 Main St')
+        reader.close()
+        other = self.session()
+        self.assertEqual(practice1.get_customer(other, 1).address, '1 Main St')
+        served = self.served()
+        self.assertEqual((served['replica1'], served['replica2']), (0, 0))
+        other.close()
+        writer.close()
+
+    def test_a_hanging_replica_does_not_hold_up_other_sessions(self):
+        answer = threading.Event()
+        event.listen(self.replicas[0], 'connect', lambda *args: answer.wait(5))
+        router = ReplicaRouter(self.primary, self.replicas, health_check_timeout=0.2, clock=self.clock)
+        router.check(router.replicas[1])
+        picked = []
+        threads = [threading.Thread(target=lambda: picked.append(router.next_replica())) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Every session got an answer while replica1 was still failing to connect
+        self.assertFalse(answer.is_set())
+        self.assertEqual(picked, [self.replicas[1]] * 4)
+        self.assertEqual([healthy for _, healthy in router.status()], [False, True])
+        answer.set()
+
+    def test_reads_fall_back_to_the_primary(self):
+        router = ReplicaRouter(self.primary, [create_engine(sqlite_replica_url(self.path('missing.db')))], clock=self.clock)
+        session = make_routing_sessionmaker(router)()
+        self.assertEqual(len(practice1.read_customers(session)), 1)
+        self.assertEqual(self.served()['primary'], 1)
+        session.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
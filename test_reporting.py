@@ -0,0 +1,69 @@
+import datetime
+import unittest
+from decimal import Decimal
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from practice1 import Base, Customer, Vehicle, Mechanic, ServiceTicket, ServiceMechanic
+import reporting
+
+
+class TestReporting(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(cls.engine)
+        session = sessionmaker(bind=cls.engine)()
+        session.add(Customer(first_name='John', last_name='Doe', phone='1234567890', email='john@example.com'))
+        session.add(Customer(first_name='Jane', last_name='Roe', phone='0987654321', email='jane@example.com'))
+        session.add(Vehicle(vin='1HGBH41JXMN109186', customer_id=1, make='Honda', model='Civic', year=2020, license_plate='ABC123'))
+        session.add(Vehicle(vin='1HGBH41JXMN109187', customer_id=2, make='Honda', model='Civic', year=2020, license_plate='XYZ789'))
+        for name in ('Alice', 'Bob', 'Carol'):
+            session.add(Mechanic(first_name=name, last_name='Smith', email=f'{name.lower()}@example.com', salary=50000))
+        tickets = [
+            (1, '1HGBH41JXMN109186', datetime.datetime(2024, 1, 5), 100, [1]),
+            (1, '1HGBH41JXMN109186', datetime.datetime(2024, 1, 20), 50, [1, 2]),
+            (2, '1HGBH41JXMN109187', datetime.datetime(2024, 2, 1), 300, [2]),
+            (2, '1HGBH41JXMN109187', datetime.datetime(2024, 3, 15, 16, 30), 25, [1]),
+        ]
+        for customer_id, vin, ticket_date, cost, mechanic_ids in tickets:
+            ticket = ServiceTicket(vin=vin, customer_id=customer_id, ticket_date=ticket_date, service_description='Service', cost=cost)
+            session.add(ticket)
+            session.flush()
+            for mechanic_id in mechanic_ids:
+                session.add(ServiceMechanic(service_ticket_id=ticket.ticket_id, mechanic_id=mechanic_id))
+        session.commit()
+        session.close()
+        cls.Session = sessionmaker(bind=cls.engine)
+
+    def setUp(self):
+        self.session = self.Session()
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_revenue_by_month(self):
+        self.assertEqual(reporting.revenue_by_month(self.session), [('2024-01', 2, Decimal(150)), ('2024-02', 1, Decimal(300)), ('2024-03', 1, Decimal(25))])
+
+    def test_revenue_by_month_date_range(self):
+        report = reporting.revenue_by_month(self.session, start=datetime.date(2024, 1, 10), end=datetime.date(2024, 3, 1))
+        self.assertEqual(report, [('2024-01', 1, Decimal(50)), ('2024-02', 1, Decimal(300))])
+
+    def test_revenue_by_customer(self):
+        self.assertEqual(reporting.revenue_by_customer(self.session), [(2, 'Jane', 'Roe', 2, Decimal(325)), (1, 'John', 'Doe', 2, Decimal(150))])
+        self.assertEqual(reporting.revenue_by_customer(self.session, limit=1)[0][0], 2)
+        self.assertEqual(reporting.revenue_by_customer(self.session, end=datetime.date(2024, 2, 1)), [(1, 'John', 'Doe', 2, Decimal(150))])
+
+    def test_tickets_per_mechanic(self):
+        self.assertEqual(reporting.tickets_per_mechanic(self.session), [
+            (1, 'Alice', 'Smith', 3, Decimal(175)),
+            (2, 'Bob', 'Smith', 2, Decimal(350)),
+            (3, 'Carol', 'Smith', 0, Decimal(0)),
+        ])
+        self.assertEqual([row[3] for row in reporting.tickets_per_mechanic(self.session, start=datetime.date(2024, 2, 1))], [1, 1, 0])
+
+    def test_results_are_plain_tuples(self):
+        self.assertIs(type(reporting.revenue_by_month(self.session)[0]), tuple)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import datetime
+import unittest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+import practice1
+from practice1 import ServiceMechanic
+from scheduler import HEAP_COMPACTION_SLACK, WorkloadIndex, assign_pending, pending_tickets
+
+NOW = datetime.datetime(2024, 6, 10, 12)
+
+
+class TestWorkloadIndex(unittest.TestCase):
+    def test_picks_least_loaded_and_expires_old_work(self):
+        index = WorkloadIndex([1, 2, 3], clock=lambda: NOW)
+        index.record(1, NOW - datetime.timedelta(days=1), 300)
+        index.record(2, NOW - datetime.timedelta(days=6), 100)
+        self.assertEqual(index.least_loaded(NOW), 3)
+        self.assertEqual(index.assign(NOW, 500, now=NOW), 3)
+        # Equal ticket counts, so fewer estimated hours wins
+        self.assertEqual(index.workload(2), (1, 1.0))
+        self.assertEqual(index.assign(NOW, 50, now=NOW), 2)
+        # Two days later mechanic 2's older ticket has left the window
+        later = NOW + datetime.timedelta(days=2)
+        self.assertEqual(index.workload(2), (2, 1.5))
+        self.assertEqual(index.least_loaded(later), 2)
+        self.assertEqual(index.workload(2), (1, 0.5))
+
+    def test_removed_mechanics_are_skipped(self):
+        index = WorkloadIndex([1, 2], clock=lambda: NOW)
+        index.remove_mechanic(1)
+        self.assertEqual([index.assign(NOW, 100) for _ in range(3)], [2, 2, 2])
+        index.remove_mechanic(2)
+        with self.assertRaises(LookupError):
+            index.assign(NOW, 100)
+
+    def test_readded_mechanics_start_from_scratch(self):
+        index = WorkloadIndex([1, 2], clock=lambda: NOW)
+        index.record(1, NOW - datetime.timedelta(days=6), 100)
+        index.remove_mechanic(1)
+        index.add_mechanic(1)
+        index.record(1, NOW, 200)
+        index.record(2, NOW, 100)
+        index.record(2, NOW, 100)
+        # The entries and the expiry from before the removal are ignored
+        self.assertEqual(index.least_loaded(NOW + datetime.timedelta(days=2)), 1)
+        self.assertEqual(index.workload(1), (1, 2.0))
+
+    def test_superseded_entries_are_compacted(self):
+        index = WorkloadIndex(range(1, 6), clock=lambda: NOW)
+        index.remove_mechanic(5)
+        for day in range(60):
+            for _ in range(20):
+                index.assign(NOW + datetime.timedelta(days=day), 100)
+            self.assertLessEqual(len(index._heap), 2 * len(index) + HEAP_COMPACTION_SLACK)
+        self.assertEqual(index.least_loaded(), min(range(1, 5), key=lambda mechanic_id: (index.workload(mechanic_id), mechanic_id)))
+        self.assertEqual(sorted(entry[2] for entry in index._heap if index._versions[entry[2]] == entry[3]), [1, 2, 3, 4])
+
+    def test_spreads_a_batch_evenly(self):
+        index = WorkloadIndex(range(1, 6), clock=lambda: NOW)
+        picks = [index.assign(NOW, 100) for _ in range(50)]
+        self.assertEqual({mechanic_id: picks.count(mechanic_id) for mechanic_id in range(1, 6)}, dict.fromkeys(range(1, 6), 10))
+
+
+class TestAssignPending(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        practice1.init_schema(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        practice1.create_customer(self.session, 'John', 'Doe', '1234567890', 'john@example.com')
+        practice1.create_vehicle(self.session, '1HGBH41JXMN109186', 1, 'Honda', 'Civic', 2020, 'ABC123')
+        for name in ('Alice', 'Bob', 'Carol'):
+            practice1.create_mechanic(self.session, name, 'Smith', f'{name.lower()}@example.com', salary=50000)
+        # Alice already has two open tickets, Bob one from outside the window
+        for days, mechanic_ids in ((1, [1]), (2, [1]), (30, [2])):
+            practice1.open_ticket(self.session, '1HGBH41JXMN109186', 1, 'Existing', 100, mechanic_ids, ticket_date=NOW - datetime.timedelta(days=days))
+        for i in range(6):
+            practice1.create_service_ticket(self.session, '1HGBH41JXMN109186', 1, NOW - datetime.timedelta(hours=6 - i), f'New {i}', 100 + i)
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def test_assigns_without_per_ticket_queries(self):
+        index = WorkloadIndex.build(self.session, now=NOW)
+        self.assertEqual(index.snapshot()[1]['open_tickets'], 2)
+        self.assertEqual(index.snapshot()[2]['open_tickets'], 0)
+        self.assertEqual(len(pending_tickets(self.session)), 6)
+
+        statements = []
+        event.listen(self.engine, 'before_cursor_execute', lambda conn, cursor, statement, *args: statements.append(statement))
+        assignments = assign_pending(self.session, index=index, now=NOW)
+        self.assertEqual(len(assignments), 6)
+        self.assertEqual(sum(1 for statement in statements if statement.startswith('SELECT')), 1)
+        self.assertEqual(sum(1 for statement in statements if statement.startswith('INSERT INTO service_mechanics')), 1)
+
+        picks = [mechanic_id for _, mechanic_id in assignments]
+        # Bob and Carol catch up with Alice, then ties go to whoever has fewer estimated hours
+        self.assertEqual(picks, [2, 3, 2, 3, 1, 2])
+        self.assertEqual({mechanic_id: load['open_tickets'] for mechanic_id, load in index.snapshot().items()}, {1: 3, 2: 3, 3: 2})
+        self.assertEqual([practice1.get_mechanic_ticket_count(self.session, m) for m in (1, 2, 3)], [3, 4, 2])
+        self.assertEqual(self.session.query(ServiceMechanic).count(), 9)
+        self.assertEqual(assign_pending(self.session, index=index, now=NOW), [])
+
+    def test_refresh_picks_up_changes_made_elsewhere(self):
+        index = WorkloadIndex.build(self.session, now=NOW)
+        practice1.create_mechanic(self.session, 'Dave', 'Smith', 'dave@example.com', salary=50000)
+        for ticket_id in (4, 5):
+            practice1.create_service_mechanic(self.session, ticket_id, 3)
+        self.assertNotIn(4, index)
+        index.refresh(self.session, now=NOW)
+        self.assertEqual({mechanic_id: load['open_tickets'] for mechanic_id, load in index.snapshot().items()}, {1: 2, 2: 0, 3: 2, 4: 0})
+        self.assertEqual([mechanic_id for _, mechanic_id in assign_pending(self.session, index=index, now=NOW, limit=2)], [2, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import datetime
+import time
+import unittest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+import practice1
+from practice1 import Base, ServiceTicket
+import search
+
+
+class TestSearch(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        # Rows written before the search tables exist are picked up by install_search
+        practice1.create_customer(self.session, 'John', 'Doe', '(555) 010-1234', 'john@example.com')
+        self.assertEqual(search.install_search(self.engine), ['service_tickets_fts', 'customers_fts'])
+        self.assertEqual(search.install_search(self.engine), [])
+        practice1.create_customer(self.session, 'Johanna', 'Smith', '555-777-9999', 'hanna.s@example.com')
+        practice1.create_vehicle(self.session, '1HGBH41JXMN109186', 1, 'Honda', 'Civic', 2020, 'ABC123')
+        practice1.create_vehicle(self.session, '1HGBH41JXMN109187', 2, 'Honda', 'Civic', 2020, 'XYZ789')
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def add_ticket(self, vin, description, customer_id=1):
+        return practice1.create_service_ticket(self.session, vin, customer_id, datetime.datetime(2024, 1, 5), description, 100).ticket_id
+
+    def test_ticket_search_with_plate_and_prefix(self):
+        brakes = self.add_ticket('1HGBH41JXMN109186', 'Replaced front brake pads')
+        self.add_ticket('1HGBH41JXMN109186', 'Oil change')
+        other = self.add_ticket('1HGBH41JXMN109187', 'Brakes bled', customer_id=2)
+        self.assertEqual({row[0] for row in search.search_tickets(self.session, 'brake')}, {brakes, other})
+        self.assertEqual([row[0] for row in search.search_tickets(self.session, 'brake', license_plate='ABC123')], [brakes])
+        self.assertEqual(search.search_tickets(self.session, 'brake pad')[0][4], 'Replaced front brake pads')
+        self.assertEqual(search.search_tickets(self.session, '   '), [])
+
+    def test_ranking(self):
+        self.add_ticket('1HGBH41JXMN109186', 'Inspection, noted worn brake pads and a leaking hose, recommended follow up work')
+        best = self.add_ticket('1HGBH41JXMN109186', 'Brake job: brake pads, brake fluid')
+        self.assertEqual(search.search_tickets(self.session, 'brake')[0][0], best)
+
+    def test_triggers_follow_updates_and_deletes(self):
+        ticket_id = self.add_ticket('1HGBH41JXMN109186', 'Oil change')
+        practice1.update_service_ticket(self.session, ticket_id, service_description='Timing belt')
+        self.assertEqual(search.search_tickets(self.session, 'oil'), [])
+        self.assertEqual(len(search.search_tickets(self.session, 'timing')), 1)
+        practice1.delete_service_ticket(self.session, ticket_id)
+        self.assertEqual(search.search_tickets(self.session, 'timing'), [])
+
+        practice1.update_customer(self.session, 2, last_name='Jones')
+        self.assertEqual(search.search_customers(self.session, 'smith'), [])
+        self.assertEqual(search.search_customers(self.session, 'jones')[0][0], 2)
+        practice1.delete_customer(self.session, 2)
+        self.assertEqual(search.search_customers(self.session, 'jones'), [])
+
+    def test_customer_search_by_partial_name_phone_email(self):
+        self.assertEqual({row[0] for row in search.search_customers(self.session, 'joh')}, {1, 2})
+        self.assertEqual([row[0] for row in search.search_customers(self.session, 'john doe')], [1])
+        self.assertEqual([row[0] for row in search.search_customers(self.session, '555 0101')], [1])
+        self.assertEqual([row[0] for row in search.search_customers(self.session, '555-777')], [2])
+        self.assertEqual([row[0] for row in search.search_customers(self.session, 'hanna.s@example')], [2])
+
+    def test_benchmark_against_like_scan(self):
+        words = ['oil change', 'tire rotation', 'wiper blades', 'battery test', 'alignment', 'coolant flush']
+        rows = [{'vin': '1HGBH41JXMN109186', 'customer_id': 1, 'ticket_date': datetime.datetime(2024, 1, 1), 'cost': 50,
+                 'service_description': f'{words[i % len(words)]} visit {i}' + (' and brake pads' if i % 500 == 0 else '')}
+                for i in range(30000)]
+        self.session.execute(ServiceTicket.__table__.insert(), rows)
+        self.session.commit()
+
+        def best_of(runs, query):
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                ids = query()
+                timings.append(time.perf_counter() - started)
+            return ids, min(timings)
+
+        fts_ids, fts_seconds = best_of(10, lambda: {row[0] for row in search.search_tickets(self.session, 'brake', limit=1000)})
+        like_ids, like_seconds = best_of(10, lambda: {row[0] for row in self.session.execute(text("SELECT ticket_id FROM service_tickets WHERE service_description LIKE '%brake%'"))})
+        self.assertEqual(fts_ids, like_ids)
+        self.assertEqual(len(fts_ids), 60)
+        # About five times faster here; half of that leaves room for a busy machine
+        self.assertLess(fts_seconds * 2, like_seconds)
+
+
+if __name__ == '__main__':
+    unittest.main()